@@ -1,34 +1,126 @@
 #!/usr/bin/env python3
 """
 Analyze the compliance report
+
+Usage: python analyze_report.py [report.xlsx|.csv|.jsonl]
+       python analyze_report.py --store results.sqlite [--run ID] [--label NAME]
+                                [--compare ID] [--trend N] [--export report.xlsx]
+
+Reads the report row by row (report_writer.read_report), without pandas, or queries
+a result store written with --store (result_store.py): decision counts, confidence
+and timing per decision, decision changes against the previous run (or --compare),
+and the decision counts of the last runs.
 """
 
-import pandas as pd
+import argparse
+from collections import Counter
+
+from report_writer import read_report
+from result_store import DECISIONS, ResultStore
 
-def main():
+DEFAULT_REPORT = 'brook_compliance_report_semantic.xlsx'
+
+def main(report_path: str = DEFAULT_REPORT):
     # Read the report
-    df = pd.read_excel('brook_compliance_report_semantic.xlsx')
-    
+    rows = list(read_report(report_path))
+    counts = Counter(row.get('Result') for row in rows)
+
     print("Compliance Report Summary")
     print("=" * 50)
-    print(f"Total Rules: {len(df)}")
-    print(f"Found: {len(df[df['Result'] == 'FOUND'])}")
-    print(f"Missing: {len(df[df['Result'] == 'MISSING'])}")
-    
+    print(f"Total Rules: {len(rows)}")
+    for d in DECISIONS:
+        print(f"{d.title()}: {counts[d]}")
+
     print("\nDetailed Results:")
     print("-" * 50)
-    for _, row in df.iterrows():
+    for row in rows:
         print(f"{row['Rule ID']}: {row['Result']}")
-    
+
     print("\nMissing Rules (if any):")
     print("-" * 50)
-    missing = df[df['Result'] == 'MISSING']
+    missing = [row for row in rows if row.get('Result') == 'MISSING']
     if len(missing) > 0:
-        for _, row in missing.iterrows():
+        for row in missing:
             print(f"{row['Rule ID']}: {row['Item']}")
     else:
         print("No missing rules found!")
 
-if __name__ == "__main__":
-    main()
+    for d in ("CONFLICT", "REVIEW"):
+        flagged = [row for row in rows if row.get('Result') == d]
+        if flagged:
+            print(f"\n{d.title()} Rules:")
+            print("-" * 50)
+            for row in flagged:
+                print(f"{row['Rule ID']}: {row['Item']}")
+
+def analyze_store(store_path: str, run_id: int | None = None, label: str | None = None,
+                  compare: int | None = None, trend: int = 10, export: str | None = None):
+    """
+    Summary of one stored run (default: the latest, of `label` if given), its changes
+    against run `compare` (default: the previous run of the same label) and the
+    decision counts of the last `trend` runs.
+    """
+    with ResultStore(store_path) as store:
+        if run_id is None:
+            run_id = store.latest_run(label)
+        info = store.run_info(run_id) if run_id is not None else None
+        if info is None:
+            print(f"No stored run in {store_path}" + (f" (run {run_id})" if run_id is not None else ""))
+            return
+        label = info["label"]
 
+        print(f"Run {run_id} ({info['started']}{', ' + label if label else ''})")
+        print("=" * 50)
+        print(f"Total Rules: {info['rules']}   Run time: {info['seconds'] or 0:.2f}s")
+        print(f"{'Decision':10s} {'Rules':>6s} {'Avg conf.':>10s} {'Eval s':>8s}")
+        for d, s in store.summary(run_id).items():
+            conf = f"{s['avg_confidence']:.2f}" if s["avg_confidence"] is not None else "-"
+            print(f"{d:10s} {s['rules']:6d} {conf:>10s} {s['seconds']:8.3f}")
+
+        for d in ("MISSING", "CONFLICT", "REVIEW"):
+            flagged = store.results(run_id, d)
+            if flagged:
+                print(f"\n{d.title()}: " + ", ".join(r["rule_id"] for r in flagged))
+
+        slow = store.slowest(run_id)
+        if slow:
+            print("\nSlowest rules: " + ", ".join(f"{r['rule_id']} {r['seconds'] or 0:.3f}s" for r in slow))
+
+        if compare is None:
+            compare = store.latest_run(label, before=run_id)
+        if compare is not None:
+            changes = store.changes(compare, run_id)
+            print(f"\nChanges since run {compare}:")
+            print("-" * 50)
+            for c in changes:
+                print(f"{c['rule_id']}: {c['old'] or '(absent)'} → {c['new'] or '(absent)'}")
+            if not changes:
+                print("No decision changed.")
+
+        runs = store.trend(label, trend)
+        if len(runs) > 1:
+            print(f"\nTrend (last {len(runs)} runs{' of ' + label if label else ''}):")
+            print("-" * 50)
+            print(f"{'Run':>5s} {'Started':19s} " + " ".join(f"{d:>8s}" for d in DECISIONS))
+            for r in runs:
+                print(f"{r['run_id']:5d} {r['started']:19s} " + " ".join(f"{r[d] or 0:8d}" for d in DECISIONS))
+
+        if export:
+            n = store.export_run(run_id, export)
+            print(f"\nExported run {run_id} ({n} rows) to {export}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarize a compliance report or a result store")
+    ap.add_argument("report", nargs="?", default=DEFAULT_REPORT, help="report file (.xlsx, .csv or .jsonl)")
+    ap.add_argument("--store", default=None, metavar="SQLITE_FILE", help="query a result store instead")
+    ap.add_argument("--run", type=int, default=None, help="stored run id (default: latest)")
+    ap.add_argument("--label", default=None, help="latest run / trend of this label (e.g. operator)")
+    ap.add_argument("--compare", type=int, default=None, metavar="RUN",
+                    help="run to list decision changes against (default: the previous run)")
+    ap.add_argument("--trend", type=int, default=10, metavar="N", help="runs shown in the trend (default: %(default)s)")
+    ap.add_argument("--export", default=None, metavar="REPORT", help="write the stored run as a report file")
+    args = ap.parse_args()
+    if args.store:
+        analyze_store(args.store, args.run, args.label, args.compare, args.trend, args.export)
+    else:
+        main(args.report)
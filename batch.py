@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Batch mode — check many operators' document sets in one process
+----------------------------------------------------------------
+run_compliance_check_semantic.py audits one AOC holder (DOC_FILES + one ops_facts
+file). Batch mode reads a manifest of operators, each with its own document map,
+ops_facts and rules file, and produces one report per operator plus a fleet-wide
+summary, paying interpreter startup and rule compilation once:
+
+- Each distinct rules file is loaded and compiled once (and its scan plan built
+  once) and shared by every operator that uses it.
+- Operators are processed in waves; the documents of a whole wave are extracted on
+  one process pool that lives for the entire run (files shared by several
+  operators are extracted once), then released after the wave's reports are written.
+- A broken operator entry (unreadable rules, bad paths) is reported in the summary
+  and does not stop the batch.
+
+Manifest (JSON; relative paths are resolved against the manifest's folder):
+{
+  "defaults": {"rules": "brook_semantic_rules.json", "ops_facts": null},
+  "operators": [
+    {
+      "name": "BROOK",
+      "base_dir": "operators/brook",          # optional, document paths are relative to it
+      "documents": {"OpsSpecs": "Opspecs Brook ....pdf", "OM-A": "OMA - REV 05.docx"},
+      "ops_facts": "ops_facts_brook.json",    # optional (else defaults.ops_facts)
+      "rules": "brook_semantic_rules.json",   # optional (else defaults.rules)
+      "output": "BROOK_compliance_report.xlsx" # optional, relative to --out-dir
+    }
+  ]
+}
+
+With --store, every operator's results are appended to a result store as one run
+labelled with the operator name (result_store.py), so per-operator trends build up
+across batch runs.
+
+--eval-workers, --rule-timeout and --guard-all work as in the single-operator check:
+each operator's rules are evaluated on a shared-corpus worker pool (shared_corpus.py,
+scheduled from that operator's stored timings) and risky rules run under the budget.
+
+Usage:
+  python batch.py operators.json --out-dir reports [--workers N] [--wave-size N] [--eval-workers N]
+                  [--store results.sqlite]
+"""
+
+import argparse, json, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from doc_extract import EXTRACTOR_VERSION, cache_versions, extract_options
+from doc_store import LazyDocStore, prescan_rules, prescan_warnings
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from parallel_extract import extract_documents_parallel
+from pdf_backends import BACKEND_CHOICES, DEFAULT_PDF_BACKEND
+from regex_guard import DEFAULT_RULE_TIMEOUT
+from report_writer import write_workbook
+from result_store import DECISIONS, ResultStore
+from rule_engine import compile_rules
+from run_compliance_check_semantic import (export_report, load_ops_facts, load_rules,
+                                           report_row, select_rules)
+from shared_corpus import evaluate_parallel
+
+# Operators whose documents are held in memory at the same time
+DEFAULT_WAVE_SIZE = 4
+SUMMARY_NAME = "fleet_summary.xlsx"
+
+
+# ====== Manifest ======
+def load_manifest(manifest_path: str) -> list:
+    """
+    Read a batch manifest and return the operator entries with absolute paths:
+    [{"name", "documents": {key: path}, "rules": path, "ops_facts": path | None, "output": str}]
+    Raises ValueError on a malformed manifest (missing names/documents, duplicate names).
+    """
+    manifest_path = Path(manifest_path)
+    raw = json.loads(manifest_path.read_text(encoding="utf-8"))
+    root = manifest_path.resolve().parent
+    defaults = raw.get("defaults", {}) if isinstance(raw, dict) else {}
+    entries = raw.get("operators") if isinstance(raw, dict) else raw
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Manifest must list operators (a list, or {\"operators\": [...]})")
+
+    def resolve(base: Path, p):
+        return str(base / p) if p else None
+
+    operators, seen = [], set()
+    for i, entry in enumerate(entries):
+        name = str(entry.get("name") or "").strip()
+        if not name:
+            raise ValueError(f"Operator #{i + 1}: missing name")
+        if name in seen:
+            raise ValueError(f"Operator {name}: listed twice")
+        seen.add(name)
+        if not isinstance(entry.get("documents"), dict) or not entry["documents"]:
+            raise ValueError(f"Operator {name}: missing document map")
+        rules = entry.get("rules") or defaults.get("rules")
+        if not rules:
+            raise ValueError(f"Operator {name}: no rules file (set it or defaults.rules)")
+        doc_root = root / entry.get("base_dir", "")
+        operators.append({
+            "name": name,
+            "documents": {k: resolve(doc_root, v) for k, v in entry["documents"].items()},
+            "rules": resolve(root, rules),
+            "ops_facts": resolve(root, entry.get("ops_facts", defaults.get("ops_facts"))),
+            "output": entry.get("output") or f"{name}_compliance_report.xlsx",
+        })
+    return operators
+
+
+# ====== Shared rule sets ======
+class RuleSets:
+    """
+    Rules files loaded and compiled once per run, keyed by path.
+    """
+
+    def __init__(self, only=None):
+        self.only = only
+        self._sets = {}
+
+    def get(self, path: str):
+        """
+        (rules, CompiledRuleSet) for a rules file.
+        """
+        key = str(Path(path).resolve())
+        if key not in self._sets:
+            rules = select_rules(load_rules(path), self.only)
+            compiled = compile_rules(rules, strict=False)
+            for err in compiled.errors:
+                print(f"[rules] {Path(path).name}: {err}", file=sys.stderr)
+            for msg in compiled.lint:
+                print(f"[rules] {Path(path).name}: risky pattern: {msg}", file=sys.stderr)
+            self._sets[key] = (rules, compiled)
+        return self._sets[key]
+
+
+# ====== Batch run ======
+def summary_row(name: str, rows: list, status: str, report: str = "", missing_docs=()) -> dict:
+    counts = {d: sum(1 for r in rows if r["Result"] == d) for d in DECISIONS}
+    return {
+        "Operator": name,
+        "Rules": len(rows),
+        **counts,
+        "Missing documents": ", ".join(missing_docs),
+        "Report": report,
+        "Status": status,
+    }
+
+
+def run_batch(manifest_path: str, out_dir: str = "reports", cache_dir: str | None = DEFAULT_CACHE_DIR,
+              cache_max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 0, only=None,
+              sectioned: bool = True, wave_size: int = DEFAULT_WAVE_SIZE,
+              rule_timeout: float = DEFAULT_RULE_TIMEOUT, pdf_backend: str = DEFAULT_PDF_BACKEND,
+              pdf_layout: bool = False, store_path: str | None = None, guard_all: bool = False,
+              eval_workers: int = 1) -> list:
+    """
+    Check every operator of a manifest; write one report per operator and
+    "<out_dir>/fleet_summary.xlsx" (and, with store_path, one stored run per operator).
+    eval_workers: rule evaluation processes per operator (0 = one per core, 1 = serial).
+    Returns the summary rows.
+    """
+    operators = load_manifest(manifest_path)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    options = extract_options(pdf_backend, pdf_layout)
+    cache = ExtractionCache(cache_dir, version=EXTRACTOR_VERSION, max_bytes=cache_max_bytes,
+                            versions=cache_versions(options)) if cache_dir else None
+    rule_sets = RuleSets(only)
+    workers = workers or os.cpu_count() or 1
+    wave_size = max(1, wave_size)
+
+    summary, matrix = [], {}
+    store = ResultStore(store_path) if store_path else None
+    settings = {"pdf_backend": pdf_backend, "pdf_layout": pdf_layout, "sectioned": sectioned, "only": only,
+                "rule_timeout": rule_timeout, "guard_all": guard_all, "eval_workers": eval_workers,
+                "batch": str(manifest_path)}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for w in range(0, len(operators), wave_size):
+            # ---- Prepare the wave: shared rule sets, per-operator stores ----
+            jobs = []
+            for op in operators[w:w + wave_size]:
+                try:
+                    rules, compiled = rule_sets.get(op["rules"])
+                    scan = prescan_rules(rules, op["documents"])
+                except Exception as e:
+                    print(f"[batch] {op['name']}: {e}", file=sys.stderr)
+                    summary.append(summary_row(op["name"], [], f"ERROR: {e}"))
+                    continue
+                for msg in prescan_warnings(scan, op["documents"]):
+                    print(f"[documents] {op['name']}: {msg}", file=sys.stderr)
+                jobs.append((op, rules, compiled, scan, LazyDocStore(op["documents"], cache, options=options)))
+
+            # ---- One extraction for the whole wave (each file once) ----
+            paths = {}
+            for op, _, _, scan, _ in jobs:
+                for k in scan["referenced"]:
+                    if k in op["documents"]:
+                        paths[str(Path(op["documents"][k]).resolve())] = op["documents"][k]
+            records = extract_documents_parallel(paths, workers=workers, cache=cache, pool=pool,
+                                                 options=options) if paths else {}
+
+            # ---- Evaluate and report per operator ----
+            for op, _, compiled, scan, docs in jobs:
+                docs.preload({k: records[str(Path(p).resolve())] for k, p in op["documents"].items()
+                               if str(Path(p).resolve()) in records})
+                try:
+                    ops_facts = load_ops_facts(op["ops_facts"])
+                    report = out / op["output"]
+                    recorder = store.recorder(op["name"], op["rules"], report, settings) if store is not None else None
+                    rows = []
+                    eval_kwargs = dict(ops_facts=ops_facts, sectioned=sectioned, rule_timeout=rule_timeout,
+                                       guard_all=guard_all)
+                    if eval_workers != 1 and len(compiled) > 1:
+                        measured = store.rule_seconds(op["name"]) if store is not None else None
+                        evaluated = evaluate_parallel(compiled, docs, eval_workers or os.cpu_count() or 1,
+                                                      measured, **eval_kwargs)
+                    else:
+                        evaluated = compiled.evaluate(docs, **eval_kwargs)
+                    for cr, outcome in evaluated:
+                        rows.append(report_row(cr.rule, outcome))
+                        if recorder is not None:
+                            recorder.write(rows[-1], outcome)
+                    report.parent.mkdir(parents=True, exist_ok=True)
+                    export_report(rows, str(report))
+                    if recorder is not None:
+                        recorder.close()
+                except Exception as e:
+                    print(f"[batch] {op['name']}: {e}", file=sys.stderr)
+                    summary.append(summary_row(op["name"], [], f"ERROR: {e}"))
+                    continue
+                finally:
+                    for k in docs.loaded():
+                        docs.release(k)
+                summary.append(summary_row(op["name"], rows, "OK", str(report),
+                                           scan["missing_files"] + scan["unmapped"]))
+                for row in rows:
+                    matrix.setdefault(row["Rule ID"], {})[op["name"]] = row["Result"]
+                s = summary[-1]
+                print(f"[batch] {op['name']}: " + ", ".join(f"{d} {s[d]}" for d in DECISIONS), file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            cache.flush()
+        if store is not None:
+            store.close()
+
+    order = {op["name"]: i for i, op in enumerate(operators)}
+    summary.sort(key=lambda row: order[row["Operator"]])
+    export_fleet_summary(summary, matrix, str(out / SUMMARY_NAME))
+    return summary
+
+
+def export_fleet_summary(summary: list, matrix: dict, path: str):
+    """
+    Fleet-wide workbook: per-operator decision counts ("Summary") and the
+    rule × operator Result matrix ("Rule matrix").
+    """
+    names = [s["Operator"] for s in summary]
+    summary_columns = ["Operator", "Rules", *DECISIONS, "Missing documents", "Report", "Status"]
+    write_workbook(path, {
+        "Summary": (summary_columns, summary),
+        "Rule matrix": (["Rule ID", *names], [{"Rule ID": rid, **{n: results.get(n, "") for n in names}}
+                                              for rid, results in matrix.items()]),
+    })
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Batch compliance check over a manifest of operators")
+    ap.add_argument("manifest", help="operators manifest JSON")
+    ap.add_argument("--out-dir", default="reports", help="folder for the reports (default: %(default)s)")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                    help="directory of the extracted-text cache (default: %(default)s)")
+    ap.add_argument("--no-cache", action="store_true", help="always re-extract documents")
+    ap.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                    help="evict cached text above this size (default: %(default)s MB)")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="extraction processes (0 = one per core, 1 = serial; default: %(default)s)")
+    ap.add_argument("--wave-size", type=int, default=DEFAULT_WAVE_SIZE,
+                    help="operators whose documents are loaded at once (default: %(default)s)")
+    ap.add_argument("--only", action="append", default=None, metavar="RULE_ID",
+                    help="evaluate only matching rule ids (glob allowed, repeatable)")
+    ap.add_argument("--no-sections", action="store_true",
+                    help="ignore anchor_sections and search whole documents")
+    ap.add_argument("--rule-timeout", type=float, default=DEFAULT_RULE_TIMEOUT, metavar="SECONDS",
+                    help="time budget per risky rule, then REVIEW (0 = no budget; default: %(default)s)")
+    ap.add_argument("--guard-all", action="store_true",
+                    help="apply the time budget to every rule, not only those with risky patterns")
+    ap.add_argument("--eval-workers", type=int, default=1,
+                    help="rule evaluation processes per operator (0 = one per core; default: %(default)s = serial)")
+    ap.add_argument("--pdf-backend", choices=BACKEND_CHOICES, default=DEFAULT_PDF_BACKEND,
+                    help="PDF text engine (default: %(default)s; see pdf_backends.py)")
+    ap.add_argument("--pdf-layout", action="store_true",
+                    help="layout-preserving PDF text (pypdf, pdfminer, pymupdf)")
+    ap.add_argument("--store", default=None, metavar="SQLITE_FILE",
+                    help="append each operator's results to a result store (labelled by operator)")
+    args = ap.parse_args(argv)
+    try:
+        extract_options(args.pdf_backend, args.pdf_layout)
+    except ValueError as e:
+        ap.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_batch(args.manifest, args.out_dir, cache_dir=None if args.no_cache else args.cache_dir,
+              cache_max_bytes=args.cache_max_mb * 1024 * 1024, workers=args.workers, only=args.only,
+              sectioned=not args.no_sections, wave_size=args.wave_size, rule_timeout=args.rule_timeout,
+              pdf_backend=args.pdf_backend, pdf_layout=args.pdf_layout, store_path=args.store,
+              guard_all=args.guard_all, eval_workers=args.eval_workers)
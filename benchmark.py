@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite — synthetic manuals and rule sets at scale
+----------------------------------------------------------
+The only performance data point used to be "run main() on the BROOK files". This
+harness generates a synthetic corpus of configurable size and times the pipeline
+stages separately, so optimizations can be measured and regressions caught:
+
+- Manuals: DOCX (python-docx), PDF (a minimal text-only PDF written directly) and
+  TXT, each with numbered section headings, filler paragraphs, tables, the fleet
+  registrations and planted rule evidence (some of it inside table cells).
+- Rules: a rule set in the brook_semantic_rules.json schema (affirm / limit / deny /
+  align_with_opspecs and legacy contains_any rules, with and without
+  anchor_sections). For every rule the generator plants positive evidence, a
+  forbidden claim, an extra fleet registration or nothing, and records the
+  decision the rule must report (FOUND / CONFLICT / MISSING).
+- Stages: extract (cold), extract_cached (all extraction-cache hits), compile,
+  evaluate and export, each repeated and reported as the best of N runs
+  (--eval-workers evaluates on several processes, shared_corpus.py).
+- Correctness: every rule's decision is compared with the planted expectation, so
+  a speedup that changes verdicts fails the benchmark (exit code 1).
+
+Each run appends one JSON line to the results file (default benchmark_results.jsonl)
+with the configuration, git commit and timings, and is compared with the previous
+run of the same configuration; stages slower by more than --regress-pct are flagged.
+
+The corpus is kept in --work-dir (default .bench/) and reused while the
+configuration is unchanged, so repeated runs measure the code, not the generator.
+
+Usage:
+  python benchmark.py --preset medium
+  python benchmark.py --docs 6 --paragraphs 5000 --tables 40 --rules 300 --formats docx,pdf --repeat 5
+"""
+
+import argparse, json, os, platform, random, shutil, subprocess, sys, tempfile, textwrap, time
+from pathlib import Path
+
+from doc_extract import EXTRACTOR_VERSION, cache_versions, extract_options
+from doc_store import LazyDocStore
+from extraction_cache import ExtractionCache
+from parallel_extract import extract_documents_parallel
+from pdf_backends import BACKEND_CHOICES, DEFAULT_PDF_BACKEND
+from rule_engine import compile_rules
+from run_compliance_check_semantic import export_report, report_row
+from run_profile import RunProfile
+from shared_corpus import evaluate_parallel
+
+PRESETS = {
+    "small":  {"docs": 4, "paragraphs": 400, "tables": 5, "rules": 40, "registrations": 4},
+    "medium": {"docs": 8, "paragraphs": 4000, "tables": 40, "rules": 250, "registrations": 6},
+    "large":  {"docs": 12, "paragraphs": 20000, "tables": 200, "rules": 1000, "registrations": 8},
+}
+DEFAULT_RESULTS = "benchmark_results.jsonl"
+DEFAULT_WORK_DIR = ".bench"
+STAGES = ["extract", "extract_cached", "compile", "evaluate", "export"]
+# Stage regressions below this many seconds are noise
+REGRESS_MIN_SECONDS = 0.05
+
+PARAGRAPHS_PER_SECTION = 40
+# Share of planted evidence placed in table cells rather than paragraphs
+TABLE_PLANT_SHARE = 0.25
+PDF_LINES_PER_PAGE = 64
+PDF_LINE_CHARS = 100
+
+# Filler vocabulary: no hyphens (registration look-alikes), negations or heading
+# keywords ("part", "section", "chapter"), so filler never matches a rule
+FILLER_WORDS = (
+    "aircraft crew flight operation procedure pilot commander checklist briefing weather "
+    "fuel planning dispatch maintenance inspection record manual revision company "
+    "passenger cabin safety equipment training recurrent qualification landing takeoff "
+    "helipad route altitude visibility minima daylight night radio communication "
+    "navigation chart performance mass balance loading handling ground refuelling "
+    "emergency evacuation oxygen survival document library amendment distribution "
+    "responsible manager nominated person oversight audit finding corrective action "
+    "the a of to and in for with by on at from is are shall should may be each all any "
+    "this that which when before after during under within their its"
+).split()
+TOPICS = ["Flight Preparation", "Ground Handling", "Crew Composition", "Fuel Policy",
+          "Weather Minima", "Cabin Safety", "Maintenance Control", "Emergency Procedures",
+          "Document Control", "Training Programme", "Navigation Equipment", "Performance Data"]
+
+
+# ====== Corpus generation ======
+def filler_paragraph(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 5)):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(8, 20))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def filler_table(rng: random.Random) -> list:
+    cols = rng.randint(3, 5)
+    return [[" ".join(rng.choices(FILLER_WORDS, k=rng.randint(1, 4))).capitalize() for _ in range(cols)]
+            for _ in range(rng.randint(3, 8))]
+
+
+def synthetic_rules(n_rules: int, sections: dict, fleet: list, rng: random.Random) -> tuple:
+    """
+    Rules in the brook_semantic_rules.json schema plus what to plant for them.
+    sections: doc_key → list of section titles. The fleet paragraph lives in the
+    first section of the first document.
+    Returns (rules, plants [(doc_key, section_no, sentence)], expected {rule_id: decision}).
+    """
+    doc_keys = list(sections)
+    fleet_doc = doc_keys[0]
+    kinds = ["affirm", "limit", "deny", "align_with_opspecs", "legacy"]
+    rules, plants, expected = [], [], {}
+    for i in range(n_rules):
+        rid = f"BENCH-{i:05d}"
+        kind = kinds[i % len(kinds)]
+        doc = rng.choice(doc_keys)
+        sec = rng.randrange(len(sections[doc]))
+        source_docs = [doc] + rng.sample([k for k in doc_keys if k != doc], min(len(doc_keys) - 1, rng.randint(0, 2)))
+        positive = f"Procedure PX{i:05d} is established for this operation."
+        forbidden = f"Authorisation FX{i:05d} is granted for all missions."
+
+        if kind == "legacy":
+            plant = rng.choice(["positive", "none"])
+            rule = {"id": rid, "item": f"Synthetic legacy rule {i}", "source_docs": source_docs,
+                    "checks": [{"type": "contains_any", "patterns": [f"Procedure PX{i:05d} is established"]}]}
+        else:
+            plant = rng.choice(["forbidden", "none"] if kind == "deny" else
+                               ["positive", "positive", "forbidden", "none"] +
+                               (["extra_registration"] if kind == "align_with_opspecs" else []))
+            rule = {
+                "id": rid,
+                "category": "Benchmark",
+                "rule_type": kind,
+                "item": f"Synthetic {kind} rule {i}",
+                "source_docs": source_docs,
+                "forbidden_claims": [f"\\bAuthori[sz]ation FX{i:05d} (is )?granted\\b"],
+                "conflict_policy": "review_on_conflict",
+                "evidence_return": "sentence",
+            }
+            if kind != "deny":
+                rule["positive_patterns"] = [f"\\bProcedure PX{i:05d} is established\\b",
+                                             f"\\bPX{i:05d} (procedure|process) applies\\b"]
+                rule["negative_patterns"] = [f"\\bPX{i:05d} (withdrawn|suspended)\\b"]
+                rule["threshold"] = 1
+            if kind == "align_with_opspecs":
+                # The fleet paragraph must be visible to align rules: no section scoping
+                if fleet_doc not in source_docs:
+                    source_docs.append(fleet_doc)
+                regs = fleet[:-1] if plant == "extra_registration" else list(fleet)
+                rule["ops_facts"] = {"registrations": regs}
+            elif rng.random() < 0.5:
+                rule["anchor_sections"] = [sections[doc][sec]]
+                rule["scope"] = rng.choice(["section", "sentence"])
+
+        if plant == "positive":
+            plants.append((doc, sec, positive))
+        elif plant == "forbidden":
+            plants.append((doc, sec, forbidden))
+        expected[rid] = {"positive": "FOUND", "forbidden": "CONFLICT",
+                         "extra_registration": "CONFLICT"}.get(plant, "MISSING")
+        rules.append(rule)
+    return rules, plants, expected
+
+
+def generate_corpus(work_dir, docs: int = 4, paragraphs: int = 400, tables: int = 5, rules: int = 40,
+                    registrations: int = 4, formats=("docx", "pdf"), seed: int = 1) -> dict:
+    """
+    Write the synthetic manuals and rules JSON into work_dir and return the corpus
+    description {"config", "doc_files", "rules", "expected"} (also saved as corpus.json).
+    """
+    config = {"docs": docs, "paragraphs": paragraphs, "tables": tables, "rules": rules,
+              "registrations": registrations, "formats": list(formats), "seed": seed}
+    work = Path(work_dir)
+    work.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    fleet = [f"4X-B{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(registrations)]
+
+    n_sections = max(1, paragraphs // PARAGRAPHS_PER_SECTION)
+    keys = [f"DOC{d + 1:02d}" for d in range(docs)]
+    sections = {k: [f"{rng.choice(TOPICS)} {k} S{s + 1}" for s in range(n_sections)] for k in keys}
+    rule_list, plants, expected = synthetic_rules(rules, sections, fleet, rng)
+
+    doc_files = {}
+    for d, key in enumerate(keys):
+        # Filler paragraphs and tables spread over the sections, then the plants
+        body = [{"title": t, "paras": [], "tables": []} for t in sections[key]]
+        for _ in range(paragraphs):
+            rng.choice(body)["paras"].append(filler_paragraph(rng))
+        for _ in range(tables):
+            rng.choice(body)["tables"].append(filler_table(rng))
+        if d == 0:
+            body[0]["paras"].insert(0, "Company aircraft: " + ", ".join(fleet) + ".")
+        for doc, sec, sentence in plants:
+            if doc == key:
+                if rng.random() < TABLE_PLANT_SHARE:
+                    # Evidence in a table cell (registration lists, limitation tables)
+                    body[sec]["tables"].append([["Item", "Statement"], [f"{len(body[sec]['tables']) + 1}", sentence]])
+                else:
+                    paras = body[sec]["paras"]
+                    paras.insert(rng.randint(0, len(paras)), sentence)
+        blocks = []
+        for s, sec in enumerate(body, 1):
+            blocks.append(("heading", f"{s}. {sec['title']}"))
+            blocks.extend(("para", p) for p in sec["paras"])
+            for t in sec["tables"]:
+                blocks.insert(rng.randint(len(blocks) - len(sec["paras"]), len(blocks)), ("table", t))
+        fmt = formats[d % len(formats)]
+        path = work / f"{key}.{fmt}"
+        WRITERS[fmt](path, blocks)
+        doc_files[key] = str(path)
+
+    rules_path = work / "bench_rules.json"
+    rules_path.write_text(json.dumps(rule_list, indent=1), encoding="utf-8")
+    corpus = {"config": config, "doc_files": doc_files, "rules": str(rules_path), "expected": expected}
+    (work / "corpus.json").write_text(json.dumps(corpus, indent=1), encoding="utf-8")
+    return corpus
+
+
+def load_or_generate(work_dir, **config) -> dict:
+    """
+    Reuse the corpus in work_dir if it was generated with the same configuration.
+    """
+    path = Path(work_dir) / "corpus.json"
+    try:
+        corpus = json.loads(path.read_text(encoding="utf-8"))
+        wanted = dict(config, formats=list(config.get("formats", ())))
+        if corpus["config"] == wanted and all(Path(p).is_file() for p in corpus["doc_files"].values()):
+            return corpus
+    except Exception:
+        pass
+    if Path(work_dir).is_dir():
+        shutil.rmtree(work_dir)
+    return generate_corpus(work_dir, **config)
+
+
+# ---- Writers (blocks: ("heading", text) / ("para", text) / ("table", rows)) ----
+def write_docx(path: Path, blocks: list):
+    from docx import Document
+    d = Document()
+    for kind, content in blocks:
+        if kind == "heading":
+            d.add_heading(content, level=1)
+        elif kind == "para":
+            d.add_paragraph(content)
+        else:
+            table = d.add_table(rows=len(content), cols=len(content[0]))
+            for r, row in enumerate(content):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+    d.save(str(path))
+
+
+def text_lines(blocks: list, width: int | None = None) -> list:
+    """
+    Blocks as text lines (paragraphs wrapped to `width` if given; table rows as "a | b | c").
+    """
+    lines = []
+    for kind, content in blocks:
+        if kind == "table":
+            lines.extend(" | ".join(row) for row in content)
+        elif kind == "para" and width:
+            lines.extend(textwrap.wrap(content, width, break_on_hyphens=False) or [""])
+        else:
+            lines.append(content)
+    return lines
+
+
+def write_txt(path: Path, blocks: list):
+    path.write_text("\n".join(text_lines(blocks)) + "\n", encoding="utf-8")
+
+
+def _pdf_string(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, blocks: list, lines_per_page: int = PDF_LINES_PER_PAGE):
+    """
+    A minimal text-only PDF (Helvetica, one text object per page), readable by PyPDF2.
+    """
+    lines = text_lines(blocks, PDF_LINE_CHARS)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>",
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    for i, page in enumerate(pages):
+        content = ("BT /F1 9 Tf 12 TL 36 806 Td "
+                   + " ".join(f"({_pdf_string(line)}) Tj T*" for line in page) + " ET").encode("latin-1", "replace")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objs.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+WRITERS = {"docx": write_docx, "pdf": write_pdf, "txt": write_txt}
+
+
+# ====== Timed runs ======
+def run_once(corpus: dict, workers: int = 0, sectioned: bool = True, options: dict | None = None,
+             eval_workers: int = 1) -> tuple:
+    """
+    One pass over the pipeline. Returns (stage seconds, report rows, corpus chars).
+    options: extraction options (doc_extract.extract_options), e.g. the PDF backend.
+    eval_workers: rule evaluation processes (shared_corpus.py; 1 = serial).
+    """
+    prof = RunProfile()
+    doc_files = corpus["doc_files"]
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        with prof.stage("extract"):
+            records = extract_documents_parallel(doc_files, workers=workers or None, options=options)
+        cache = ExtractionCache(Path(tmp) / "cache", version=EXTRACTOR_VERSION, versions=cache_versions(options))
+        for key, rec in records.items():
+            cache.put(Path(doc_files[key]), rec)
+        with prof.stage("extract_cached"):
+            extract_documents_parallel(doc_files, workers=workers or None, cache=cache, options=options)
+
+        rules = json.loads(Path(corpus["rules"]).read_text(encoding="utf-8"))
+        with prof.stage("compile"):
+            compiled = compile_rules(rules, strict=False)
+        store = LazyDocStore(doc_files)
+        store.preload(records)
+        with prof.stage("evaluate"):
+            if eval_workers != 1:
+                evaluated = evaluate_parallel(compiled, store, eval_workers or os.cpu_count() or 1,
+                                              sectioned=sectioned)
+            else:
+                evaluated = compiled.evaluate(store, sectioned=sectioned, rule_timeout=None)
+            rows = [report_row(cr.rule, outcome) for cr, outcome in evaluated]
+        with prof.stage("export"):
+            export_report(rows, str(Path(tmp) / "bench_report.xlsx"))
+    return prof.stages, rows, sum(len(r["text"]) for r in records.values())
+
+
+def check_rows(rows: list, expected: dict) -> list:
+    """
+    Rules whose decision differs from the planted expectation.
+    """
+    return [{"rule_id": r["Rule ID"], "expected": expected.get(r["Rule ID"]), "got": r["Result"]}
+            for r in rows if r["Result"] != expected.get(r["Rule ID"])]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_benchmark(work_dir: str = DEFAULT_WORK_DIR, repeat: int = 3, workers: int = 0,
+                  sectioned: bool = True, pdf_backend: str = DEFAULT_PDF_BACKEND, pdf_layout: bool = False,
+                  eval_workers: int = 1, **config) -> dict:
+    """
+    Generate (or reuse) the corpus, run the pipeline `repeat` times and return the
+    result entry: best-of-N stage timings plus the correctness check of the last run.
+    """
+    t0 = time.perf_counter()
+    corpus = load_or_generate(work_dir, **config)
+    generate_s = time.perf_counter() - t0
+    options = extract_options(pdf_backend, pdf_layout)
+    runs = []
+    for _ in range(max(1, repeat)):
+        stages, rows, chars = run_once(corpus, workers=workers, sectioned=sectioned, options=options,
+                                       eval_workers=eval_workers)
+        runs.append(stages)
+    mismatches = check_rows(rows, corpus["expected"])
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": dict(corpus["config"], repeat=repeat, workers=workers, eval_workers=eval_workers,
+                       sectioned=sectioned, pdf_backend=options["pdf_backend"], pdf_layout=options["pdf_layout"]),
+        "corpus_chars": chars,
+        "generate_s": round(generate_s, 3),
+        "stages": {s: round(min(r.get(s, 0.0) for r in runs), 6) for s in STAGES},
+        "stages_all": [{s: round(r.get(s, 0.0), 6) for s in STAGES} for r in runs],
+        "correct": not mismatches,
+        "mismatches": mismatches[:50],
+    }
+
+
+# ====== Results history ======
+def previous_result(results_path, config: dict) -> dict | None:
+    """
+    Last stored result with the same configuration (None if there is none).
+    """
+    path = Path(results_path)
+    if not path.is_file():
+        return None
+    last = None
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get("config") == config:
+            last = entry
+    return last
+
+
+def compare(result: dict, previous: dict | None, regress_pct: float) -> list:
+    """
+    Stages slower than the previous run by more than regress_pct percent.
+    """
+    if previous is None:
+        return []
+    slower = []
+    for s in STAGES:
+        new, old = result["stages"].get(s, 0.0), previous["stages"].get(s, 0.0)
+        if old and new - old >= REGRESS_MIN_SECONDS and new > old * (1 + regress_pct / 100):
+            slower.append(f"{s}: {old:.3f}s → {new:.3f}s (+{100 * (new - old) / old:.0f}%)")
+    return slower
+
+
+def append_result(results_path, result: dict):
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the compliance pipeline on synthetic manuals")
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="small",
+                    help="corpus size; the options below override it (default: %(default)s)")
+    for name, what in [("docs", "documents"), ("paragraphs", "paragraphs per document"),
+                       ("tables", "tables per document"), ("rules", "rules"),
+                       ("registrations", "fleet registrations")]:
+        ap.add_argument(f"--{name}", type=int, default=None, help=f"number of {what}")
+    ap.add_argument("--formats", default="docx,pdf", help="document formats, cycled (docx, pdf, txt)")
+    ap.add_argument("--seed", type=int, default=1, help="corpus random seed (default: %(default)s)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs; the best is kept (default: %(default)s)")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="extraction processes (0 = one per core, 1 = serial; default: %(default)s)")
+    ap.add_argument("--eval-workers", type=int, default=1,
+                    help="rule evaluation processes (0 = one per core; default: %(default)s = serial)")
+    ap.add_argument("--no-sections", action="store_true", help="ignore anchor_sections")
+    ap.add_argument("--pdf-backend", choices=BACKEND_CHOICES, default=DEFAULT_PDF_BACKEND,
+                    help="PDF text engine (default: %(default)s)")
+    ap.add_argument("--pdf-layout", action="store_true", help="layout-preserving PDF text")
+    ap.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="corpus folder (default: %(default)s)")
+    ap.add_argument("--results", default=DEFAULT_RESULTS, help="results history, JSON lines (default: %(default)s)")
+    ap.add_argument("--regress-pct", type=float, default=20.0,
+                    help="flag stages slower than the previous run by this much (default: %(default)s%%)")
+    args = ap.parse_args(argv)
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown or not formats:
+        ap.error(f"unsupported format(s): {', '.join(unknown) or '(none)'}")
+    args.formats = formats
+    try:
+        extract_options(args.pdf_backend, args.pdf_layout)
+    except ValueError as e:
+        ap.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = dict(PRESETS[args.preset], formats=args.formats, seed=args.seed)
+    for name in ("docs", "paragraphs", "tables", "rules", "registrations"):
+        if getattr(args, name) is not None:
+            config[name] = getattr(args, name)
+    result = run_benchmark(args.work_dir, repeat=args.repeat, workers=args.workers,
+                           sectioned=not args.no_sections, pdf_backend=args.pdf_backend,
+                           pdf_layout=args.pdf_layout, eval_workers=args.eval_workers, **config)
+    regressions = compare(result, previous_result(args.results, result["config"]), args.regress_pct)
+    append_result(args.results, result)
+
+    print(f"[bench] {result['corpus_chars']:,} chars, {config['rules']} rules, commit {result['commit'] or '-'}")
+    for s in STAGES:
+        print(f"[bench] {s:15s} {result['stages'][s]:8.3f}s")
+    for msg in regressions:
+        print(f"[bench] REGRESSION {msg}", file=sys.stderr)
+    for m in result["mismatches"]:
+        print(f"[bench] WRONG {m['rule_id']}: expected {m['expected']}, got {m['got']}", file=sys.stderr)
+    if not result["correct"]:
+        sys.exit(1)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Boundary index — token and sentence boundaries as sorted offset arrays
+----------------------------------------------------------------------
+Rules declare "negation_window_tokens", "scope": "sentence" and
+"evidence_return": "sentence", but the engine sliced ±6 characters per token around
+every positive hit, re-ran the negative patterns on the copy, and returned a fixed
+±120-character snippet (split_sentences was never called). A BoundaryIndex holds,
+per document, built once on first use:
+
+- token_starts / token_ends: every whitespace-delimited token
+- sentence_starts: the start of every sentence (SENT_SPLIT, as split_sentences)
+  plus every paragraph (DOCX segment starts; blank lines in PDF / text)
+
+so the negation window of a hit (its N real tokens on either side, clipped to its
+sentence for sentence-scoped rules) and the sentence around a match are bisects.
+The negative patterns then run in place over the window (re's pos/endpos): cost per
+hit is bounded by the window, not by the document, and nothing is copied.
+
+ViewBoundaries answers the same questions in text_view.TextView offsets by mapping
+each offset onto its document's index (windows never leave the view piece, i.e. the
+document or section the rule searched).
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Sentence end: ".", "!" or "?" followed by whitespace and a capital / "("
+SENT_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z(])")
+TOKEN = re.compile(r"\S+")
+BLANK_LINE = re.compile(r"\n[ \t]*\n")
+
+
+class BoundaryIndex:
+    """
+    Token and sentence boundaries of one text.
+    paragraph_starts: known paragraph offsets (DOCX segment starts); blank lines otherwise.
+    """
+
+    __slots__ = ("text", "token_starts", "token_ends", "sentence_starts")
+
+    def __init__(self, text: str, paragraph_starts=None):
+        self.text = text
+        self.token_starts, self.token_ends = array("i"), array("i")
+        for m in TOKEN.finditer(text):
+            self.token_starts.append(m.start())
+            self.token_ends.append(m.end())
+        starts = {0}
+        starts.update(m.end() for m in SENT_SPLIT.finditer(text))
+        if paragraph_starts is not None:
+            starts.update(paragraph_starts)
+        else:
+            starts.update(m.end() for m in BLANK_LINE.finditer(text))
+        self.sentence_starts = array("i", sorted(starts))
+
+    @classmethod
+    def of_record(cls, record: dict) -> "BoundaryIndex":
+        """
+        Index of an extraction record (doc_extract.py), using its DOCX paragraph starts.
+        """
+        loc = record.get("locations")
+        return cls(record["text"], loc["start"] if loc and loc["start"] else None)
+
+    def token_window(self, start: int, end: int, n: int) -> tuple:
+        """
+        [a, b) covering a match [start, end) and up to n whole tokens on either side.
+        """
+        a, b = start, end
+        if n > 0:
+            before = bisect_right(self.token_ends, start)  # tokens ending at or before start
+            if before:
+                a = min(a, self.token_starts[max(0, before - n)])
+            after = bisect_left(self.token_starts, end)    # first token starting at or after end
+            if after < len(self.token_starts):
+                b = max(b, self.token_ends[min(len(self.token_ends) - 1, after + n - 1)])
+        return a, b
+
+    def sentence_span(self, start: int, end: int) -> tuple:
+        """
+        [a, b) of the sentence(s) containing a match [start, end).
+        """
+        starts = self.sentence_starts
+        a = starts[bisect_right(starts, start) - 1]
+        j = bisect_right(starts, max(start, end - 1))
+        return a, starts[j] if j < len(starts) else len(self.text)
+
+    def has_match(self, regex, a: int, b: int) -> bool:
+        """
+        Whether the regex matches inside [a, b) (searched in place).
+        """
+        return regex.search(self.text, a, b) is not None
+
+
+class ViewBoundaries:
+    """
+    BoundaryIndex queries in TextView offsets. index_of(doc_key) returns the
+    BoundaryIndex of a document (e.g. doc_store.LazyDocStore.boundaries).
+    """
+
+    __slots__ = ("view", "index_of")
+
+    def __init__(self, view, index_of):
+        self.view = view
+        self.index_of = index_of
+
+    def _piece(self, offset: int) -> tuple:
+        """
+        (index, piece start / end in the document, piece start in the view).
+        """
+        i = self.view.piece_at(offset)
+        key, _, s, e = self.view.pieces[i]
+        return self.index_of(key), s, e, self.view.starts[i]
+
+    def token_window(self, start: int, end: int, n: int) -> tuple:
+        idx, s, e, st = self._piece(start)
+        a, b = idx.token_window(s + start - st, min(e, s + end - st), n)
+        return st + max(a, s) - s, max(end, st + min(b, e) - s)
+
+    def sentence_span(self, start: int, end: int) -> tuple:
+        idx, s, e, st = self._piece(start)
+        a, b = idx.sentence_span(s + start - st, min(e, s + end - st))
+        return st + max(a, s) - s, max(end, st + min(b, e) - s)
+
+    def has_match(self, regex, a: int, b: int) -> bool:
+        idx, s, e, st = self._piece(a)
+        return regex.search(idx.text, s + a - st, s + min(b - st, e - s)) is not None
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+Document text extraction (DOCX / PDF / TXT / MD)
+------------------------------------------------
+Kept in its own module so worker processes (parallel_extract.py) can import the
+extractors without pulling in the report/CLI code of run_compliance_check_semantic.
+
+iter_document() streams a document as segments — one per DOCX paragraph, PDF page or
+text line — each with stable coordinates:
+  {"page": int | None, "paragraph": int | None, "level": int, "text": str}
+(page is 1-based for PDFs, paragraph is 1-based for DOCX/TXT, level > 0 marks a
+DOCX heading-styled paragraph). DOCX segments also carry "loc" (see below).
+
+DOCX files are read in body order, including what Document.paragraphs misses: table
+cells (nested tables too), content controls (except generated TOCs), text boxes and, after the body, the
+distinct headers and footers. Each paragraph (or non-empty cell paragraph) is one
+segment, with its location: part (body / header / footer / textbox), table ordinal,
+row and cell, and an approximate page counted from Word's rendered page breaks.
+
+extract_document() assembles the segments into a record:
+  {"text": str, "headings": [[offset, level, title], ...], "pages": [offset, ...],
+   "locations": {"start": [offset, ...],                               # DOCX only
+                 "runs": [[segment, part, table, row, col, page], ...]}}
+where "pages" holds the offset of every PDF page in the text. "locations" is a
+compact offset table: the start of every DOCX segment (segment i is paragraph i + 1)
+and run-length encoded locations — a run starts at a segment index and holds until
+the next run (a table cell, a stretch of body text on one page). Both are plain int
+lists, so the record goes into the extraction cache as is. Numbered headings in
+plain text are detected later by sectionizer.py. text_coordinates() maps an offset
+back to (page, paragraph), text_location() to the full location.
+load_text_from_doc() returns just the text.
+
+PDF pages come from a pluggable backend (pdf_backends.py: PyPDF2 by default, pypdf,
+pdfminer.six or PyMuPDF, optionally in layout mode), chosen through an options dict
+(extract_options()) that every extraction function accepts and that is passed on to
+worker processes. extractor_version(options) keys cached PDF records per backend/mode
+(cache_versions(options)); DOCX and text records do not depend on the backend.
+"""
+
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+from pdf_backends import DEFAULT_PDF_BACKEND, check_backend, get_backend
+
+# Bump whenever extract_document changes its output, so cached records are re-extracted
+EXTRACTOR_VERSION = "4"
+
+# "Heading 2", "heading 3 Char", "Title" (python-docx style names)
+HEADING_STYLE = re.compile(r"^(?:heading\s*(\d)|title)\b", re.I)
+
+# DOCX document parts (codes used in record["locations"]["part"])
+PARTS = ["body", "header", "footer", "textbox"]
+BODY, HEADER, FOOTER, TEXTBOX = range(4)
+# Fields of a location run after its first segment index
+RUN_FIELDS = ("part", "table", "row", "col", "page")
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+W_P, W_TBL, W_TR, W_TC = (f"{{{W_NS}}}{t}" for t in ("p", "tbl", "tr", "tc"))
+W_SDT, W_SDT_CONTENT, W_CUSTOM_XML = (f"{{{W_NS}}}{t}" for t in ("sdt", "sdtContent", "customXml"))
+W_TXBX, W_BR, W_TYPE = f"{{{W_NS}}}txbxContent", f"{{{W_NS}}}br", f"{{{W_NS}}}type"
+W_RENDERED_BREAK, W_BREAK_BEFORE = f"{{{W_NS}}}lastRenderedPageBreak", f"{{{W_NS}}}pageBreakBefore"
+W_VAL = f"{{{W_NS}}}val"
+W_DOC_PART_GALLERY = f"{{{W_NS}}}sdtPr/{{{W_NS}}}docPartObj/{{{W_NS}}}docPartGallery"
+
+
+def empty_record() -> dict:
+    return {"text": "", "headings": [], "pages": []}
+
+
+def segment(text: str, page: int | None = None, paragraph: int | None = None, level: int = 0,
+            loc: dict | None = None) -> dict:
+    seg = {"page": page, "paragraph": paragraph, "level": level, "text": text}
+    if loc is not None:
+        seg["loc"] = loc
+    return seg
+
+
+def heading_level(style_name: str) -> int:
+    """
+    Outline level of a DOCX style name (0 = not a heading style).
+    """
+    m = HEADING_STYLE.match((style_name or "").strip())
+    if not m:
+        return 0
+    return int(m.group(1)) if m.group(1) else 1
+
+
+def docx_heading_level(paragraph) -> int:
+    """
+    Outline level of a python-docx paragraph from its style name (0 = not a heading).
+    """
+    try:
+        return heading_level(paragraph.style.name or "")
+    except Exception:
+        return 0
+
+
+class DocxWalker:
+    """
+    Walks a python-docx Document in reading order and yields paragraph segments with
+    their locations. Style levels are resolved from a style-id table built once
+    (python-docx resolves every paragraph's style by scanning the styles part).
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.levels = {s.style_id: heading_level(s.name) for s in document.styles}
+        self.paragraphs = 0
+        self.tables = 0
+        self.page = 1
+        # Word records where it broke pages at last save; without those, use hard breaks
+        self.rendered = next(document.element.body.iter(W_RENDERED_BREAK), None) is not None
+
+    def __iter__(self):
+        yield from self.blocks(self.document.element.body, BODY)
+        seen = set()
+        for section in self.document.sections:
+            for part, attrs in ((HEADER, ("header", "first_page_header", "even_page_header")),
+                                (FOOTER, ("footer", "first_page_footer", "even_page_footer"))):
+                for attr in attrs:
+                    try:
+                        hf = getattr(section, attr)
+                        if hf.is_linked_to_previous:
+                            continue  # no definition of its own (and asking for one would add it)
+                        element = hf.part.element
+                    except Exception:
+                        continue
+                    if id(element) not in seen:
+                        seen.add(id(element))
+                        yield from self.blocks(element, part)
+
+    def blocks(self, container, part: int, cell: tuple | None = None):
+        """
+        Segments of the block-level children of a body, cell, header or text box.
+        """
+        for el in container.iterchildren():
+            if el.tag == W_P:
+                yield from self.paragraph(el, part, cell)
+            elif el.tag == W_TBL:
+                yield from self.table(el, part)
+            elif el.tag == W_SDT:
+                gallery = el.find(W_DOC_PART_GALLERY)
+                if gallery is not None and gallery.get(W_VAL, "").startswith("Table of Contents"):
+                    continue  # a generated TOC is not evidence, and its lines look like headings
+                content = el.find(W_SDT_CONTENT)
+                if content is not None:
+                    yield from self.blocks(content, part, cell)
+            elif el.tag == W_CUSTOM_XML:
+                yield from self.blocks(el, part, cell)
+
+    def table(self, tbl, part: int):
+        self.tables += 1
+        t = self.tables
+        for r, tr in enumerate(tbl.iterchildren(W_TR), 1):
+            for c, tc in enumerate(tr.iterchildren(W_TC), 1):
+                yield from self.blocks(tc, part, (t, r, c))
+
+    def paragraph(self, p, part: int, cell: tuple | None):
+        from docx.text.paragraph import Paragraph
+        if part == BODY and not self.rendered:
+            before = p.find(f"{{{W_NS}}}pPr/{W_BREAK_BEFORE}")
+            if before is not None and before.get(W_VAL, "1").lower() not in ("0", "false", "off"):
+                self.page += 1
+        page = self.page if part in (BODY, TEXTBOX) else 0
+        if part == BODY:
+            if self.rendered:
+                self.page += sum(1 for _ in p.iter(W_RENDERED_BREAK))
+            else:
+                self.page += sum(1 for br in p.iter(W_BR) if br.get(W_TYPE) == "page")
+        text = Paragraph(p, None).text
+        if cell is None or text.strip():
+            self.paragraphs += 1
+            t, r, c = cell or (0, 0, 0)
+            level = self.levels.get(p.style, 0) if part == BODY and cell is None else 0
+            yield segment(text, paragraph=self.paragraphs, level=level,
+                          loc={"part": part, "table": t, "row": r, "col": c, "page": page})
+        for box in p.iter(W_TXBX):
+            # A text box is stored twice (DrawingML + VML fallback); read it once
+            if not any(a.tag == MC_FALLBACK for a in box.iterancestors()):
+                yield from self.blocks(box, TEXTBOX)
+
+
+def iter_docx_paragraphs(path: Path):
+    """
+    Paragraph segments of a DOCX file (python-docx) in reading order: body paragraphs
+    and tables, text boxes, then headers and footers (see DocxWalker).
+    """
+    from docx import Document
+    yield from DocxWalker(Document(str(path)))
+
+
+def load_docx_record(path: Path) -> dict:
+    """
+    Text of a DOCX file (python-docx), one paragraph / table-cell paragraph per line,
+    plus heading offsets and the location table.
+    """
+    return record_from_segments(iter_docx_paragraphs(path))
+
+
+def iter_text_lines(path: Path):
+    """
+    Line segments of a TXT/MD file, read incrementally. Joining the segments with
+    "\n" gives exactly the file text (a trailing newline yields a last empty line).
+    """
+    n, line = 0, ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for n, line in enumerate(f, 1):
+            yield segment(line[:-1] if line.endswith("\n") else line, paragraph=n)
+    if n == 0 or line.endswith("\n"):
+        yield segment("", paragraph=n + 1)
+
+
+def extract_options(pdf_backend: str | None = None, pdf_layout: bool = False) -> dict:
+    """
+    Normalized extraction options (picklable, passed to worker processes):
+    {"pdf_backend": concrete backend name, "pdf_layout": bool}.
+    Raises ValueError for an unknown backend, one without layout mode, or an explicitly
+    chosen backend that is not installed.
+    """
+    if (pdf_backend or DEFAULT_PDF_BACKEND) == DEFAULT_PDF_BACKEND:
+        backend = get_backend(pdf_backend, pdf_layout)
+    else:
+        backend = check_backend(pdf_backend, pdf_layout)
+    return {"pdf_backend": backend.name, "pdf_layout": bool(pdf_layout)}
+
+
+def extractor_version(options: dict | None = None) -> str:
+    """
+    Cache version of records extracted with these options (EXTRACTOR_VERSION for the
+    default PyPDF2 text, so existing caches stay valid).
+    """
+    options = options or {}
+    backend = options.get("pdf_backend") or DEFAULT_PDF_BACKEND
+    if backend == DEFAULT_PDF_BACKEND and not options.get("pdf_layout"):
+        return EXTRACTOR_VERSION
+    return f"{EXTRACTOR_VERSION}+{backend}" + ("-layout" if options.get("pdf_layout") else "")
+
+
+def cache_versions(options: dict | None = None) -> dict:
+    """
+    Per-suffix cache versions for these options (extraction_cache.ExtractionCache
+    `versions`): only PDF records carry the backend / layout variant.
+    """
+    version = extractor_version(options)
+    return {".pdf": version} if version != EXTRACTOR_VERSION else {}
+
+
+def pdf_page_count(path: Path, options: dict | None = None) -> int:
+    """
+    Number of pages in a PDF, or 0 if it cannot be opened.
+    """
+    options = options or {}
+    try:
+        return get_backend(options.get("pdf_backend")).page_count(Path(path))
+    except Exception:
+        return 0
+
+
+def iter_pdf_pages(path: Path, start: int = 0, stop: int | None = None, options: dict | None = None):
+    """
+    Page segments of PDF pages [start, stop) via the selected backend (pdf_backends.py),
+    yielded as each page is parsed. A page that fails to extract yields "" so page
+    numbering stays stable.
+    """
+    options = options or {}
+    backend = get_backend(options.get("pdf_backend"), options.get("pdf_layout", False))
+    for i, text in enumerate(backend.iter_pages(Path(path), start, stop, options.get("pdf_layout", False)), start):
+        yield segment(text, page=i + 1)
+
+
+def load_pdf_pages(path: Path, start: int = 0, stop: int | None = None, options: dict | None = None) -> list:
+    """
+    Text of PDF pages [start, stop), one string per page.
+    """
+    return [seg["text"] for seg in iter_pdf_pages(path, start, stop, options)]
+
+
+def iter_document(path: Path, options: dict | None = None):
+    """
+    Stream a DOCX/PDF/TXT/MD document as segments (see module docstring), with the
+    backend chosen for its format (options: see extract_options).
+    Unsupported or missing files yield nothing; read errors propagate.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    lower = path.suffix.lower()
+    if lower == ".docx":
+        yield from iter_docx_paragraphs(path)
+    elif lower == ".pdf":
+        yield from iter_pdf_pages(path, options=options)
+    elif lower in [".txt", ".md"]:
+        yield from iter_text_lines(path)
+
+
+def record_from_segments(segments) -> dict:
+    """
+    Assemble streamed segments into an extraction record (segments joined by "\n").
+    """
+    parts, headings, pages = [], [], []
+    locations = None
+    offset = 0
+    for seg in segments:
+        t = seg["text"]
+        if seg.get("page") is not None:
+            pages.append(offset)
+        if seg.get("level") and t.strip():
+            headings.append([offset, seg["level"], t.strip()])
+        if seg.get("loc") is not None:
+            if locations is None:
+                locations = {"start": [], "runs": []}
+            run = [seg["loc"].get(f) or 0 for f in RUN_FIELDS]
+            if not locations["runs"] or locations["runs"][-1][1:] != run:
+                locations["runs"].append([len(locations["start"])] + run)
+            locations["start"].append(offset)
+        parts.append(t)
+        offset += len(t) + 1
+    record = {"text": "\n".join(parts), "headings": headings, "pages": pages}
+    if locations is not None:
+        record["locations"] = locations
+    return record
+
+
+def text_coordinates(record: dict, offset: int) -> tuple:
+    """
+    (page, paragraph) of a character offset in a record's text: the 1-based PDF page
+    (None for unpaginated documents) and the 1-based line within that page (for DOCX
+    and TXT, the paragraph/line number in the document).
+    """
+    pages = record.get("pages") or []
+    i = bisect_right(pages, offset) - 1
+    base = pages[i] if i >= 0 else 0
+    return (i + 1 if pages else None), record["text"].count("\n", base, offset) + 1
+
+
+def text_location(record: dict, offset: int) -> dict:
+    """
+    Location of a character offset: {"page", "paragraph"} as text_coordinates(), and
+    for DOCX records the paragraph ordinal, approximate page (None in headers/footers),
+    "part" and, inside a table, "table" / "row" / "col" (1-based).
+    """
+    loc = record.get("locations")
+    if not loc or not loc["start"]:
+        page, paragraph = text_coordinates(record, offset)
+        return {"page": page, "paragraph": paragraph}
+    i = max(0, bisect_right(loc["start"], offset) - 1)
+    _, part, table, row, col, page = loc["runs"][bisect_right(loc["runs"], i, key=lambda r: r[0]) - 1]
+    out = {"page": page or None, "paragraph": i + 1, "part": PARTS[part]}
+    if table:
+        out.update(table=table, row=row, col=col)
+    return out
+
+
+def non_body_spans(record: dict) -> list:
+    """
+    [start, end) text spans of DOCX table cells, headers, footers and text boxes
+    (numbered-heading detection ignores lines there; see sectionizer.SectionIndex).
+    """
+    loc = record.get("locations")
+    if not loc:
+        return []
+    spans = []
+    runs = loc["runs"]
+    for j, (first, part, table, _, _, _) in enumerate(runs):
+        if part == BODY and not table:
+            continue
+        start = loc["start"][first]
+        end = loc["start"][runs[j + 1][0]] if j + 1 < len(runs) else len(record["text"])
+        if spans and spans[-1][1] >= start - 1:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    return spans
+
+
+def extract_document(path: Path, options: dict | None = None) -> dict:
+    """
+    Load a text record from DOCX/PDF/TXT/MD.
+    - For DOCX use python-docx (paragraphs, tables, text boxes, headers/footers + heading styles)
+    - For PDF use the selected backend (PyPDF2 by default; see pdf_backends.py)
+    - Fail silently and return an empty record if the file cannot be read
+    """
+    try:
+        return record_from_segments(iter_document(path, options))
+    except Exception:
+        return empty_record()
+
+
+def load_text_from_doc(path: Path, options: dict | None = None) -> str:
+    """
+    Load plain text from DOCX/PDF/TXT/MD ("" if the file cannot be read).
+    """
+    return extract_document(path, options)["text"]
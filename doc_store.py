@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy document store
+-------------------
+Rules name the manuals they need in "source_docs", and many mapped documents
+(SMS, ERP today) are never referenced at all. Instead of extracting every entry
+of the document map up front, the store extracts a document the first time a
+rule asks for it and can release it after its last use.
+
+Each loaded document keeps its extraction record (text, heading and page offsets),
+sections(key) builds the document's SectionIndex (sectionizer.py) on demand,
+locator(key) its offset index (evidence_locator.py), boundaries(key) its token /
+sentence index (boundary_index.py), entities(key) its registration / ops_facts term
+index (entity_index.py), and coordinates(key, offset) maps a text offset
+to its page/paragraph/section (and table cell).
+
+prescan_rules() inspects a rule set before anything is extracted so the caller
+can warn about mapped-but-unreferenced documents, referenced keys with no mapping
+and referenced files that do not exist (which would otherwise silently read as "").
+"""
+
+import time
+from functools import partial
+from pathlib import Path
+
+from boundary_index import BoundaryIndex
+from doc_extract import extract_document, non_body_spans
+from entity_index import EntityIndex
+from evidence_locator import DocLocator
+from parallel_extract import extract_documents_parallel
+from rule_engine import DEFAULT_SOURCE_DOCS
+from sectionizer import SectionIndex
+
+
+def rule_source_docs(rule: dict) -> list:
+    """
+    Document keys a rule searches.
+    """
+    return rule.get("source_docs", DEFAULT_SOURCE_DOCS)
+
+
+def prescan_rules(rules: list, doc_files: dict) -> dict:
+    """
+    Report which documents a rule set actually needs.
+
+    Returns a dict:
+      referenced:    doc keys used by at least one rule (first-use order)
+      unreferenced:  mapped keys no rule uses (never extracted)
+      unmapped:      keys used by rules but absent from doc_files
+      missing_files: referenced, mapped keys whose file does not exist
+      last_use:      {doc_key: index of the last rule that needs it}
+    """
+    referenced = {}
+    last_use = {}
+    for i, r in enumerate(rules):
+        for k in rule_source_docs(r):
+            referenced.setdefault(k, i)
+            last_use[k] = i
+    return {
+        "referenced": list(referenced),
+        "unreferenced": [k for k in doc_files if k not in referenced],
+        "unmapped": [k for k in referenced if k not in doc_files],
+        "missing_files": [k for k in referenced if k in doc_files and not Path(doc_files[k]).exists()],
+        "last_use": last_use,
+    }
+
+
+def prescan_warnings(scan: dict, doc_files: dict) -> list:
+    """
+    Human-readable warnings for a prescan_rules() result.
+    """
+    warnings = []
+    for k in scan["missing_files"]:
+        warnings.append(f"{k}: file not found ({doc_files[k]}); rules will see empty text")
+    for k in scan["unmapped"]:
+        warnings.append(f"{k}: referenced by rules but not in the document map")
+    if scan["unreferenced"]:
+        warnings.append("Not referenced by any rule (skipped): " + ", ".join(scan["unreferenced"]))
+    return warnings
+
+
+class LazyDocStore:
+    """
+    Dict-like access to document text, extracted on first use.
+
+    store.get(key, "") mirrors the plain dict the checker used before, so
+    rule evaluation code does not change. `options` selects the extraction
+    backends (doc_extract.extract_options); the cache's version should match it.
+    """
+
+    def __init__(self, doc_files: dict, cache=None, extractor=extract_document, options: dict | None = None):
+        self.doc_files = dict(doc_files)
+        self.cache = cache
+        self.options = options
+        self.extractor = partial(extractor, options=options) if options else extractor
+        self._records = {}
+        self._sections = {}
+        self._locators = {}
+        self._boundaries = {}
+        self._entities = {}
+        self.extracted = []  # keys in extraction order (for diagnostics)
+        self.timings = {}    # doc_key → {"source": "cache" | "extracted", "seconds", "chars"}
+
+    def __contains__(self, key):
+        return key in self.doc_files
+
+    def __getitem__(self, key):
+        if key not in self.doc_files:
+            raise KeyError(key)
+        return self.get(key)
+
+    def record(self, key) -> dict:
+        """
+        Extraction record of a document (extracted on first use).
+        """
+        if key not in self._records:
+            p = Path(self.doc_files[key])
+            t0 = time.perf_counter()
+            hits = self.cache.hits if self.cache is not None else 0
+            if self.cache is not None:
+                self._records[key] = self.cache.get_or_extract(p, self.extractor)
+            else:
+                self._records[key] = self.extractor(p)
+            self.extracted.append(key)
+            self.timings[key] = {"source": "cache" if self.cache is not None and self.cache.hits > hits else "extracted",
+                                 "seconds": time.perf_counter() - t0, "chars": len(self._records[key]["text"])}
+        return self._records[key]
+
+    def get(self, key, default: str = "") -> str:
+        if key not in self.doc_files:
+            return default
+        return self.record(key)["text"]
+
+    def sections(self, key) -> SectionIndex:
+        """
+        Section index of a document (built once per load).
+        """
+        if key not in self._sections:
+            rec = self.record(key) if key in self.doc_files else {"text": "", "headings": []}
+            self._sections[key] = SectionIndex(rec["text"], rec.get("headings"), non_body_spans(rec))
+        return self._sections[key]
+
+    def locator(self, key) -> DocLocator:
+        """
+        Offset index of a document for evidence citations (built once per load).
+        """
+        if key not in self._locators:
+            rec = self.record(key) if key in self.doc_files else {"text": "", "headings": []}
+            self._locators[key] = DocLocator(key, rec, self.sections(key))
+        return self._locators[key]
+
+    def boundaries(self, key) -> BoundaryIndex:
+        """
+        Token and sentence boundaries of a document (built once per load).
+        """
+        if key not in self._boundaries:
+            rec = self.record(key) if key in self.doc_files else {"text": ""}
+            self._boundaries[key] = BoundaryIndex.of_record(rec)
+        return self._boundaries[key]
+
+    def entities(self, key) -> EntityIndex:
+        """
+        Registrations and ops_facts term offsets of a document (built once per load).
+        """
+        if key not in self._entities:
+            self._entities[key] = EntityIndex(self.get(key, ""))
+        return self._entities[key]
+
+    def coordinates(self, key, offset: int) -> dict:
+        """
+        Stable coordinates of a text offset: {"doc", "page", "paragraph", "section"}
+        (page is None for unpaginated documents), plus "part" and "table" / "row" /
+        "col" for DOCX (see evidence_locator.DocLocator.locate).
+        """
+        return {"doc": key, **self.locator(key).locate(offset)}
+
+    def prefetch(self, keys, workers: int | None = None):
+        """
+        Extract several documents at once on a process pool (only those not loaded yet).
+        """
+        todo = {k: self.doc_files[k] for k in keys if k in self.doc_files and k not in self._records}
+        if not todo:
+            return
+        stats = {}
+        self._records.update(extract_documents_parallel(todo, workers=workers, cache=self.cache, stats=stats,
+                                                              options=self.options))
+        self.extracted.extend(todo)
+        for k, st in stats.items():
+            self.timings[k] = dict(st, chars=len(self._records[k]["text"]))
+
+    def preload(self, records: dict):
+        """
+        Adopt records extracted elsewhere (e.g. one batch-wide extraction shared by
+        several operators' stores).
+        """
+        for k, rec in records.items():
+            if k in self.doc_files and k not in self._records:
+                self._records[k] = rec
+                self.extracted.append(k)
+
+    def release(self, key):
+        """
+        Drop a loaded document's text (it will be re-extracted or re-read from cache if asked again).
+        """
+        self._records.pop(key, None)
+        self._sections.pop(key, None)
+        self._locators.pop(key, None)
+        self._boundaries.pop(key, None)
+        self._entities.pop(key, None)
+
+    def loaded(self) -> list:
+        return list(self._records)
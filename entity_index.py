@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Entity index — registrations and ops_facts terms per document, found once
+-------------------------------------------------------------------------
+align_with_opspecs rules ran one case-insensitive search over the rule's whole text
+per fleet registration and per area, plus a registration-shaped scan
+(REGISTRATION_RE) of the same text for every rule with a different text view; with
+40+ tails and many area codes that is dozens of passes over the manuals per rule.
+An EntityIndex holds, per document, built on first use:
+
+- registrations: every REGISTRATION_RE hit with its offset (one pass)
+- terms: start offsets of any looked-up term (registrations, areas, and equally
+  aircraft types or approval keywords), case-insensitive; all terms not indexed
+  yet are found in one multi-needle pass over the lowered text
+  (pattern_scanner.LiteralMatcher) and memoized, so later rules only do lookups
+
+ViewEntities answers the align checks for a rule's text_view.TextView (whole
+documents or sections) from the indexes of its documents: "is this term in the
+view" is a bisect per piece, and the registrations in the view are the document
+hits inside each piece. Anything the index cannot answer exactly (a section edge
+inside a word, terms containing a line break, text whose case folding differs
+between str.lower() and re.IGNORECASE) falls back to searching the view.
+"""
+
+import re
+from bisect import bisect_left
+
+from text_view import TextView, text_search, text_spans
+
+REGISTRATION_RE = re.compile(r"\b[0-9A-Z]{1,2}-[A-Z]{3}\b", re.I)
+# Characters whose case folding differs between str.lower() and re.IGNORECASE
+UNSAFE_FOLD = ("\u0130", "\u0131", "\u017f", "\u212a")
+
+
+class EntityIndex:
+    """
+    Registration hits and term offsets of one text.
+    """
+
+    __slots__ = ("text", "reg_starts", "reg_texts", "fold_safe", "_lower", "_terms")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.reg_starts, self.reg_texts = [], []
+        for m in REGISTRATION_RE.finditer(text):
+            self.reg_starts.append(m.start())
+            self.reg_texts.append(m.group())
+        self._lower = None
+        # Offsets in the lowered text equal those in the text, and lower() agrees with re.I
+        self.fold_safe = not any(c in text for c in UNSAFE_FOLD)
+        self._terms = {}  # lowered term → ascending start offsets
+
+    def _clean_edge(self, s: int, e: int) -> bool:
+        """
+        Whether [s, e) starts and ends at whitespace (or the text's ends), so no
+        registration can straddle it and \\b sees the same characters in a view.
+        """
+        t = self.text
+        return ((s == 0 or t[s - 1].isspace() or (s < len(t) and t[s].isspace()))
+                and (e >= len(t) or t[e].isspace() or (e > 0 and t[e - 1].isspace())))
+
+    def registrations_in(self, s: int, e: int):
+        """
+        (start, text) of the registration hits inside [s, e), or None if the range
+        edges could change what REGISTRATION_RE matches there.
+        """
+        if not self._clean_edge(s, e):
+            return None
+        out = []
+        for i in range(bisect_left(self.reg_starts, s), len(self.reg_starts)):
+            start, reg = self.reg_starts[i], self.reg_texts[i]
+            if start + len(reg) > e:
+                break
+            out.append((start, reg))
+        return out
+
+    def index_terms(self, terms):
+        """
+        Find every occurrence of the terms not indexed yet (one pass for all of them).
+        """
+        todo = [low for low in dict.fromkeys(t.lower() for t in terms) if low not in self._terms]
+        if not todo:
+            return
+        from pattern_scanner import LiteralMatcher
+        if self._lower is None:
+            self._lower = self.text.lower()
+            self.fold_safe = self.fold_safe and len(self._lower) == len(self.text)
+        if not self.fold_safe:
+            return
+        found = LiteralMatcher(todo).find_all(self._lower)
+        for low in todo:
+            self._terms[low] = found.get(low, [])
+
+    def has_term(self, term: str, s: int, e: int) -> bool:
+        """
+        Whether `term` occurs (case-insensitively) entirely inside [s, e).
+        """
+        low = term.lower()
+        if self.fold_safe and len(low) == len(term) and low not in self._terms:
+            self.index_terms([term])
+        if not self.fold_safe or len(low) != len(term):
+            return re.compile(re.escape(term), re.I).search(self.text, s, e) is not None
+        starts = self._terms[low]
+        i = bisect_left(starts, s)
+        return i < len(starts) and starts[i] + len(low) <= e
+
+
+class ViewEntities:
+    """
+    Align-check lookups over a rule's text (a TextView or a string). index_of(doc_key)
+    returns a document's EntityIndex (e.g. doc_store.LazyDocStore.entities); without
+    it, one index is built over the whole text.
+    """
+
+    __slots__ = ("text", "pieces")
+
+    def __init__(self, text, index_of=None):
+        self.text = text
+        if isinstance(text, TextView) and index_of is not None:
+            self.pieces = [(index_of(key), s, e, st) for (key, _, s, e), st in zip(text.pieces, text.starts)]
+        else:
+            idx = EntityIndex(str(text))
+            self.pieces = [(idx, 0, len(idx.text), 0)]
+
+    def find_terms(self, terms) -> set:
+        """
+        The terms that occur in the text (case-insensitive substring search).
+        """
+        lookup = [t for t in terms if t and "\n" not in t]
+        for idx, _, _, _ in self.pieces:
+            if idx.fold_safe:
+                idx.index_terms(lookup)
+        found = {t for t in lookup if any(idx.has_term(t, s, e) for idx, s, e, _ in self.pieces)}
+        found.update(t for t in terms if not t or ("\n" in t and
+                     text_search(re.compile(re.escape(t), re.I), self.text) is not None))
+        return found
+
+    def registrations(self) -> dict:
+        """
+        Registration-shaped text in the view → offset of its first occurrence
+        (what a REGISTRATION_RE scan of the view finds).
+        """
+        out = {}
+        for idx, s, e, st in self.pieces:
+            hits = idx.registrations_in(s, e)
+            if hits is None:
+                out = {}
+                for a, b in text_spans(REGISTRATION_RE, self.text):
+                    out.setdefault(self.text[a:b], a)
+                return out
+            for start, reg in hits:
+                out.setdefault(reg, st + start - s)
+        return out
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Evidence locator — page / paragraph / section citations for matches
+-------------------------------------------------------------------
+snippet() returns the text around a match but not where it is, and the report's
+"Locator hint" is copied from the rule, so auditors searched the manuals by hand
+(11k lines of OM-D) to find the evidence. DocLocator is an offset index of one
+loaded document made of sorted start offsets:
+
+- pages:      PDF page starts ("pages" of the extraction record)
+- paragraphs: DOCX segment starts and location runs ("locations", doc_extract.py)
+              or, for PDF / TXT, line starts (one pass over the text on load)
+- headings:   section starts and parents (sectionizer.SectionIndex)
+
+locate(offset) resolves an offset to page, paragraph (line) and section title with
+binary searches only, instead of counting newlines up to every match
+(doc_extract.text_coordinates).
+
+Rules record the view offset of every snippet (outcome["evidence_at"]);
+cite_evidence() turns the displayed ones into citations such as
+"OM-D, p. 41, para. 1260, table 3 row 2 col 1, § 5.3 Recurrent Training".
+"""
+
+import re
+from bisect import bisect_right
+
+from doc_extract import text_location
+
+# Citations per kind of evidence (the report shows the first three snippets)
+CITE_LIMIT = 3
+NEWLINE = re.compile("\n")
+# Section titles longer than this are shortened in citations (mis-styled body paragraphs)
+TITLE_CHARS = 60
+# Parts named in a citation (body text needs no label)
+PART_LABELS = {"header": "header", "footer": "footer", "textbox": "text box"}
+
+
+class DocLocator:
+    """
+    Offset index of one document: extraction record plus its SectionIndex (optional).
+    """
+
+    __slots__ = ("doc", "record", "sections", "line_starts", "page_lines")
+
+    def __init__(self, doc: str, record: dict, sections=None):
+        self.doc = doc
+        self.record = record
+        self.sections = sections
+        self.line_starts, self.page_lines = None, None
+        if not (record.get("locations") or {}).get("start"):
+            self.line_starts = [0]
+            self.line_starts.extend(m.end() for m in NEWLINE.finditer(record["text"]))
+            # Line number of every page start (PDF paragraphs count from their page)
+            self.page_lines = [bisect_right(self.line_starts, p) - 1 for p in record.get("pages") or []]
+
+    def locate(self, offset: int) -> dict:
+        """
+        {"page", "paragraph", "section"} of a text offset, plus "part" and "table" /
+        "row" / "col" for DOCX (same page/paragraph meaning as doc_extract.text_location).
+        """
+        if self.line_starts is None:
+            out = text_location(self.record, offset)
+        else:
+            line = bisect_right(self.line_starts, offset) - 1
+            pages = self.record.get("pages") or []
+            if pages:
+                i = bisect_right(pages, offset) - 1
+                out = {"page": i + 1, "paragraph": line - (self.page_lines[i] if i >= 0 else 0) + 1}
+            else:
+                out = {"page": None, "paragraph": line + 1}
+        sec = self.sections.section_at(offset) if self.sections is not None else None
+        out["section"] = sec.title if sec is not None else None
+        return out
+
+    def citation(self, offset: int) -> str:
+        return format_citation(self.doc, self.locate(offset))
+
+
+def format_citation(doc: str, loc: dict) -> str:
+    """
+    "DOC, p. N, para. N, table T row R col C, § Section" (missing parts left out;
+    PDF and text positions are lines rather than paragraphs).
+    """
+    parts = [doc]
+    if loc.get("part") in PART_LABELS:
+        parts.append(PART_LABELS[loc["part"]])
+    if loc.get("page"):
+        parts.append(f"p. {loc['page']}")
+    if loc.get("paragraph"):
+        parts.append(f"{'para.' if 'part' in loc else 'line'} {loc['paragraph']}")
+    if loc.get("table"):
+        parts.append(f"table {loc['table']} row {loc['row']} col {loc['col']}")
+    if loc.get("section"):
+        title = loc["section"]
+        parts.append("§ " + (title if len(title) <= TITLE_CHARS else title[:TITLE_CHARS - 1].rstrip() + "…"))
+    return ", ".join(parts)
+
+
+def cite_evidence(outcome: dict, view, locator_of, limit: int = CITE_LIMIT) -> dict:
+    """
+    Citations of the first `limit` positive and forbidden snippets of an outcome:
+    {"positive": [...], "forbidden": [...]}. `view` is the text_view.TextView the rule
+    searched, locator_of(doc_key) returns that document's DocLocator. Snippets without
+    a text position (offset None) get "".
+    """
+    out = {}
+    for kind in ("positive", "forbidden"):
+        shown = min(limit, len(outcome.get(f"matched_{kind}", [])))
+        cites = []
+        for off in outcome["evidence_at"].get(kind, [])[:shown]:
+            if off is None:
+                cites.append("")
+                continue
+            key, doc_offset = view.locate(off)
+            cites.append(locator_of(key).citation(doc_offset))
+        out[kind] = cites
+    return out
+
+
+def locate_evidence(outcome: dict, view) -> dict:
+    """
+    (doc_key, document offset) of every evidence snippet of an outcome:
+    {"positive": [...], "forbidden": [...]} (result_store.py); snippets without a
+    text position are left out.
+    """
+    return {kind: [list(view.locate(off)) for off in offsets if off is not None]
+            for kind, offsets in outcome["evidence_at"].items()}
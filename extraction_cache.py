@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Extraction cache — persistent on-disk store of extracted document text
+----------------------------------------------------------------------
+Parsing the manuals (python-docx for OM-C/OM-D, PyPDF2 for OpsSpecs/AOC) is by far
+the slowest part of a run, yet the manuals rarely change between runs. This cache
+keeps the extracted records (doc_extract.extract_document: text + structure) on disk
+so a rules-only edit does not re-parse anything.
+
+Lookup strategy:
+1) Fast path: same file path with unchanged size + mtime → cached text.
+2) Slow path: size/mtime changed (copy, touch, checkout) → hash the file content
+   (SHA-256). If the same content was extracted before, reuse it.
+3) Otherwise → miss; the caller extracts and stores the result.
+
+Every entry carries the extractor version. Bumping the version (when the extractor
+changes its output) invalidates all older entries. PDF entries add the backend / layout
+variant ("4+pypdf-layout", doc_extract.cache_versions), so switching PDF backends
+neither re-extracts DOCX files nor evicts the other backend's entries. Payloads are
+evicted least-recently-used first once the cache grows above max_bytes.
+"""
+
+import hashlib, json, os, time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = ".extract_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+INDEX_NAME = "index.json"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Return the SHA-256 hex digest of a file's content (read in chunks).
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extracted text.
+
+    index.json maps a resolved file path to its last known (size, mtime, sha256),
+    payloads are stored as "<sha256>.<version>.txt" (text) plus "<sha256>.<version>.json"
+    (every other record field) so identical files share one entry. `versions` maps a
+    file suffix to the version of its entries ("<version>+<variant>"); other files
+    use `version`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, version: str = "1",
+                 max_bytes: int = DEFAULT_MAX_BYTES, versions: dict | None = None):
+        self.dir = Path(cache_dir)
+        self.version = str(version)
+        self.versions = {k.lower(): str(v) for k, v in (versions or {}).items()}
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+
+    # ---- index handling ----
+    def _index_path(self) -> Path:
+        return self.dir / INDEX_NAME
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            try:
+                self._index = json.loads(self._index_path().read_text(encoding="utf-8"))
+            except Exception:
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._load_index(), indent=1), encoding="utf-8")
+        os.replace(tmp, self._index_path())
+
+    def version_of(self, path: Path) -> str:
+        return self.versions.get(Path(path).suffix.lower(), self.version)
+
+    def _payload_path(self, sha: str, version: str) -> Path:
+        return self.dir / f"{sha}.{version}.txt"
+
+    def _meta_path(self, sha: str, version: str) -> Path:
+        return self.dir / f"{sha}.{version}.json"
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    # ---- public API ----
+    def get(self, path: Path):
+        """
+        Return the cached record for path, or None on a miss.
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        version = self.version_of(path)
+        st = path.stat()
+        index = self._load_index()
+        key = self._key(path)
+        entry = index.get(key)
+
+        sha = None
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            sha = entry.get("sha256")
+        if sha is None or not self._payload_path(sha, version).exists():
+            # Size/mtime changed or payload evicted: fall back to the content hash
+            sha = file_sha256(path)
+            index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+
+        payload = self._payload_path(sha, version)
+        if not payload.exists():
+            self.misses += 1
+            return None
+        try:
+            record = json.loads(self._meta_path(sha, version).read_text(encoding="utf-8"))
+            record["text"] = payload.read_text(encoding="utf-8")
+        except Exception:
+            self.misses += 1
+            return None
+        index[key]["atime"] = time.time()
+        self.hits += 1
+        return record
+
+    def put(self, path: Path, record: dict):
+        """
+        Store an extracted record for path. Empty text is not cached (extraction failures
+        such as a missing library should not be remembered across runs).
+        """
+        path = Path(path)
+        if not record.get("text") or not path.exists():
+            return
+        st = path.stat()
+        index = self._load_index()
+        key = self._key(path)
+        entry = index.get(key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            sha = entry["sha256"]
+        else:
+            sha = file_sha256(path)
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        version = self.version_of(path)
+        payload = self._payload_path(sha, version)
+        meta = {k: v for k, v in record.items() if k != "text"}
+        for target, content in ((self._meta_path(sha, version), json.dumps(meta)), (payload, record["text"])):
+            tmp = target.with_suffix(".tmp")
+            tmp.write_text(content, encoding="utf-8")
+            os.replace(tmp, target)
+        index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha,
+                      "atime": time.time()}
+        self.evict()
+        self._save_index()
+
+    def get_or_extract(self, path: Path, extractor) -> dict:
+        """
+        Return the cached record for path, calling extractor(path) and storing the result on a miss.
+        """
+        record = self.get(path)
+        if record is not None:
+            self.flush()
+            return record
+        record = extractor(Path(path))
+        self.put(path, record)
+        return record
+
+    def evict(self):
+        """
+        Drop payloads of an older extractor version (entries of other PDF variants of
+        the current version stay), then least-recently-used payloads until the cache
+        is below max_bytes.
+        """
+        if not self.dir.exists():
+            return
+        index = self._load_index()
+        last_used = {}
+        for entry in index.values():
+            sha = entry.get("sha256")
+            last_used[sha] = max(last_used.get(sha, 0.0), entry.get("atime", 0.0))
+
+        sizes, files = {}, {}
+        for p in list(self.dir.glob("*.txt")) + list(self.dir.glob("*.json")):
+            if p.name == INDEX_NAME:
+                continue
+            sha, _, version = p.stem.partition(".")
+            if version.partition("+")[0] != self.version.partition("+")[0]:
+                p.unlink(missing_ok=True)
+                continue
+            sizes[sha] = sizes.get(sha, 0) + p.stat().st_size
+            files.setdefault(sha, []).append(p)
+
+        total = sum(sizes.values())
+        for _, sha in sorted((last_used.get(sha, 0.0), sha) for sha in sizes):
+            if total <= self.max_bytes:
+                break
+            for p in files[sha]:
+                p.unlink(missing_ok=True)
+            total -= sizes[sha]
+            for k in [k for k, e in index.items() if e.get("sha256") == sha]:
+                del index[k]
+
+    def flush(self):
+        """
+        Persist the index (lookups record last-use times used by eviction).
+        """
+        if self._index is not None:
+            self._save_index()
+
+    def clear(self):
+        """
+        Remove every cached payload and the index.
+        """
+        if self.dir.exists():
+            for p in self.dir.iterdir():
+                p.unlink(missing_ok=True)
+        self._index = {}
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental re-check
+--------------------
+A revision drop usually touches one manual (e.g. "OMC - REV 05" → REV 06), and a
+rules edit usually touches one rule, yet every run re-evaluated everything. The
+incremental mode keeps the previous run's report rows together with fingerprints
+of what produced them, and re-evaluates only the rules whose inputs changed.
+
+Per rule the state records:
+- rule_fp: hash of the rule definition (plus global ops_facts for align rules and
+  the run settings that affect results, e.g. section scoping)
+- views:   per source_doc, a hash of the text the rule actually searched — the
+  matching sections for section-scoped rules, the whole document otherwise
+- files:   per source_doc, the content hash of the file that view was taken from
+
+A document whose file hash matches the one every dependent rule recorded is not
+even extracted; a changed document is extracted once and each dependent rule is
+re-evaluated only if its own view (e.g. its sections) changed. File hashes are kept
+per rule, so an --only run that re-reads a changed document does not hide the
+change from the rules it skipped.
+"""
+
+import hashlib, json
+from pathlib import Path
+
+from doc_store import rule_source_docs
+from extraction_cache import file_sha256
+from rule_engine import CONFLICT_TYPES, SECTION_SCOPES
+
+STATE_VERSION = 3  # 2: report rows gained "Evidence location"; 3: token negation windows, sentence evidence
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def rule_keys(rules: list) -> list:
+    """
+    Stable per-rule keys: the rule id, suffixed "#n" for duplicates or missing ids.
+    """
+    keys, seen = [], {}
+    for i, r in enumerate(rules):
+        base = str(r.get("id") or f"#{i}")
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keys.append(base if n == 0 else f"{base}#{n}")
+    return keys
+
+
+def rule_fingerprint(rule: dict, ops_facts: dict | None, settings: dict) -> str:
+    payload = {
+        "rule": rule,
+        # Only align rules read the global ops_facts
+        "ops_facts": ops_facts if rule.get("rule_type") == "align_with_opspecs" else None,
+        "settings": settings,
+    }
+    return text_fingerprint(json.dumps(payload, sort_keys=True, default=str))
+
+
+def doc_view(rule: dict, key: str, docs, sectioned: bool) -> str:
+    """
+    The part of document `key` a rule searches (its anchor sections, or the whole text;
+    forbidden claims of conflict-type rules are always searched in the whole text).
+    """
+    text = docs.get(key, "")
+    anchors = rule.get("anchor_sections") or []
+    if rule.get("forbidden_claims") and rule.get("rule_type", "affirm") in CONFLICT_TYPES:
+        return text
+    if sectioned and anchors and rule.get("scope") in SECTION_SCOPES and hasattr(docs, "sections"):
+        spans = docs.sections(key).spans(anchors, rule.get("anchor_synonyms"))
+        if spans:
+            return "\n".join(text[s:e] for s, e in spans)
+    return text
+
+
+class RunState:
+    """
+    Previous run's rows and fingerprints (JSON on disk).
+    """
+
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        if data.get("version") != STATE_VERSION:
+            data = {}
+        self.docs = data.get("docs", {})    # doc_key → {"path", "file"} of the last run
+        self.rules = data.get("rules", {})  # rule key → {"rule_fp", "views", "files", "row"}
+        self.order = data.get("order", [])
+
+    @classmethod
+    def load(cls, path) -> "RunState":
+        try:
+            return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+        except Exception:
+            return cls()
+
+    def save(self, path):
+        data = {"version": STATE_VERSION, "docs": self.docs, "rules": self.rules, "order": self.order}
+        tmp = Path(str(path) + ".tmp")
+        tmp.write_text(json.dumps(data, indent=1, default=str), encoding="utf-8")
+        tmp.replace(path)
+
+
+class IncrementalPlan:
+    """
+    Decide which rules need evaluation given the previous state and current inputs.
+    """
+
+    def __init__(self, rules: list, state: RunState, doc_files: dict, docs,
+                 ops_facts: dict | None = None, settings: dict | None = None,
+                 sectioned: bool = True):
+        self.rules = rules
+        self.keys = rule_keys(rules)
+        self.state = state
+        self.doc_files = doc_files
+        self.docs = docs
+        self.sectioned = sectioned
+        self.settings = dict(settings or {}, sectioned=sectioned)
+        self.ops_facts = ops_facts
+        self.file_fps = {}
+        self.reasons = {}  # rule key → why it is re-evaluated
+        self.previous = dict(state.rules)  # entries before this run (for change reports)
+
+        for i, r in enumerate(rules):
+            reason = self._reason(self.keys[i], r)
+            if reason:
+                self.reasons[self.keys[i]] = reason
+
+    def file_fp(self, key: str) -> str:
+        if key not in self.file_fps:
+            p = Path(self.doc_files.get(key, ""))
+            self.file_fps[key] = file_sha256(p) if key in self.doc_files and p.is_file() else ""
+        return self.file_fps[key]
+
+    def _reason(self, key: str, rule: dict) -> str:
+        prev = self.state.rules.get(key)
+        if prev is None:
+            return "new rule"
+        if prev.get("rule_fp") != rule_fingerprint(rule, self.ops_facts, self.settings):
+            return "rule changed"
+        views, files = prev.get("views", {}), prev.get("files", {})
+        for k in rule_source_docs(rule):
+            if k not in views:
+                return f"{k} added to source_docs"
+            if files.get(k) == self.file_fp(k):
+                continue
+            # File changed: compare just the part of it this rule searches
+            if views[k] != text_fingerprint(doc_view(rule, k, self.docs, self.sectioned)):
+                return f"{k} changed"
+        return ""
+
+    def to_evaluate(self) -> list:
+        """
+        Indices of rules that must be evaluated, in rule order.
+        """
+        return [i for i, k in enumerate(self.keys) if k in self.reasons]
+
+    def reused_row(self, i: int) -> dict:
+        return self.state.rules[self.keys[i]]["row"]
+
+    def record(self, i: int, row: dict):
+        """
+        Store fresh fingerprints and the new row for an evaluated rule.
+        """
+        rule = self.rules[i]
+        self.state.rules[self.keys[i]] = {
+            "rule_fp": rule_fingerprint(rule, self.ops_facts, self.settings),
+            "views": {k: text_fingerprint(doc_view(rule, k, self.docs, self.sectioned))
+                      for k in rule_source_docs(rule)},
+            "files": {k: self.file_fp(k) for k in rule_source_docs(rule)},
+            "row": row,
+        }
+
+    def finish(self, prune: bool = True) -> list:
+        """
+        Update document fingerprints and (with prune) drop rules that no longer exist.
+        Returns the keys of removed rules. A filtered run (--only) should not prune.
+        """
+        for k in {k for r in self.rules for k in rule_source_docs(r)}:
+            self.state.docs[k] = {"path": str(self.doc_files.get(k, "")), "file": self.file_fp(k)}
+        # Reused rows passed the view check against the current files
+        for key, r in zip(self.keys, self.rules):
+            if key not in self.reasons and key in self.state.rules:
+                self.state.rules[key]["files"] = {k: self.file_fp(k) for k in rule_source_docs(r)}
+        if not prune:
+            self.state.order += [k for k in self.keys if k not in self.state.order]
+            return []
+        current = set(self.keys)
+        removed = [k for k in self.state.rules if k not in current]
+        for k in removed:
+            del self.state.rules[k]
+        self.state.order = list(self.keys)
+        return removed
+
+
+def diff_rows(old: dict | None, new: dict, fields=("Result", "Confidence", "Evidence (positive)",
+                                                    "Contradiction (if any)", "Notes")) -> list:
+    """
+    Names of report fields that differ between two rows of the same rule.
+    """
+    if old is None:
+        return ["(new)"]
+    return [f for f in fields if old.get(f) != new.get(f)]
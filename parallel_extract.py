@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel document extraction
+----------------------------
+python-docx and PyPDF2 are CPU-bound pure Python, so extracting the manuals one
+after another leaves every core but one idle. This module plans one task per
+document (and one task per page range for large PDFs), runs them on a process
+pool and reassembles the results.
+
+Guarantees:
+- Output is a dict of extraction records (doc_extract.extract_document) in the same
+  key order as the input document map; the record (text and page offsets) is
+  identical to a serial extraction.
+- A failing task never kills the run: it is retried once in-process and, if it
+  still fails, the document (or each page of the range) contributes "".
+- Cached documents (extraction_cache.py) are served without touching the pool.
+"""
+
+import os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from doc_extract import empty_record, extract_document, load_pdf_pages, pdf_page_count, record_from_segments, segment
+
+DEFAULT_PDF_PAGES_PER_TASK = 25
+MIN_PDF_PAGES_PER_TASK = 4
+
+
+def _run_task(task):
+    """
+    Worker entry point. task = (doc_key, part_no, path, start, stop, options);
+    start is None for whole-document tasks (returns a record), otherwise
+    returns the page texts of that PDF page range. Returns (result, seconds).
+    """
+    _, _, path, start, stop, options = task
+    t0 = time.perf_counter()
+    if start is None:
+        result = extract_document(Path(path), options)
+    else:
+        result = load_pdf_pages(Path(path), start, stop, options)
+    return result, time.perf_counter() - t0
+
+
+def pages_per_task(n_pages: int, workers: int = 1, limit: int = DEFAULT_PDF_PAGES_PER_TASK) -> int:
+    """
+    Page-range size for a PDF: at most `limit` pages, and small enough that a PDF
+    is spread over the workers (but not below MIN_PDF_PAGES_PER_TASK pages).
+    """
+    if workers <= 1:
+        return limit
+    return max(MIN_PDF_PAGES_PER_TASK, min(limit, -(-n_pages // workers)))
+
+
+def plan_tasks(doc_files: dict, pdf_pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK,
+               options: dict | None = None, workers: int = 1) -> list:
+    """
+    Split the document map into extraction tasks, largest files first so the
+    longest task starts as early as possible. PDFs are split into page ranges
+    (see pages_per_task) so their pages are extracted in parallel.
+    Returns a list of (doc_key, part_no, path, start, stop, options).
+    """
+    tasks = []
+    sized = []
+    for key, fname in doc_files.items():
+        p = Path(fname)
+        if not p.exists():
+            continue
+        sized.append((p.stat().st_size, key, p))
+    for _, key, p in sorted(sized, key=lambda t: -t[0]):
+        n_pages = pdf_page_count(p, options) if p.suffix.lower() == ".pdf" else 0
+        chunk = pages_per_task(n_pages, workers, pdf_pages_per_task) if pdf_pages_per_task else 0
+        if chunk and n_pages > chunk:
+            for part_no, start in enumerate(range(0, n_pages, chunk)):
+                tasks.append((key, part_no, str(p), start, min(start + chunk, n_pages), options))
+        else:
+            tasks.append((key, 0, str(p), None, None, options))
+    return tasks
+
+
+def _run_on_pool(pool, tasks: list, parts: dict) -> list:
+    """
+    Submit tasks to an executor, store (result, seconds) in parts and return the failed tasks.
+    """
+    failed = []
+    futures = {pool.submit(_run_task, t): t for t in tasks}
+    for fut in as_completed(futures):
+        t = futures[fut]
+        try:
+            parts[(t[0], t[1])] = fut.result()
+        except Exception as e:
+            print(f"[extract] {t[0]} part {t[1]} failed in worker: {e!r}", file=sys.stderr)
+            failed.append(t)
+    return failed
+
+
+def extract_documents_parallel(doc_files: dict, workers: int | None = None, cache=None,
+                               pdf_pages_per_task: int = DEFAULT_PDF_PAGES_PER_TASK, pool=None,
+                               stats: dict | None = None, options: dict | None = None) -> dict:
+    """
+    Extract every mapped document on a process pool and return {doc_key: record}
+    in the order of doc_files. Missing files map to an empty record.
+    `options` selects the extraction backends (doc_extract.extract_options).
+    `pool` reuses a caller-owned executor (batch runs) instead of starting one per call.
+    If `stats` is given it receives {doc_key: {"source": "cache" | "extracted",
+    "seconds": extraction time summed over the document's tasks}}.
+    """
+    records = {}
+    pending = {}
+    for key, fname in doc_files.items():
+        p = Path(fname)
+        cached = cache.get(p) if cache is not None else None
+        if cached is not None:
+            records[key] = cached
+            if stats is not None:
+                stats[key] = {"source": "cache", "seconds": 0.0}
+        else:
+            pending[key] = fname
+
+    workers = workers or os.cpu_count() or 1
+    tasks = plan_tasks(pending, pdf_pages_per_task, options, workers)
+    parts = {}
+    failed = []
+    if len(tasks) > 1 and (pool is not None or workers > 1):
+        try:
+            if pool is not None:
+                failed = _run_on_pool(pool, tasks, parts)
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as own_pool:
+                    failed = _run_on_pool(own_pool, tasks, parts)
+        except Exception as e:
+            # Pool could not start or broke down: finish whatever is left in-process
+            print(f"[extract] process pool unavailable ({e!r}); continuing serially", file=sys.stderr)
+            failed = [t for t in tasks if (t[0], t[1]) not in parts]
+    else:
+        failed = list(tasks)
+
+    for t in failed:
+        try:
+            parts[(t[0], t[1])] = _run_task(t)
+        except Exception as e:
+            print(f"[extract] {t[0]} part {t[1]} failed: {e!r}", file=sys.stderr)
+            parts[(t[0], t[1])] = (empty_record() if t[3] is None else [""] * (t[4] - t[3]), 0.0)
+
+    by_doc = {}
+    for (key, part_no), result in parts.items():
+        by_doc.setdefault(key, []).append((part_no, result))
+    for key in pending:
+        done = sorted(by_doc.get(key, []), key=lambda c: c[0])
+        chunks = [part for _, (part, _) in done]
+        if stats is not None:
+            stats[key] = {"source": "extracted", "seconds": sum(sec for _, (_, sec) in done)}
+        if len(chunks) == 1 and isinstance(chunks[0], dict):
+            records[key] = chunks[0]
+        elif chunks:
+            # Page ranges of one PDF: reassemble the pages in order (same record as serial)
+            pages = [page for chunk in chunks for page in chunk]
+            records[key] = record_from_segments(segment(t, page=i) for i, t in enumerate(pages, 1))
+        else:
+            records[key] = empty_record()
+        if cache is not None:
+            cache.put(Path(pending[key]), records[key])
+    if cache is not None:
+        cache.flush()
+
+    return {key: records.get(key) or empty_record() for key in doc_files}
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Pattern scanner — scan each document once for all rules
+-------------------------------------------------------
+Before, every rule ran its own finditer over the whole concatenated doc_text, so the
+cost grew as rules × text. The scanner instead collects every unique pattern of a
+compiled rule set and scans each document once:
+
+- Literal patterns (plain text, optionally with \\b word boundaries) and the legacy
+  contains_any patterns go through one multi-needle pass (Aho–Corasick via the
+  optional `pyahocorasick` package, otherwise a C-speed str.find sweep).
+- Regex patterns that cannot match across a line break are scanned once per document
+  and shared by every rule that uses them.
+- Patterns that can span a line break (".", "\\s", lookarounds, ...) might match across
+  two documents of a rule's concatenated text, so they are scanned once per distinct
+  source_docs combination instead (on the combination's TextView).
+
+Rules then read precomputed hit lists: ScanIndex.spans() rebuilds exactly the matches
+that finditer over the rule's "(p1|p2|...)" alternation would return, so decisions do
+not change. Anything the scanner cannot reproduce exactly (possibly-empty matches,
+backreferences) falls back to the rule's own regex.
+"""
+
+import re
+import time
+from bisect import bisect_left
+
+from rule_engine import RULE_FLAGS
+from text_view import text_contains_lower, text_search, text_spans
+
+try:
+    import ahocorasick  # optional: pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+META = set(".^$*+?{}[]|()")
+# Characters whose case folding differs between str.lower() and re.IGNORECASE
+UNSAFE_FOLD = ("\u0130", "\u0131", "\u017f", "\u212a")
+BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+# Profile key for the shared multi-needle pass over literal patterns
+LITERAL_PASS = "(literal patterns)"
+
+
+# ====== Pattern classification ======
+def parse_literal(pattern: str):
+    """
+    Return (lowered_text, boundary_offsets) if pattern is plain ASCII text with optional
+    \\b assertions, else None. boundary_offsets are positions inside the match where
+    a word boundary is required (0 = before the first char, len = after the last).
+    """
+    chars, bounds = [], []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= len(pattern):
+                return None
+            n = pattern[i + 1]
+            if n == "b":
+                bounds.append(len(chars))
+            elif n.isascii() and not n.isalnum() and n not in "\n\r\t":
+                chars.append(n)  # escaped punctuation such as \( \+ \.
+            else:
+                return None
+            i += 2
+            continue
+        if c in META or not c.isascii() or c in "\n\r\t":
+            return None
+        chars.append(c)
+        i += 1
+    if not chars:
+        return None
+    return "".join(chars).lower(), tuple(sorted(set(bounds)))
+
+
+def is_line_local(pattern: str) -> bool:
+    """
+    Conservative check that a pattern can never match a line break and has no
+    lookarounds or string anchors, so matching each document separately gives the
+    same hits as matching the "\\n"-joined concatenation.
+    """
+    if re.search(r"\(\?<?[=!]", pattern):
+        return False
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            n = pattern[i + 1:i + 2]
+            if n in ("s", "W", "D", "n", "r", "v", "f", "x", "u", "U", "N", "0", "A", "Z", "z"):
+                return False
+            i += 2
+            continue
+        if in_class:
+            if c == "]":
+                in_class = False
+        elif c == "[":
+            if pattern[i + 1:i + 2] == "^":
+                return False
+            in_class = True
+        elif c == ".":
+            return False  # DOTALL: "." matches "\n"
+        elif c == "\n":
+            return False
+        i += 1
+    return True
+
+
+def can_match_empty(regex) -> bool:
+    """
+    Heuristic: does the regex produce an empty match on trivial inputs?
+    """
+    for probe in ("", " ", "a", "\n", "a b"):
+        m = regex.search(probe)
+        if m and m.start() == m.end():
+            return True
+    return False
+
+
+def is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+# ====== Multi-needle literal search ======
+class LiteralMatcher:
+    """
+    Find every (possibly overlapping) occurrence of many lowered needles in lowered text.
+    """
+
+    def __init__(self, needles):
+        self.needles = list(dict.fromkeys(needles))
+        self._automaton = None
+        if ahocorasick is not None and self.needles:
+            a = ahocorasick.Automaton()
+            for idx, n in enumerate(self.needles):
+                a.add_word(n, (idx, n))
+            a.make_automaton()
+            self._automaton = a
+
+    def find_all(self, lowered: str) -> dict:
+        """
+        Return {needle: [start, ...]} (ascending) for needles that occur.
+        """
+        out = {}
+        if not lowered or not self.needles:
+            return out
+        if self._automaton is not None:
+            for end, (_, n) in self._automaton.iter(lowered):
+                out.setdefault(n, []).append(end - len(n) + 1)
+            for starts in out.values():
+                starts.sort()
+            return out
+        for n in self.needles:
+            starts = []
+            i = lowered.find(n)
+            while i != -1:
+                starts.append(i)
+                i = lowered.find(n, i + 1)
+            if starts:
+                out[n] = starts
+        return out
+
+
+# ====== Scan plan (per compiled rule set) ======
+class ScanPattern:
+    """
+    One unique normalized pattern and how it is scanned.
+    kind: "literal" | "local" (per document regex) | "global" (per source_docs combination)
+    """
+
+    __slots__ = ("source", "regex", "kind", "literal", "bounds", "exact")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.regex = re.compile(source, RULE_FLAGS)
+        lit = parse_literal(source)
+        self.exact = not BACKREF.search(source) and not can_match_empty(self.regex)
+        if lit:
+            self.kind = "literal"
+            self.literal, self.bounds = lit
+        else:
+            self.kind = "local" if is_line_local(source) else "global"
+            self.literal, self.bounds = None, ()
+
+
+class ScanPlan:
+    """
+    All patterns of a CompiledRuleSet, deduplicated. Built once, reused for every document set.
+    """
+
+    FIELDS = ("pos", "neg", "forbid")
+
+    def __init__(self, compiled):
+        self.patterns = {}
+        self.legacy_needles = set()
+        # Risky patterns (regex_guard) only run inside their rule's time budget
+        risky = getattr(compiled, "risky_patterns", set())
+        for cr in compiled:
+            if cr.legacy_patterns is not None:
+                self.legacy_needles.update(low for _, low in cr.legacy_patterns)
+                continue
+            for field in self.FIELDS:
+                for src in cr.patterns.get(field, ()):
+                    if src not in self.patterns and src not in risky:
+                        self.patterns[src] = ScanPattern(src)
+        self.literals = LiteralMatcher([p.literal for p in self.patterns.values() if p.kind == "literal"])
+        self.legacy = LiteralMatcher(sorted(self.legacy_needles))
+        self.local = [p for p in self.patterns.values() if p.kind == "local"]
+        self.global_ = [p for p in self.patterns.values() if p.kind == "global"]
+
+
+# ====== Per-document-set index ======
+class DocScan:
+    """
+    Hits of all literal and line-local patterns in one document (local offsets).
+    """
+
+    def __init__(self, plan: ScanPlan, text: str, profile=None):
+        self.length = len(text)
+        self.hits = {}
+        self.legacy = set()
+
+        lowered = text.lower()
+        if plan.legacy_needles:
+            self.legacy = set(plan.legacy.find_all(lowered))
+
+        starts = {}
+
+        fold_safe = len(lowered) == len(text) and not any(c in text for c in UNSAFE_FOLD)
+        if fold_safe and plan.literals.needles:
+            t0 = time.perf_counter()
+            starts = plan.literals.find_all(lowered)
+            if profile is not None:
+                profile.pattern(LITERAL_PASS, time.perf_counter() - t0, sum(map(len, starts.values())))
+        for p in plan.patterns.values():
+            t0 = time.perf_counter()
+            if p.kind == "literal" and fold_safe:
+                n = len(p.literal)
+                self.hits[p.source] = [(s, s + n) for s in starts.get(p.literal, ())
+                                       if _bounds_ok(text, s, p.bounds)]
+            elif p.kind == "literal":
+                # Every occurrence (overlapping), like the literal matcher reports them
+                hits, m = [], p.regex.search(text)
+                while m:
+                    hits.append(m.span())
+                    m = p.regex.search(text, m.start() + 1)
+                self.hits[p.source] = hits
+            elif p.kind == "local":
+                self.hits[p.source] = [m.span() for m in p.regex.finditer(text)]
+            else:
+                continue
+            if profile is not None:
+                profile.pattern(p.source, time.perf_counter() - t0, len(self.hits[p.source]))
+
+
+def _bounds_ok(text: str, start: int, bounds) -> bool:
+    for off in bounds:
+        i = start + off
+        before = i > 0 and is_word_char(text[i - 1])
+        after = i < len(text) and is_word_char(text[i])
+        if before == after:
+            return False
+    return True
+
+
+class ScanIndex:
+    """
+    Lazily scans the documents of one document set and answers rule-level match queries.
+    """
+
+    def __init__(self, plan: ScanPlan, docs, profile=None):
+        self.plan = plan
+        self.docs = docs
+        self.profile = profile
+        self._doc_scans = {}
+        self._unit_hits = {}
+        self._merged = {}
+
+    def doc_scan(self, key) -> DocScan:
+        if key not in self._doc_scans:
+            self._doc_scans[key] = DocScan(self.plan, self.docs.get(key, ""), self.profile)
+        return self._doc_scans[key]
+
+    def _pattern_hits(self, src_docs: tuple, doc_text: str, p: ScanPattern) -> list:
+        """
+        All hits of one pattern in the "\\n"-joined text of src_docs (global offsets).
+        """
+        key = (src_docs, p.source)
+        if key in self._merged:
+            return self._merged[key]
+        if p.kind == "global":
+            t0 = time.perf_counter()
+            hits = text_spans(p.regex, doc_text)
+            if self.profile is not None:
+                self.profile.pattern(p.source, time.perf_counter() - t0, len(hits))
+        else:
+            hits, base = [], 0
+            for k in src_docs:
+                ds = self.doc_scan(k)
+                hits.extend((s + base, e + base) for s, e in ds.hits[p.source])
+                base += ds.length + 1
+        self._merged[key] = hits
+        return hits
+
+    def spans(self, cr, field: str, doc_text: str):
+        """
+        Spans finditer would yield for the rule's alternation of `field`,
+        or None if this rule must be matched with its own regex.
+        """
+        sources = cr.patterns.get(field, ())
+        if not sources:
+            return []
+        pats = [self.plan.patterns.get(s) for s in sources]
+        if not all(p is not None and p.exact for p in pats):
+            return None
+        src_docs = tuple(cr.source_docs)
+        hits = [self._pattern_hits(src_docs, doc_text, p) for p in pats]
+        if len(pats) == 1:
+            if pats[0].kind == "literal":
+                return _non_overlapping(hits[0])
+            return list(hits[0])
+        return _alternation_spans(pats, hits, doc_text)
+
+    def legacy_match(self, cr, doc_text: str):
+        """
+        First contains_any pattern present in any of the rule's documents (or None).
+        """
+        found = set()
+        for k in cr.source_docs:
+            found |= self.doc_scan(k).legacy
+        for pat, low in cr.legacy_patterns:
+            # A needle with a line break could span two documents: check the joined text
+            if low in found or ("\n" in low and text_contains_lower(doc_text, low)):
+                return pat
+        return None
+
+
+def _non_overlapping(hits) -> list:
+    """
+    Keep the leftmost, non-overlapping occurrences (what finditer reports for a literal).
+    """
+    out, pos = [], 0
+    for s, e in hits:
+        if s >= pos:
+            out.append((s, e))
+            pos = e
+    return out
+
+
+def _alternation_spans(pats, hits, text: str) -> list:
+    """
+    Rebuild finditer("(p1|p2|...)") from per-pattern hit lists: at the cursor, the leftmost
+    start wins and ties go to the earlier alternative. A pattern's own hit that straddles
+    the cursor is re-searched from the cursor, since a later match may start inside it.
+    """
+    out = []
+    pos = 0
+    idx = [0] * len(pats)
+    n = len(text)
+    while pos <= n:
+        best = None
+        for i, (p, h) in enumerate(zip(pats, hits)):
+            j = bisect_left(h, (pos, -1), idx[i])
+            idx[i] = j
+            # Literal hit lists hold every occurrence, so they never need a re-search
+            straddles = p.kind != "literal" and j > 0 and h[j - 1][0] < pos < h[j - 1][1]
+            if straddles:
+                cand = text_search(p.regex, text, pos)
+            else:
+                cand = h[j] if j < len(h) else None
+            if cand and (best is None or cand[0] < best[0]):
+                best = cand
+        if best is None:
+            break
+        out.append(best)
+        pos = best[1]
+    return out
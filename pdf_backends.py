@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+PDF extraction backends
+-----------------------
+OpsSpecs and AOC used to go through PyPDF2's extract_text only, which is slow and
+flattens the OpsSpecs form layout (footnote markers glued to the next word, table
+columns merged), and that breaks patterns such as "Area\\(s\\) of operation:?\\s*EUROPE".
+PDF text now comes from a pluggable backend selected by name:
+
+- "pypdf2"   PyPDF2 (default; the text earlier runs were based on)
+- "pypdf"    pypdf, PyPDF2's maintained pure-Python successor; faster, and with
+             layout mode (extraction_mode="layout") keeps columns and line positions
+- "pdfminer" pdfminer.six, pure Python, always runs layout analysis (slowest);
+             layout mode orders text boxes by position only
+- "pymupdf"  PyMuPDF (MuPDF bindings, not pure Python); by far the fastest,
+             layout mode sorts text blocks by position
+- "auto"     the fastest installed of pymupdf, pypdf, pypdf2
+
+Every backend yields one text per page, so page numbers are kept whichever engine
+is used. Backends other than PyPDF2 are optional dependencies and are only imported
+when selected.
+
+compare_backends() (also `python pdf_backends.py [PDF ...]`) times every installed
+backend on the given PDFs (the bundled ones by default) and counts rule pattern
+hits per backend, to see which engine extracts the rules' evidence best.
+"""
+
+import argparse, json, re, sys, time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from importlib.util import find_spec
+from pathlib import Path
+
+DEFAULT_PDF_BACKEND = "pypdf2"
+AUTO_ORDER = ["pymupdf", "pypdf", "pypdf2"]
+
+
+class PdfBackend(ABC):
+    """
+    One PDF text engine. Subclasses open a document once (_open), count its pages
+    (_count) and extract a page range from that same open document (_pages).
+    """
+
+    name = ""
+    package = ""          # pip package name
+    modules = ()          # import names, any of which provides the engine
+    layout = False        # supports a layout-preserving mode
+
+    def available(self) -> bool:
+        return any(find_spec(m) is not None for m in self.modules)
+
+    @abstractmethod
+    def _open(self, path: Path):
+        """
+        Context manager yielding the engine's parsed document.
+        """
+
+    @abstractmethod
+    def _count(self, doc) -> int:
+        """
+        Number of pages of an open document.
+        """
+
+    @abstractmethod
+    def _pages(self, doc, start: int, stop: int, layout: bool):
+        """
+        Text of pages [start, stop) of an open document, one string per page.
+        """
+
+    def page_count(self, path: Path) -> int:
+        with self._open(path) as doc:
+            return self._count(doc)
+
+    def iter_pages(self, path: Path, start: int = 0, stop: int | None = None, layout: bool = False):
+        """
+        Text of pages [start, stop), one string per page. The file is opened and
+        parsed once. A page that fails to extract yields "" so page numbering stays
+        stable.
+        """
+        with self._open(path) as doc:
+            n = self._count(doc)
+            stop = n if stop is None else min(stop, n)
+            done = start
+            try:
+                for text in self._pages(doc, start, stop, layout):
+                    yield text or ""
+                    done += 1
+            except Exception:
+                pass
+            for _ in range(done, stop):
+                yield ""
+
+
+class PyPDF2Backend(PdfBackend):
+    name = "pypdf2"
+    package = "PyPDF2"
+    modules = ("PyPDF2",)
+
+    @contextmanager
+    def _open(self, path: Path):
+        import PyPDF2
+        with open(path, "rb") as f:
+            yield PyPDF2.PdfReader(f)
+
+    def _count(self, doc) -> int:
+        return len(doc.pages)
+
+    def _pages(self, doc, start: int, stop: int, layout: bool):
+        for i in range(start, stop):
+            try:
+                yield doc.pages[i].extract_text()
+            except Exception:
+                yield ""
+
+
+class PypdfBackend(PdfBackend):
+    name = "pypdf"
+    package = "pypdf"
+    modules = ("pypdf",)
+    layout = True
+
+    @contextmanager
+    def _open(self, path: Path):
+        import pypdf
+        with open(path, "rb") as f:
+            yield pypdf.PdfReader(f)
+
+    def _count(self, doc) -> int:
+        return len(doc.pages)
+
+    def _pages(self, doc, start: int, stop: int, layout: bool):
+        mode = "layout" if layout else "plain"
+        for i in range(start, stop):
+            try:
+                yield doc.pages[i].extract_text(extraction_mode=mode)
+            except Exception:
+                yield ""
+
+
+class PdfminerBackend(PdfBackend):
+    name = "pdfminer"
+    package = "pdfminer.six"
+    modules = ("pdfminer",)
+    layout = True
+
+    @contextmanager
+    def _open(self, path: Path):
+        from pdfminer.pdfpage import PDFPage
+        with open(path, "rb") as f:
+            yield list(PDFPage.get_pages(f))  # page objects; content is parsed per page below
+
+    def _count(self, doc) -> int:
+        return len(doc)
+
+    def _pages(self, doc, start: int, stop: int, layout: bool):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams, LTTextContainer
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        # layout: order text boxes purely by position instead of the default flow heuristic
+        params = LAParams(boxes_flow=None) if layout else LAParams()
+        resources = PDFResourceManager()
+        device = PDFPageAggregator(resources, laparams=params)
+        interpreter = PDFPageInterpreter(resources, device)
+        for page in doc[start:stop]:
+            interpreter.process_page(page)
+            yield "".join(el.get_text() for el in device.get_result() if isinstance(el, LTTextContainer))
+
+
+class PyMuPDFBackend(PdfBackend):
+    name = "pymupdf"
+    package = "PyMuPDF"
+    modules = ("pymupdf", "fitz")
+    layout = True
+
+    def _open(self, path: Path):
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        return pymupdf.open(str(path))
+
+    def _count(self, doc) -> int:
+        return doc.page_count
+
+    def _pages(self, doc, start: int, stop: int, layout: bool):
+        for i in range(start, stop):
+            try:
+                yield doc[i].get_text(sort=layout)
+            except Exception:
+                yield ""
+
+
+PDF_BACKENDS = {b.name: b for b in (PyPDF2Backend(), PypdfBackend(), PdfminerBackend(), PyMuPDFBackend())}
+BACKEND_CHOICES = sorted(PDF_BACKENDS) + ["auto"]
+
+
+def resolve_backend(name: str | None = None) -> str:
+    """
+    Concrete backend name for a choice ("auto" → the fastest installed one).
+    Raises ValueError for unknown names.
+    """
+    name = (name or DEFAULT_PDF_BACKEND).lower()
+    if name == "auto":
+        return next((n for n in AUTO_ORDER if PDF_BACKENDS[n].available()), DEFAULT_PDF_BACKEND)
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r} (choose from {', '.join(BACKEND_CHOICES)})")
+    return name
+
+
+def get_backend(name: str | None = None, layout: bool = False) -> PdfBackend:
+    """
+    The backend instance for a name. Raises ValueError if it cannot do layout mode.
+    """
+    backend = PDF_BACKENDS[resolve_backend(name)]
+    if layout and not backend.layout:
+        raise ValueError(f"PDF backend {backend.name!r} has no layout mode")
+    return backend
+
+
+def check_backend(name: str | None = None, layout: bool = False) -> PdfBackend:
+    """
+    get_backend() for a user's choice, which must also be installed (otherwise every
+    PDF would silently read as "").
+    """
+    backend = get_backend(name, layout)
+    if not backend.available():
+        raise ValueError(f"PDF backend {backend.name!r} is not installed (pip install {backend.package})")
+    return backend
+
+
+# ====== Backend comparison ======
+def compare_backends(paths: list, repeat: int = 3, patterns=None) -> list:
+    """
+    Time every installed backend (and its layout mode) on the given PDFs.
+    patterns: optional regexes; hits over all PDFs are counted per backend.
+    Returns one row per backend/mode: {"backend", "layout", "seconds", "pages",
+    "chars", "empty_pages", "pattern_hits"} (seconds = best of `repeat`, all files).
+    """
+    rows = []
+    regexes = [re.compile(p, re.I | re.M | re.S) for p in patterns or []]
+    for backend in PDF_BACKENDS.values():
+        if not backend.available():
+            continue
+        for layout in ([False, True] if backend.layout else [False]):
+            best, pages = None, []
+            for _ in range(max(1, repeat)):
+                t0 = time.perf_counter()
+                pages = [text for p in paths for text in backend.iter_pages(Path(p), layout=layout)]
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            text = "\n".join(pages)
+            rows.append({
+                "backend": backend.name,
+                "layout": layout,
+                "seconds": round(best, 4),
+                "pages": len(pages),
+                "chars": len(text),
+                "empty_pages": sum(1 for t in pages if not t.strip()),
+                "pattern_hits": sum(1 for r in regexes if r.search(text)),
+            })
+    return rows
+
+
+def rule_patterns(rules_json_path: str) -> list:
+    """
+    All positive / negative / forbidden patterns of a rules file, normalized as the
+    rule engine does (rule_engine.normalize_pattern); invalid patterns are skipped.
+    """
+    from rule_engine import FIELD_KEYS, normalize_pattern  # rule_engine imports this module
+    raw = json.loads(Path(rules_json_path).read_text(encoding="utf-8"))
+    rules = raw.get("rules", []) if isinstance(raw, dict) else raw
+    out = []
+    for r in rules:
+        for field in FIELD_KEYS:
+            for p in r.get(field, []):
+                try:
+                    out.append(normalize_pattern(p))
+                except re.error:
+                    pass
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compare PDF extraction backends")
+    ap.add_argument("pdfs", nargs="*", help="PDF files (default: the PDFs next to this script)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per backend (default: %(default)s)")
+    ap.add_argument("--rules", default=None, help="rules JSON whose patterns are counted per backend")
+    args = ap.parse_args()
+    pdfs = args.pdfs or sorted(str(p) for p in Path(__file__).resolve().parent.glob("*.pdf"))
+    if not pdfs:
+        sys.exit("No PDF files given")
+    print(f"{len(pdfs)} PDF(s); not installed: "
+          + (", ".join(n for n, b in PDF_BACKENDS.items() if not b.available()) or "-"))
+    rows = compare_backends(pdfs, args.repeat, rule_patterns(args.rules) if args.rules else None)
+    print(f"{'backend':10s} {'layout':6s} {'seconds':>8s} {'pages':>6s} {'chars':>8s} {'empty':>6s} {'hits':>5s}")
+    for r in rows:
+        print(f"{r['backend']:10s} {str(r['layout']):6s} {r['seconds']:8.3f} {r['pages']:6d} {r['chars']:8d} "
+              f"{r['empty_pages']:6d} {r['pattern_hits']:5d}")
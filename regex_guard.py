@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Regex safety guard — pattern lint and per-rule time budget
+----------------------------------------------------------
+Rule patterns run with re.DOTALL over whole manuals, so a greedy chain such as
+"Shetach Hafala.*\\b(IANR|79b)\\b.*Settled Area" or "NVG.*(subject to|requires).*..."
+can backtrack for minutes on a long document, and a nested quantifier such as
+"(\\w+\\s?)*x" can take exponential time. Two layers keep one bad rule from stalling
+a run:
+
+1) lint_pattern() inspects the parsed regex when the rule set is compiled and
+   reports nested unbounded quantifiers and chains of two or more unbounded
+   wildcards (".*", ".+"). Rules with such patterns are "risky".
+2) run_with_budget() evaluates a risky rule in a forked child process and kills it
+   when it exceeds the rule time budget; the rule then reports REVIEW with a
+   timeout note (timeout_outcome) instead of hanging the run. Risky patterns are
+   left out of the shared pattern scan so they only ever run inside the budget.
+
+The child is forked, so documents are shared copy-on-write rather than pickled.
+Where "fork" is unavailable (Windows) rules run unguarded and a warning is printed.
+"""
+
+import multiprocessing as mp
+import sys
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+ANY, BRANCH, SUBPATTERN = sre_parse.ANY, sre_parse.BRANCH, sre_parse.SUBPATTERN
+ASSERT, ASSERT_NOT = sre_parse.ASSERT, sre_parse.ASSERT_NOT
+MAX_REPEAT, MIN_REPEAT, MAXREPEAT = sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.MAXREPEAT
+ATOMIC_GROUP = getattr(sre_parse, "ATOMIC_GROUP", None)            # Python 3.11+
+POSSESSIVE_REPEAT = getattr(sre_parse, "POSSESSIVE_REPEAT", None)
+GROUPREF_EXISTS = sre_parse.GROUPREF_EXISTS
+
+# Default per-rule budget (seconds) for risky rules
+DEFAULT_RULE_TIMEOUT = 60.0
+# Unbounded wildcards in one pattern from which it is reported
+WILDCARD_CHAIN = 2
+
+
+class RuleTimeout(Exception):
+    """
+    Raised by run_with_budget() when the budget is exceeded.
+    """
+
+
+# ====== Static lint ======
+def _children(op, av) -> list:
+    """
+    Sub-patterns of one parsed regex node.
+    """
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        return [av[2]]
+    if op is SUBPATTERN:
+        return [av[-1]]
+    if op is BRANCH:
+        return list(av[1])
+    if op in (ASSERT, ASSERT_NOT):
+        return [av[1]]
+    if op is ATOMIC_GROUP:
+        return [av]
+    if op is POSSESSIVE_REPEAT:
+        return [av[2]]
+    if op is GROUPREF_EXISTS:
+        return [p for p in av[1:] if p is not None]
+    return []
+
+
+def _has_unbounded_repeat(sub) -> bool:
+    for op, av in sub:
+        if op in (ATOMIC_GROUP, POSSESSIVE_REPEAT):
+            continue  # no backtracking into these
+        if op in (MAX_REPEAT, MIN_REPEAT) and av[1] == MAXREPEAT:
+            return True
+        if any(_has_unbounded_repeat(c) for c in _children(op, av)):
+            return True
+    return False
+
+
+def lint_pattern(pattern: str, flags: int = 0) -> list:
+    """
+    Backtracking hazards of one regex, as human-readable messages ([] = looks safe).
+    """
+    try:
+        tree = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []  # invalid patterns are reported by the rule compiler
+    issues = []
+    wildcards = 0
+
+    def walk(sub):
+        nonlocal wildcards
+        for op, av in sub:
+            if op in (MAX_REPEAT, MIN_REPEAT) and av[1] == MAXREPEAT:
+                body = list(av[2])
+                if len(body) == 1 and body[0][0] is ANY:
+                    wildcards += 1
+                elif _has_unbounded_repeat(av[2]) and not issues:
+                    issues.append("nested unbounded quantifiers (e.g. '(a+)+') can backtrack exponentially")
+            for c in _children(op, av):
+                walk(c)
+
+    walk(tree)
+    if wildcards >= WILDCARD_CHAIN:
+        issues.append(f"{wildcards} unbounded wildcards ('.*') backtrack like n^{wildcards} over a long "
+                      "document; bound them, e.g. '.{0,200}'")
+    return issues
+
+
+# ====== Time budget ======
+def fork_available() -> bool:
+    return "fork" in mp.get_all_start_methods()
+
+
+def _child(conn, fn, args):
+    try:
+        conn.send((True, fn(*args)))
+    except BaseException as e:
+        conn.send((False, e))
+    finally:
+        conn.close()
+
+
+_warned = False
+
+
+def run_with_budget(fn, args: tuple, seconds: float):
+    """
+    Run fn(*args) in a forked child and return its (picklable) result.
+    Raises RuleTimeout if it takes longer than `seconds`; re-raises the child's error.
+    """
+    global _warned
+    if not fork_available():
+        if not _warned:
+            print("[rules] no 'fork' start method: rule time budget not enforced", file=sys.stderr)
+            _warned = True
+        return fn(*args)
+    ctx = mp.get_context("fork")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(send, fn, args), daemon=True)
+    proc.start()
+    send.close()
+    try:
+        if not recv.poll(seconds):
+            proc.kill()
+            raise RuleTimeout(f"exceeded {seconds:g}s")
+        try:
+            ok, value = recv.recv()
+        except EOFError:
+            raise RuntimeError("rule worker exited without a result") from None
+    finally:
+        recv.close()
+        proc.join()
+    if not ok:
+        raise value
+    return value
+
+
+def timeout_outcome(seconds: float, patterns: list) -> dict:
+    """
+    REVIEW outcome for a rule that ran out of time.
+    """
+    return {
+        "decision": "REVIEW",
+        "matched_positive": [],
+        "matched_forbidden": [],
+        "matched_pattern": "",
+        "confidence": 0.0,
+        "notes": f"Timed out after {seconds:g}s (rule time budget); risky pattern(s): " + "; ".join(patterns)
+    }
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Report writer — stream report rows to XLSX / CSV / JSONL without pandas
+-----------------------------------------------------------------------
+The checker imported pandas (and with it numpy) only to build one DataFrame of
+report rows and call to_excel, and analyze_report.py imported it only to count the
+"Result" column; that import dominated small runs and quick summaries. Reports are
+now written row by row:
+
+- .xlsx: openpyxl write-only workbook (rows are serialized as they arrive, so
+  memory stays flat whatever the number of rules); sheet "Sheet1" as before
+- .csv:  UTF-8 with a BOM so Excel opens it with the right encoding
+- .jsonl: one JSON object per row
+
+The format follows the output file's suffix (anything else is written as XLSX).
+A report is written to a temporary file next to the target and moved into place
+when the writer is closed without an error, so a failed run never leaves a
+truncated report behind. openpyxl is imported only when an XLSX file is written
+or read.
+
+read_report() streams rows back from any of the three formats (analyze_report.py).
+"""
+
+import csv, json, os, re, sys
+from pathlib import Path
+
+FORMATS = {".xlsx": "xlsx", ".csv": "csv", ".jsonl": "jsonl"}
+DEFAULT_SHEET = "Sheet1"
+# Control characters Excel cannot store (DOCX text can contain \x07, \x0b, ...)
+ILLEGAL_XLSX_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Longest text an Excel cell holds (a greedy ".*" match can make a far longer snippet)
+XLSX_MAX_CELL = 32767
+
+
+def report_format(path) -> str:
+    return FORMATS.get(Path(path).suffix.lower(), "xlsx")
+
+
+def _cell(value):
+    if isinstance(value, str):
+        if len(value) > XLSX_MAX_CELL:
+            value = value[:XLSX_MAX_CELL - 1] + "…"
+        return ILLEGAL_XLSX_CHARS.sub(" ", value)
+    return value
+
+
+class ReportWriter:
+    """
+    Write report rows (dicts) with fixed columns to `path` as they are produced:
+
+        with ReportWriter("out.xlsx", REPORT_COLUMNS) as w:
+            for row in rows:
+                w.write(row)
+    """
+
+    def __init__(self, path, columns: list):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.format = report_format(path)
+        self.rows = 0
+        self._tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self._file = self._wb = self._ws = self._csv = None
+        if self.format == "xlsx":
+            from openpyxl import Workbook
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet(DEFAULT_SHEET)
+            self._ws.append(self.columns)
+        elif self.format == "csv":
+            self._file = open(self._tmp, "w", newline="", encoding="utf-8-sig")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+        else:
+            self._file = open(self._tmp, "w", encoding="utf-8")
+
+    def write(self, row: dict):
+        values = [row.get(c) for c in self.columns]
+        if self.format == "xlsx":
+            self._ws.append([_cell(v) for v in values])
+        elif self.format == "csv":
+            self._csv.writerow(["" if v is None else v for v in values])
+        else:
+            self._file.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str) + "\n")
+        self.rows += 1
+
+    def close(self):
+        """
+        Finish the file and move it into place.
+        """
+        if self._wb is not None:
+            self._wb.save(self._tmp)
+            self._wb = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.replace(self._tmp, self.path)
+
+    def discard(self):
+        """
+        Drop a partially written report.
+        """
+        self._wb = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_report(rows, path, columns: list) -> int:
+    """
+    Write all rows at once; returns the number of rows written.
+    """
+    with ReportWriter(path, columns) as w:
+        for row in rows:
+            w.write(row)
+    return w.rows
+
+
+def write_workbook(path, sheets: dict):
+    """
+    Several sheets into one XLSX workbook: {sheet name: (columns, rows)}.
+    """
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for name, (columns, rows) in sheets.items():
+        ws = wb.create_sheet(name)
+        ws.append(list(columns))
+        for row in rows:
+            ws.append([_cell(row.get(c)) for c in columns])
+    wb.save(path)
+
+
+def read_report(path):
+    """
+    Yield the rows of a report written in any supported format, as dicts
+    (first sheet for XLSX; empty cells are None).
+    """
+    fmt = report_format(path)
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == "csv":
+        csv.field_size_limit(sys.maxsize)  # evidence cells can exceed the 128 KB default
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            for values in rows:
+                yield dict(zip(header, values))
+        finally:
+            wb.close()
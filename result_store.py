@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Result store — every run's outcomes in one indexed SQLite file
+--------------------------------------------------------------
+A run's only record was its Excel report: analyze_report.py read it back row by row
+to count FOUND / MISSING (CONFLICT and REVIEW were never counted), and comparing two
+runs meant opening two workbooks. With --store, each run appends its results to an
+SQLite database (sqlite3, no extra dependency):
+
+- runs:     one row per run (time, label e.g. the operator in batch mode, rules
+            file, report path, settings, rule count, wall time)
+- results:  one row per rule and run, typed columns: rule id, decision, confidence,
+            evaluation seconds, whether it was re-evaluated (incremental runs reuse
+            rows), plus the full report row as JSON for exports
+- evidence: one row per evidence offset (document, character offset, positive or
+            forbidden) so evidence can be queried without parsing report cells
+
+Results are indexed by (run, decision) and (rule, run); summaries, per-run trends
+and decision changes between runs are single GROUP BY / join queries instead of
+Python loops over report rows. The Excel / CSV / JSONL report is one export of a
+stored run (export_run). A run is written in one transaction when the run
+succeeds, so a failed run leaves no partial results.
+"""
+
+import json, sqlite3, time
+from datetime import datetime
+from pathlib import Path
+
+from report_writer import write_report
+
+DEFAULT_STORE = "compliance_results.sqlite"
+DECISIONS = ["FOUND", "MISSING", "CONFLICT", "REVIEW"]
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     INTEGER PRIMARY KEY,
+    started    TEXT NOT NULL,
+    label      TEXT NOT NULL DEFAULT '',
+    rules_file TEXT,
+    report     TEXT,
+    settings   TEXT,
+    rules      INTEGER NOT NULL DEFAULT 0,
+    seconds    REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id     INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    rule_id    TEXT NOT NULL,
+    decision   TEXT NOT NULL,
+    confidence REAL,
+    seconds    REAL,
+    evaluated  INTEGER NOT NULL DEFAULT 1,
+    row        TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evidence (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    rule_id     TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    doc         TEXT NOT NULL,
+    char_offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run_decision ON results(run_id, decision);
+CREATE INDEX IF NOT EXISTS results_rule_run ON results(rule_id, run_id);
+CREATE INDEX IF NOT EXISTS evidence_run_rule ON evidence(run_id, rule_id);
+CREATE INDEX IF NOT EXISTS runs_label ON runs(label, run_id);
+"""
+
+# One "SUM(decision = ...)" column per decision (counts per run in a single pass)
+DECISION_SUMS = ", ".join(f"SUM(decision = '{d}') AS {d}" for d in DECISIONS)
+
+
+class ResultStore:
+    """
+    Runs and per-rule results in an SQLite file:
+
+        with ResultStore("results.sqlite") as store:
+            run = store.recorder(label="BROOK", rules_file="rules.json")
+            for row, outcome in ...:
+                run.write(row, outcome)
+            run.close()
+            print(store.summary(run.run_id))
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{self.path}: result store schema {version} is newer than this checker's ({SCHEMA_VERSION})")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---- writing ----
+    def recorder(self, label: str = "", rules_file: str | None = None, report: str | None = None,
+                 settings: dict | None = None) -> "RunRecorder":
+        return RunRecorder(self, label, rules_file, report, settings)
+
+    def delete_run(self, run_id: int):
+        with self.db:
+            self.db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    # ---- queries ----
+    def runs(self, label: str | None = None, limit: int | None = None) -> list:
+        """
+        Stored runs, newest first, with their decision counts.
+        """
+        where, params = ("WHERE r.label = ?", [label]) if label is not None else ("", [])
+        sql = (f"SELECT r.*, {DECISION_SUMS} FROM runs r LEFT JOIN results USING (run_id) {where} "
+               "GROUP BY r.run_id ORDER BY r.run_id DESC")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(x) for x in self.db.execute(sql, params)]
+
+    def latest_run(self, label: str | None = None, before: int | None = None) -> int | None:
+        """
+        Id of the newest run (of a label; older than run `before`), None if there is none.
+        """
+        sql, params = "SELECT MAX(run_id) FROM runs WHERE 1", []
+        if label is not None:
+            sql += " AND label = ?"
+            params.append(label)
+        if before is not None:
+            sql += " AND run_id < ?"
+            params.append(before)
+        return self.db.execute(sql, params).fetchone()[0]
+
+    def run_info(self, run_id: int) -> dict | None:
+        r = self.db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(r) if r is not None else None
+
+    def summary(self, run_id: int) -> dict:
+        """
+        Per decision (all four, zero if absent): {"rules", "avg_confidence", "seconds"}.
+        """
+        out = {d: {"rules": 0, "avg_confidence": None, "seconds": 0.0} for d in DECISIONS}
+        for r in self.db.execute("SELECT decision, COUNT(*) AS n, AVG(confidence) AS conf, "
+                                 "TOTAL(seconds) AS secs FROM results WHERE run_id = ? GROUP BY decision",
+                                 (run_id,)):
+            out[r["decision"]] = {"rules": r["n"], "avg_confidence": r["conf"], "seconds": r["secs"]}
+        return out
+
+    def trend(self, label: str | None = None, limit: int = 10) -> list:
+        """
+        Decision counts of the last `limit` runs (of a label), oldest first.
+        """
+        return list(reversed(self.runs(label, limit)))
+
+    def changes(self, old_run: int, new_run: int) -> list:
+        """
+        Rules whose decision differs between two runs (None = rule absent from that run):
+        [{"rule_id", "old", "new", "old_confidence", "new_confidence"}].
+        """
+        sql = """
+            SELECT n.rule_id, o.decision AS old, n.decision AS new,
+                   o.confidence AS old_confidence, n.confidence AS new_confidence
+            FROM results n LEFT JOIN results o ON o.run_id = :old AND o.rule_id = n.rule_id
+            WHERE n.run_id = :new AND o.decision IS NOT n.decision
+            UNION ALL
+            SELECT o.rule_id, o.decision, NULL, o.confidence, NULL
+            FROM results o WHERE o.run_id = :old
+              AND NOT EXISTS (SELECT 1 FROM results n WHERE n.run_id = :new AND n.rule_id = o.rule_id)
+            ORDER BY 1
+        """
+        return [dict(r) for r in self.db.execute(sql, {"old": old_run, "new": new_run})]
+
+    def slowest(self, run_id: int, limit: int = 5) -> list:
+        return [dict(r) for r in self.db.execute(
+            "SELECT rule_id, decision, seconds FROM results WHERE run_id = ? AND evaluated "
+            "ORDER BY seconds DESC LIMIT ?", (run_id, limit))]
+
+    def rule_seconds(self, label: str | None = None) -> dict:
+        """
+        Evaluation seconds of every rule in the latest run (of a label) that evaluated it:
+        rule id → seconds (shared_corpus.py schedules expensive rules first).
+        """
+        sql, params = ("SELECT s.rule_id, s.seconds, MAX(s.run_id) FROM results s JOIN runs r USING (run_id) "
+                       "WHERE s.evaluated AND s.seconds IS NOT NULL"), []
+        if label is not None:
+            sql += " AND r.label = ?"
+            params.append(label)
+        return {r[0]: r[1] for r in self.db.execute(sql + " GROUP BY s.rule_id", params)}
+
+    def results(self, run_id: int, decision: str | None = None) -> list:
+        """
+        (rule_id, decision, confidence) of a run in report order, optionally one decision only.
+        """
+        sql, params = "SELECT rule_id, decision, confidence FROM results WHERE run_id = ?", [run_id]
+        if decision is not None:
+            sql += " AND decision = ?"
+            params.append(decision)
+        return [dict(r) for r in self.db.execute(sql + " ORDER BY rowid", params)]
+
+    def evidence(self, run_id: int, rule_id: str) -> list:
+        return [dict(r) for r in self.db.execute(
+            "SELECT kind, doc, char_offset FROM evidence WHERE run_id = ? AND rule_id = ? ORDER BY rowid",
+            (run_id, rule_id))]
+
+    def rows(self, run_id: int):
+        """
+        Report rows of a run in report order.
+        """
+        for (row,) in self.db.execute("SELECT row FROM results WHERE run_id = ? ORDER BY rowid", (run_id,)):
+            yield json.loads(row)
+
+    def export_run(self, run_id: int, path, columns: list | None = None) -> int:
+        """
+        Write a stored run as a report (XLSX / CSV / JSONL by suffix, report_writer.py).
+        Columns default to those of the stored rows. Returns the number of rows.
+        """
+        rows = list(self.rows(run_id))
+        if columns is None:
+            columns = list(rows[0]) if rows else []
+        return write_report(rows, path, columns)
+
+
+class RunRecorder:
+    """
+    Collects the results of one run; close() writes the run in one transaction,
+    discard() drops it.
+    """
+
+    def __init__(self, store: ResultStore, label: str, rules_file, report, settings):
+        self.store = store
+        self.run_id = None
+        self._run = (datetime.now().isoformat(timespec="seconds"), label or "",
+                     str(rules_file) if rules_file else None, str(report) if report else None,
+                     json.dumps(settings or {}, sort_keys=True, default=str))
+        self._t0 = time.perf_counter()
+        self._results, self._evidence = [], []
+
+    def write(self, row: dict, outcome: dict | None = None):
+        """
+        Record one report row; outcome (rule_engine) adds timing and evidence offsets.
+        A row without outcome is a reused row (incremental mode).
+        """
+        rule_id = str(row.get("Rule ID"))
+        conf = row.get("Confidence")
+        self._results.append((rule_id, row.get("Result") or "", float(conf) if conf not in (None, "") else None,
+                              (outcome or {}).get("seconds"), int(outcome is not None),
+                              json.dumps(row, ensure_ascii=False, default=str)))
+        for kind, spots in ((outcome or {}).get("evidence_docs") or {}).items():
+            self._evidence.extend((rule_id, kind, doc, off) for doc, off in spots)
+
+    def close(self) -> int:
+        """
+        Write the run; returns its run id.
+        """
+        db = self.store.db
+        with db:
+            cur = db.execute("INSERT INTO runs (started, label, rules_file, report, settings, rules, seconds) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (*self._run, len(self._results), round(time.perf_counter() - self._t0, 4)))
+            self.run_id = cur.lastrowid
+            db.executemany("INSERT INTO results (run_id, rule_id, decision, confidence, seconds, evaluated, row) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?)", [(self.run_id, *r) for r in self._results])
+            db.executemany("INSERT INTO evidence (run_id, rule_id, kind, doc, char_offset) VALUES (?, ?, ?, ?, ?)",
+                           [(self.run_id, *e) for e in self._evidence])
+        self._results, self._evidence = [], []
+        return self.run_id
+
+    def discard(self):
+        self._results, self._evidence = [], []
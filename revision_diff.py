@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+Revision diff — what changed between two revisions of a manual, for compliance
+-------------------------------------------------------------------------------
+When an operator submits a new revision ("OMD - REV 05" → "OMD - REV 06") the
+whole check was re-run and the two Excel reports compared by eye. This tool:
+
+1) Extracts both revisions through the usual extraction layer (cache, PDF backend)
+   and splits them into paragraphs (DOCX paragraphs / table cells, lines for PDF and
+   text files), each reduced to a hash of its whitespace-normalized text.
+2) Aligns the two paragraph sequences patience-style: paragraphs that occur exactly
+   once in each revision are matched in order (longest increasing subsequence,
+   O(n log n)), and only the gaps between those anchors go through difflib, so
+   10k+ paragraph manuals align in well under a second. Runs of unmatched
+   paragraphs become passages: added, removed or changed (old → new), each with
+   its page / paragraph / section citation in both revisions (evidence_locator.py).
+3) Maps passages to the rules reading the document:
+   - a rule pattern (positive, negative, forbidden, contains_any, or for align rules
+     the registrations / ops_facts terms) matches in the passage or within
+     CONTEXT_CHARS of it, in either revision
+   - a pattern whose matches have no length bound (".*", lookarounds) finds different text
+     in the two revisions (compared over the whole document, under the rule time
+     budget of regex_guard.py; a rule whose comparison runs out of time is affected)
+   - the sections a section-scoped rule resolves to have different headings
+4) Re-evaluates only the affected rules, against both revisions (the other
+   documents as mapped in DOC_FILES), and reports old → new results.
+
+Usage:
+  python revision_diff.py "OMD - REV 05.docx" "OMD - REV 06.docx" --doc OM-D [--out omd_diff.xlsx]
+
+The XLSX output has a "Changes" sheet (one row per passage, with the rules it
+touches) and a "Rules" sheet (affected rules, reasons, old and new result); CSV /
+JSONL outputs hold the changes, with the rules next to them ("<name>.rules.<ext>").
+"""
+
+import argparse, sys, time
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from doc_extract import EXTRACTOR_VERSION, cache_versions, extract_options
+from doc_store import LazyDocStore, rule_source_docs
+from entity_index import REGISTRATION_RE
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR
+from pdf_backends import BACKEND_CHOICES, DEFAULT_PDF_BACKEND
+from regex_guard import DEFAULT_RULE_TIMEOUT, RuleTimeout, run_with_budget
+from report_writer import report_format, write_report, write_workbook
+from rule_engine import SECTION_SCOPES, CompiledOpsFacts, compile_rules
+from text_view import match_reach
+from run_compliance_check_semantic import DOC_FILES, load_ops_facts, load_rules, report_row
+
+# Text on either side of a passage a pattern match may reach into (covers negation windows)
+CONTEXT_CHARS = 300
+# Gaps between anchors larger than this (old × new paragraphs) are one replacement
+GAP_LIMIT = 4_000_000
+# Passage text shown in the output
+TEXT_CHARS = 2000
+
+CHANGE_COLUMNS = ["Change", "Old location", "New location", "Old text", "New text", "Rules"]
+RULE_COLUMNS = ["Rule ID", "Item", "Changes", "Why", "Old result", "New result"]
+
+
+# ====== Paragraphs ======
+def paragraph_starts(record: dict) -> list:
+    """
+    Start offsets of a record's paragraphs: DOCX segments, else lines.
+    """
+    loc = record.get("locations")
+    if loc and loc["start"]:
+        return list(loc["start"])
+    text = record["text"]
+    starts, i = [0], text.find("\n")
+    while i != -1:
+        starts.append(i + 1)
+        i = text.find("\n", i + 1)
+    return starts
+
+
+def paragraphs(record: dict) -> list:
+    """
+    [(start, end, normalized text)] of a record (end excludes the joining "\\n").
+    """
+    text, starts = record["text"], paragraph_starts(record)
+    out = []
+    for i, s in enumerate(starts):
+        e = starts[i + 1] - 1 if i + 1 < len(starts) else len(text)
+        out.append((s, max(s, e), " ".join(text[s:e].split())))
+    return out
+
+
+# ====== Alignment ======
+def _lis(pairs: list) -> list:
+    """
+    Longest run of (i, j) pairs increasing in both (pairs sorted by i; patience sorting).
+    """
+    tails, tail_idx, prev = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        p = bisect_left(tails, j)
+        if p == len(tails):
+            tails.append(j)
+            tail_idx.append(k)
+        else:
+            tails[p] = j
+            tail_idx[p] = k
+        prev[k] = tail_idx[p - 1] if p else None
+    out, k = [], tail_idx[-1] if tail_idx else None
+    while k is not None:
+        out.append(pairs[k])
+        k = prev[k]
+    return out[::-1]
+
+
+def align(a: list, b: list) -> list:
+    """
+    difflib-style opcodes ("equal" / "replace" / "delete" / "insert", i1, i2, j1, j2)
+    turning sequence a into b (hashable items). Items unique to both sequences anchor
+    the alignment; the gaps between anchors are diffed with difflib.
+    """
+    count_a, count_b = {}, {}
+    for x in a:
+        count_a[x] = count_a.get(x, 0) + 1
+    for x in b:
+        count_b[x] = count_b.get(x, 0) + 1
+    pos_b = {x: j for j, x in enumerate(b) if count_b[x] == 1}
+    anchors = _lis([(i, pos_b[x]) for i, x in enumerate(a) if count_a[x] == 1 and x in pos_b])
+
+    ops = []
+
+    def add(tag, i1, i2, j1, j2):
+        if i1 == i2 and j1 == j2:
+            return
+        if ops and ops[-1][0] == tag:
+            ops[-1] = (tag, ops[-1][1], i2, ops[-1][3], j2)
+        else:
+            ops.append((tag, i1, i2, j1, j2))
+
+    i = j = 0
+    for ai, bj in anchors + [(len(a), len(b))]:
+        if (ai - i) * (bj - j) > GAP_LIMIT:
+            add("replace", i, ai, j, bj)
+        elif ai > i or bj > j:
+            for tag, i1, i2, j1, j2 in SequenceMatcher(None, a[i:ai], b[j:bj], autojunk=False).get_opcodes():
+                add(tag, i + i1, i + i2, j + j1, j + j2)
+        add("equal", ai, min(ai + 1, len(a)), bj, min(bj + 1, len(b)))
+        i, j = ai + 1, bj + 1
+    return ops
+
+
+def diff_records(old: dict, new: dict) -> list:
+    """
+    Passages that differ between two extraction records:
+    [{"change": "added" | "removed" | "changed", "old": (start, end), "new": (start, end),
+      "old_text", "new_text"}] (character spans; an empty span marks the insertion point).
+    Changes to blank paragraphs only are left out.
+    """
+    pa, pb = paragraphs(old), paragraphs(new)
+    ids = {}
+    ha = [ids.setdefault(p[2], len(ids)) for p in pa]
+    hb = [ids.setdefault(p[2], len(ids)) for p in pb]
+    out = []
+    for tag, i1, i2, j1, j2 in align(ha, hb):
+        if tag == "equal":
+            continue
+        old_text = "\n".join(p[2] for p in pa[i1:i2] if p[2])
+        new_text = "\n".join(p[2] for p in pb[j1:j2] if p[2])
+        if not old_text and not new_text:
+            continue
+        span_a = (pa[i1][0], pa[i2 - 1][1]) if i2 > i1 else _insertion_point(pa, i1, old)
+        span_b = (pb[j1][0], pb[j2 - 1][1]) if j2 > j1 else _insertion_point(pb, j1, new)
+        change = "changed" if old_text and new_text else ("added" if new_text else "removed")
+        out.append({"change": change, "old": span_a, "new": span_b, "old_text": old_text, "new_text": new_text})
+    return out
+
+
+def _insertion_point(paras: list, i: int, record: dict) -> tuple:
+    pos = paras[i][0] if i < len(paras) else len(record["text"])
+    return pos, pos
+
+
+# ====== Rules touched by the changes ======
+def rule_probes(cr, ops_facts: CompiledOpsFacts | None) -> tuple:
+    """
+    (regexes, lowered needles) whose matches decide a compiled rule's outcome.
+    """
+    regexes = [r for r in (cr.pos_re, cr.neg_re, cr.forbid_re) if r is not None]
+    needles = [low for _, low in cr.legacy_patterns or ()]
+    if cr.rule_type == "align_with_opspecs":
+        of = cr.ops_facts or ops_facts
+        if of:
+            regexes.append(REGISTRATION_RE)
+            needles.extend(t.lower() for t in of.registrations + of.areas if t)
+    return regexes, needles
+
+
+def _matches(text: str, a: int, b: int, regexes, needles) -> bool:
+    a, b = max(0, a - CONTEXT_CHARS), min(len(text), b + CONTEXT_CHARS)
+    if any(r.search(text, a, b) for r in regexes):
+        return True
+    window = text[a:b].lower() if needles else ""
+    return any(n in window for n in needles)
+
+
+def _finds_different_text(regexes, old_text: str, new_text: str) -> bool:
+    return any([m.group() for m in r.finditer(old_text)] != [m.group() for m in r.finditer(new_text)]
+               for r in regexes)
+
+
+def affected_rules(compiled, doc_key: str, old_docs, new_docs, passages: list,
+                   ops_facts: dict | None = None, sectioned: bool = True,
+                   rule_timeout: float | None = DEFAULT_RULE_TIMEOUT) -> dict:
+    """
+    Rules reading `doc_key` that the passages may affect:
+    {rule index: {"passages": [passage index, ...], "why": [reason, ...]}}.
+    old_docs / new_docs: doc_store.LazyDocStore of each revision.
+    With rule_timeout (seconds), the whole-document comparison of a rule's unbounded
+    patterns runs under that budget; when it is exceeded the rule counts as affected.
+    """
+    old_text, new_text = old_docs.get(doc_key, ""), new_docs.get(doc_key, "")
+    global_of = compiled.compile_ops_facts(ops_facts)
+    out = {}
+    for i, cr in enumerate(compiled):
+        if doc_key not in rule_source_docs(cr.rule):
+            continue
+        regexes, needles = rule_probes(cr, global_of)
+        bounded = [r for r in regexes if match_reach(r) <= CONTEXT_CHARS]
+        hit, why = [], []
+        for k, p in enumerate(passages):
+            if (_matches(old_text, *p["old"], bounded, needles)
+                    or _matches(new_text, *p["new"], bounded, needles)):
+                hit.append(k)
+        if hit:
+            why.append("pattern near a change")
+        unbounded = [r for r in regexes if r not in bounded]
+        if unbounded:
+            args = (unbounded, old_text, new_text)
+            try:
+                differs = (run_with_budget(_finds_different_text, args, rule_timeout) if rule_timeout
+                           else _finds_different_text(*args))
+            except RuleTimeout:
+                why.append("affected (budget exceeded)")
+            else:
+                if differs:
+                    why.append("unbounded pattern matches different text")
+        anchors = cr.rule.get("anchor_sections") or []
+        if sectioned and anchors and cr.rule.get("scope") in SECTION_SCOPES:
+            titles = [docs.sections(doc_key).titles(anchors, cr.rule.get("anchor_synonyms"))
+                      for docs in (old_docs, new_docs)]
+            if titles[0] != titles[1]:
+                why.append("anchor section headings changed")
+        if why:
+            out[i] = {"passages": hit, "why": why}
+    return out
+
+
+# ====== Whole run ======
+def revision_diff(old_path: str, new_path: str, doc_key: str, rules_json_path: str,
+                  ops_facts_json_path: str | None = None, out_path: str | None = None,
+                  cache_dir: str | None = DEFAULT_CACHE_DIR, recheck: bool = True, sectioned: bool = True,
+                  pdf_backend: str = DEFAULT_PDF_BACKEND, pdf_layout: bool = False,
+                  rule_timeout: float = DEFAULT_RULE_TIMEOUT, guard_all: bool = False) -> dict:
+    """
+    Diff two revisions of document `doc_key`, map the changes to rules and (with
+    recheck) re-evaluate the affected rules on both revisions. rule_timeout and
+    guard_all bound the pattern work as in the main check (regex_guard.py). Returns
+    {"passages": [...], "rules": [rows of RULE_COLUMNS], "seconds": {...}}.
+    """
+    for p in (old_path, new_path):
+        if not Path(p).is_file():
+            raise FileNotFoundError(f"Revision not found: {p}")
+    t0 = time.perf_counter()
+    options = extract_options(pdf_backend, pdf_layout)
+    cache = ExtractionCache(cache_dir, version=EXTRACTOR_VERSION, versions=cache_versions(options)) if cache_dir else None
+    old_docs = LazyDocStore(dict(DOC_FILES, **{doc_key: old_path}), cache, options=options)
+    new_docs = LazyDocStore(dict(DOC_FILES, **{doc_key: new_path}), cache, options=options)
+    old_rec, new_rec = old_docs.record(doc_key), new_docs.record(doc_key)
+    t_extract = time.perf_counter()
+
+    passages = diff_records(old_rec, new_rec)
+    t_diff = time.perf_counter()
+
+    rules = load_rules(rules_json_path)
+    ops_facts = load_ops_facts(ops_facts_json_path)
+    compiled = compile_rules(rules, strict=False)
+    affected = affected_rules(compiled, doc_key, old_docs, new_docs, passages, ops_facts, sectioned,
+                              rule_timeout)
+    t_map = time.perf_counter()
+
+    results = {}
+    if recheck and affected:
+        subset = compiled.subset(sorted(affected))
+        for side, docs in (("old", old_docs), ("new", new_docs)):
+            evaluated = subset.evaluate(docs, ops_facts=ops_facts, sectioned=sectioned,
+                                        rule_timeout=rule_timeout, guard_all=guard_all)
+            for i, (cr, outcome) in zip(sorted(affected), evaluated):
+                results.setdefault(i, {})[side] = report_row(cr.rule, outcome)["Result"]
+    if cache is not None:
+        cache.flush()
+
+    for k, p in enumerate(passages):
+        p["old_at"] = old_docs.locator(doc_key).citation(p["old"][0])
+        p["new_at"] = new_docs.locator(doc_key).citation(p["new"][0])
+        p["rules"] = [str(compiled.rules[i].id) for i, a in affected.items() if k in a["passages"]]
+    rule_rows = [{
+        "Rule ID": compiled.rules[i].id,
+        "Item": compiled.rules[i].rule.get("item", ""),
+        "Changes": ", ".join(str(k + 1) for k in a["passages"]),
+        "Why": "; ".join(a["why"]),
+        "Old result": results.get(i, {}).get("old", ""),
+        "New result": results.get(i, {}).get("new", ""),
+    } for i, a in sorted(affected.items())]
+    if out_path:
+        export_diff(passages, rule_rows, out_path)
+    return {"passages": passages, "rules": rule_rows, "rules_total": len(compiled),
+            "seconds": {"extract": t_extract - t0, "diff": t_diff - t_extract, "map": t_map - t_diff,
+                        "recheck": time.perf_counter() - t_map}}
+
+
+def change_rows(passages: list) -> list:
+    return [{
+        "Change": p["change"],
+        "Old location": p["old_at"] if p["old_text"] else f"(after) {p['old_at']}",
+        "New location": p["new_at"] if p["new_text"] else f"(after) {p['new_at']}",
+        "Old text": p["old_text"][:TEXT_CHARS],
+        "New text": p["new_text"][:TEXT_CHARS],
+        "Rules": ", ".join(p["rules"]),
+    } for p in passages]
+
+
+def export_diff(passages: list, rule_rows: list, path: str):
+    """
+    "Changes" and "Rules" sheets (XLSX), or the changes and "<name>.rules.<ext>" (CSV / JSONL).
+    """
+    if report_format(path) == "xlsx":
+        write_workbook(path, {"Changes": (CHANGE_COLUMNS, change_rows(passages)),
+                              "Rules": (RULE_COLUMNS, rule_rows)})
+    else:
+        p = Path(path)
+        write_report(change_rows(passages), p, CHANGE_COLUMNS)
+        write_report(rule_rows, p.with_name(f"{p.stem}.rules{p.suffix}"), RULE_COLUMNS)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Diff two revisions of a manual and re-check the rules the changes touch")
+    ap.add_argument("old", help="previous revision (DOCX / PDF / TXT)")
+    ap.add_argument("new", help="new revision")
+    ap.add_argument("--doc", required=True, help="document key the revisions are mapped to (e.g. OM-D)")
+    ap.add_argument("--rules", default="brook_semantic_rules.json", help="rules JSON (default: %(default)s)")
+    ap.add_argument("--ops-facts", default=None, help="ops_facts JSON for align_with_opspecs rules")
+    ap.add_argument("--out", default=None, help="write the changes and affected rules (.xlsx, .csv or .jsonl)")
+    ap.add_argument("--no-recheck", action="store_true", help="only map changes to rules, do not re-evaluate them")
+    ap.add_argument("--no-sections", action="store_true", help="ignore anchor_sections")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                    help="directory of the extracted-text cache (default: %(default)s)")
+    ap.add_argument("--no-cache", action="store_true", help="always re-extract documents")
+    ap.add_argument("--pdf-backend", choices=BACKEND_CHOICES, default=DEFAULT_PDF_BACKEND,
+                    help="PDF text engine (default: %(default)s; see pdf_backends.py)")
+    ap.add_argument("--pdf-layout", action="store_true",
+                    help="layout-preserving PDF text (pypdf, pdfminer, pymupdf)")
+    ap.add_argument("--rule-timeout", type=float, default=DEFAULT_RULE_TIMEOUT, metavar="SECONDS",
+                    help="time budget per risky rule, then REVIEW (0 = no budget; default: %(default)s)")
+    ap.add_argument("--guard-all", action="store_true",
+                    help="apply the time budget to every rule, not only those with risky patterns")
+    args = ap.parse_args(argv)
+    for p in (args.old, args.new):
+        if not Path(p).is_file():
+            ap.error(f"revision not found: {p}")
+    try:
+        extract_options(args.pdf_backend, args.pdf_layout)
+    except ValueError as e:
+        ap.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    res = revision_diff(args.old, args.new, args.doc, args.rules, args.ops_facts, args.out,
+                        cache_dir=None if args.no_cache else args.cache_dir, recheck=not args.no_recheck,
+                        sectioned=not args.no_sections, pdf_backend=args.pdf_backend, pdf_layout=args.pdf_layout,
+                        rule_timeout=args.rule_timeout, guard_all=args.guard_all)
+    counts = {c: sum(1 for p in res["passages"] if p["change"] == c) for c in ("added", "removed", "changed")}
+    print(f"{args.doc}: {len(res['passages'])} changed passage(s) "
+          f"({', '.join(f'{n} {c}' for c, n in counts.items())}); "
+          f"{len(res['rules'])} of {res['rules_total']} rule(s) affected")
+    for r in res["rules"]:
+        result = f"{r['Old result']} → {r['New result']}" if r["Old result"] else "not re-checked"
+        print(f"  {r['Rule ID']}: {result} ({r['Why']}; changes {r['Changes'] or '-'})")
+    print("[diff] " + ", ".join(f"{k} {v:.2f}s" for k, v in res["seconds"].items()), file=sys.stderr)
@@ -0,0 +1,727 @@
+# -*- coding: utf-8 -*-
+"""
+Rule engine — compiled rule sets and semantic evaluation
+--------------------------------------------------------
+Evaluation used to rebuild every regex for every rule on every call
+(any_regex over positive/negative/forbidden patterns, re.escape per registration
+and area, the 4X-XXX scan per align rule). Rules are now compiled once:
+
+1) Validation: every pattern is compiled on its own so a bad regex is reported
+   with its rule id instead of failing somewhere inside a joined alternation.
+2) Normalization: leading inline flags such as "(?i)" are global-only in Python
+   and break when patterns are joined with "|". Flags already applied to every
+   rule (i, m, s) are dropped; any other leading flags become a scoped group
+   "(?x:...)". Inline flags elsewhere in a pattern are rejected.
+3) Sharing: identical (normalized) patterns and identical alternations are
+   compiled once and shared across rules.
+4) Safety: every pattern is linted for backtracking hazards (regex_guard.py); rules
+   with risky patterns can be evaluated under a time budget and report REVIEW
+   when they run out of time.
+
+compile_rules() returns a CompiledRuleSet that can be evaluated against any
+number of document sets (one per fleet tail, per manual revision, ...).
+evaluate_rule_semantic() keeps its original signature for single-rule use.
+"""
+
+import json, re, time
+
+from boundary_index import SENT_SPLIT, BoundaryIndex, ViewBoundaries
+# REGISTRATION_RE: registrations like 4X-BHS (align_with_opspecs detects extra tails); kept importable from here
+from entity_index import REGISTRATION_RE, ViewEntities
+from evidence_locator import cite_evidence, locate_evidence
+from regex_guard import RuleTimeout, lint_pattern, run_with_budget, timeout_outcome
+from text_view import TextView, text_spans
+
+RULE_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+GLOBAL_FLAG_CHARS = set("ims")  # already part of RULE_FLAGS
+LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+INLINE_FLAGS = re.compile(r"(?<!\\)\(\?[aiLmsux]+\)")
+
+# Rule scopes that restrict matching to anchor_sections
+SECTION_SCOPES = {"section", "sentence"}
+# Rule types for which any forbidden claim is a CONFLICT
+CONFLICT_TYPES = {"deny", "limit", "align_with_opspecs", "affirm"}
+
+# Rule fields holding regex lists → short keys used by CompiledRule.patterns
+FIELD_KEYS = {"positive_patterns": "pos", "negative_patterns": "neg", "forbidden_claims": "forbid"}
+
+# A rule without source_docs searches OpsSpecs (original default)
+DEFAULT_SOURCE_DOCS = ["OpsSpecs"]
+
+
+
+class RuleCompileError(ValueError):
+    """
+    Raised by compile_rules(strict=True) when one or more patterns are invalid.
+    """
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("Invalid rule patterns:\n  " + "\n  ".join(self.errors))
+
+
+# Text utilities (used by the semantic matcher)
+# Longest sentence returned as evidence (evidence_return "sentence"); longer → snippet
+SENTENCE_MAX_CHARS = 400
+
+def split_sentences(text: str):
+    """
+    Very naive sentence splitter. Good enough for audit snippets.
+    """
+    if not text:
+        return []
+    parts = SENT_SPLIT.split(text)
+    return [p.strip() for p in parts if p.strip()]
+
+def snippet(text: str, start: int, end: int, margin: int = 120) -> str:
+    """
+    Return a short, auditable snippet around a match.
+    """
+    a = max(0, start - margin)
+    b = min(len(text), end + margin)
+    return text[a:b].replace("\\n", " ").strip()
+
+def any_regex(patterns):
+    """
+    Compile a single regex from a list of regex strings (OR).
+    Returns compiled pattern or None if list is empty.
+    """
+    pats = [normalize_pattern(p) for p in (patterns or []) if p]
+    if not pats:
+        return None
+    return re.compile("(" + "|".join(pats) + ")", RULE_FLAGS)
+
+def find_all(pattern, text):
+    """
+    Yield match objects for a compiled regex pattern over text.
+    """
+    if not pattern or not text:
+        return []
+    return list(pattern.finditer(text))
+
+def window_has_negative(text: str, center_span, neg_re, char_window: int) -> bool:
+    """
+    Check whether any negative pattern appears within +/- char_window chars of a positive match.
+    (Kept for callers; rules measure the window in tokens, see negated().)
+    """
+    if not neg_re:
+        return False
+    s, e = center_span
+    a = max(0, s - char_window)
+    b = min(len(text), e + char_window)
+    return bool(neg_re.search(text[a:b]))
+
+
+# ====== Pattern normalization ======
+def normalize_pattern(pattern: str) -> str:
+    """
+    Make a single rule pattern safe to join into an alternation.
+    - "(?i)foo"  → "foo"        (i/m/s are applied to every rule anyway)
+    - "(?x)f o o" → "(?x:f o o)" (other flags are kept, scoped to the pattern)
+    Raises re.error if inline flags appear anywhere but the start.
+    """
+    m = LEADING_FLAGS.match(pattern)
+    if m:
+        flags = m.group(1)
+        rest = pattern[m.end():]
+        extra = "".join(c for c in flags if c not in GLOBAL_FLAG_CHARS)
+        pattern = f"(?{extra}:{rest})" if extra else rest
+    if INLINE_FLAGS.search(pattern):
+        raise re.error("inline flags are only allowed at the start of a pattern")
+    return pattern
+
+
+# ====== Compiled rules ======
+class CompiledOpsFacts:
+    """
+    Precompiled ops_facts lookups for align_with_opspecs rules.
+    """
+
+    def __init__(self, of: dict | None):
+        of = of or {}
+        self.present = bool(of)
+        self.registrations = list(of.get("registrations") or [])
+        self.regs_upper = {x.upper() for x in self.registrations}
+        self.areas = sorted({a.upper() for a in (of.get("area") or [])})
+
+    def __bool__(self):
+        # Mirrors the truthiness of the ops_facts dict the rule author supplied
+        return self.present
+
+
+class CompiledRule:
+    """
+    One rule with its regexes compiled. `rule` keeps the original dict.
+    """
+
+    __slots__ = ("rule", "id", "rule_type", "legacy_patterns", "pos_re", "neg_re",
+                 "forbid_re", "patterns", "threshold", "neg_tokens", "sentence_scope",
+                 "sentence_evidence", "ops_facts", "errors", "compile_seconds", "risky")
+
+    def __init__(self, rule: dict):
+        self.rule = rule
+        self.id = rule.get("id")
+        self.rule_type = rule.get("rule_type", "affirm")
+        self.legacy_patterns = None
+        self.pos_re = self.neg_re = self.forbid_re = None
+        self.patterns = {}  # "pos" / "neg" / "forbid" → normalized alternatives (for the scanner)
+        self.threshold = int(rule.get("threshold", 1))
+        # Negation window in tokens on either side of a hit (boundary_index.py)
+        self.neg_tokens = max(0, int(rule.get("negation_window_tokens", 12)))
+        # "sentence" scope keeps the negation window inside the hit's sentence
+        self.sentence_scope = rule.get("scope") == "sentence"
+        self.sentence_evidence = rule.get("evidence_return") == "sentence"
+        self.ops_facts = CompiledOpsFacts(rule.get("ops_facts")) if rule.get("ops_facts") else None
+        self.errors = []
+        self.compile_seconds = 0.0
+        self.risky = []  # normalized patterns flagged by regex_guard.lint_pattern
+
+    @property
+    def source_docs(self):
+        return self.rule.get("source_docs", DEFAULT_SOURCE_DOCS)
+
+
+class CompiledRuleSet:
+    """
+    A validated, compiled rule set. Evaluate it against as many document sets as needed.
+    """
+
+    def __init__(self, rules: list, strict: bool = True):
+        self._patterns = {}      # raw pattern → normalized pattern (shared across rules)
+        self._alternations = {}  # tuple of normalized patterns → compiled regex
+        self._ops_facts = {}     # json of global ops_facts → CompiledOpsFacts
+        self._scan_plan = None   # pattern_scanner.ScanPlan, built on first evaluate()
+        self._lint = {}          # normalized pattern → lint messages
+        self.errors = []
+        self.lint = []           # "RULE field: pattern: issue" for risky patterns
+        self.rules = []
+        for r in rules:
+            t0 = time.perf_counter()
+            cr = self._compile_rule(r)
+            cr.compile_seconds = time.perf_counter() - t0
+            self.rules.append(cr)
+        if strict and self.errors:
+            raise RuleCompileError(self.errors)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    # ---- compilation ----
+    def _normalize(self, rule_id, field, pattern, errors):
+        if pattern in self._patterns:
+            return self._patterns[pattern]
+        try:
+            norm = normalize_pattern(pattern)
+            re.compile(norm, RULE_FLAGS)
+        except re.error as e:
+            errors.append(f"{rule_id} {field}: {pattern!r}: {e}")
+            return None
+        self._patterns[pattern] = norm
+        return norm
+
+    def _alternation(self, cr, field, patterns, errors):
+        rule_id = cr.id
+        pats = []
+        for p in (patterns or []):
+            if not p:
+                continue
+            norm = self._normalize(rule_id, field, p, errors)
+            if norm is not None:
+                pats.append(norm)
+        if not pats:
+            return None
+        key = tuple(pats)
+        cr.patterns[FIELD_KEYS[field]] = key
+        if key not in self._alternations:
+            try:
+                self._alternations[key] = re.compile("(" + "|".join(pats) + ")", RULE_FLAGS)
+            except re.error as e:
+                # Each pattern is valid alone but not together (e.g. duplicate group names)
+                errors.append(f"{rule_id} {field}: patterns cannot be combined: {e}")
+                return None
+        return self._alternations[key]
+
+    def _compile_rule(self, rule: dict) -> CompiledRule:
+        cr = CompiledRule(rule)
+        checks = rule.get("checks", [])
+        if checks:
+            cr.legacy_patterns = [pat for chk in checks if chk.get("type") == "contains_any"
+                                  for pat in (chk.get("patterns") or []) if pat]
+            cr.legacy_patterns = [(pat, pat.lower()) for pat in cr.legacy_patterns]
+            return cr
+        errors = []
+        cr.pos_re = self._alternation(cr, "positive_patterns", rule.get("positive_patterns"), errors)
+        cr.neg_re = self._alternation(cr, "negative_patterns", rule.get("negative_patterns"), errors)
+        cr.forbid_re = self._alternation(cr, "forbidden_claims", rule.get("forbidden_claims"), errors)
+        cr.errors = errors
+        self.errors.extend(errors)
+        for field, key in FIELD_KEYS.items():
+            for src in cr.patterns.get(key, ()):
+                if src not in self._lint:
+                    self._lint[src] = lint_pattern(src, RULE_FLAGS)
+                if self._lint[src] and src not in cr.risky:
+                    cr.risky.append(src)
+                    self.lint.extend(f"{cr.id} {field}: {src!r}: {issue}" for issue in self._lint[src])
+        return cr
+
+    @property
+    def risky_patterns(self) -> set:
+        return {src for src, issues in self._lint.items() if issues}
+
+    def compile_ops_facts(self, ops_facts: dict | None) -> CompiledOpsFacts | None:
+        """
+        Compile (and memoize) the global ops_facts used by align rules.
+        """
+        if not ops_facts:
+            return None
+        key = json.dumps(ops_facts, sort_keys=True, default=str)
+        if key not in self._ops_facts:
+            self._ops_facts[key] = CompiledOpsFacts(ops_facts)
+        return self._ops_facts[key]
+
+    def subset(self, indices) -> "CompiledRuleSet":
+        """
+        The rules at `indices` (in that order) as a rule set sharing this one's compiled
+        patterns, lint and ops_facts (shared_corpus.py evaluates a few rules per task).
+        """
+        sub = object.__new__(CompiledRuleSet)
+        sub.__dict__.update(self.__dict__)
+        sub.rules = [self.rules[i] for i in indices]
+        sub._scan_plan = None
+        return sub
+
+    def stats(self) -> dict:
+        return {"rules": len(self.rules), "unique_patterns": len(self._patterns),
+                "compiled_regexes": len(self._alternations), "errors": len(self.errors)}
+
+    # ---- evaluation ----
+    def evaluate(self, docs, ops_facts: dict | None = None, sectioned: bool = True, profile=None,
+                 rule_timeout: float | None = None, guard_all: bool = False):
+        """
+        Evaluate every rule against a document set (dict-like doc_key → text).
+        Yields (compiled_rule, outcome) in rule order. Each document is scanned once for
+        the patterns of all rules (pattern_scanner.py); rules see their source_docs through
+        a TextView (text_view.py) rather than a concatenated copy, and consecutive rules
+        with the same source_docs share one view and one registration scan.
+
+        If `docs` provides sections(key) (doc_store.LazyDocStore) and sectioned is True,
+        rules with anchor_sections are matched only inside the matching sections.
+        `profile` (run_profile.RunProfile) collects per-rule and per-pattern timings.
+        Outcomes also carry "seconds" (evaluation time) and "evidence_docs" (document
+        and offset of each snippet, evidence_locator.locate_evidence).
+        If `docs` provides locator(key) (doc_store.LazyDocStore), outcomes get
+        "citations" (page / paragraph / section of the evidence, evidence_locator.py);
+        with boundaries(key), negation windows and sentence evidence use each document's
+        BoundaryIndex (boundary_index.py) instead of one built over the view, and with
+        entities(key), align checks look registrations and ops_facts terms up in each
+        document's EntityIndex (entity_index.py).
+
+        Forbidden claims of section-scoped deny / limit / align / affirm rules are
+        searched in the whole source_docs, so a conflict outside the anchor sections
+        is still reported.
+
+        With rule_timeout (seconds), rules with risky patterns (or every rule with
+        guard_all) are evaluated under that budget (regex_guard.run_with_budget) and
+        report REVIEW with a timeout note when it runs out.
+        """
+        from pattern_scanner import ScanIndex, ScanPlan
+        if self._scan_plan is None:
+            self._scan_plan = ScanPlan(self)
+        scan = ScanIndex(self._scan_plan, docs, profile)
+        compiled_of = self.compile_ops_facts(ops_facts)
+        sections_of = getattr(docs, "sections", None) if sectioned else None
+        locator_of = getattr(docs, "locator", None)
+        boundaries_of = getattr(docs, "boundaries", None)
+        entities_of = getattr(docs, "entities", None)
+
+        def text_memo(view) -> TextMemo:
+            return TextMemo(ViewBoundaries(view, boundaries_of) if boundaries_of else None, entities_of)
+
+        memo = TextMemo()
+        last_key, doc_text = None, ""
+        for cr in self.rules:
+            t0 = time.perf_counter()
+            scoped = scoped_text(cr, docs, sections_of) if sections_of else None
+            if scoped is None or (cr.forbid_re is not None and cr.rule_type in CONFLICT_TYPES):
+                key = tuple(cr.source_docs)
+                if key != last_key:
+                    doc_text = TextView.of_documents(docs, key)
+                    last_key = key
+                    memo = text_memo(doc_text)
+            if scoped is not None:
+                text, searched = scoped
+                whole = (doc_text, memo, scan) if cr.forbid_re is not None and cr.rule_type in CONFLICT_TYPES else None
+                args = (cr, text, compiled_of, text_memo(text), None, profile, whole)
+            else:
+                args = (cr, doc_text, compiled_of, memo, scan, profile)
+            if rule_timeout and (cr.risky or guard_all):
+                try:
+                    outcome, child = run_with_budget(_evaluate_budgeted, args, rule_timeout)
+                    if child is not None:
+                        profile.merge(child)
+                except RuleTimeout:
+                    outcome = timeout_outcome(rule_timeout, cr.risky)
+                    if profile is not None:
+                        # The whole budget went into the rule's patterns
+                        profile.rule_regex(cr, "timeout", rule_timeout, 0)
+            else:
+                outcome = evaluate_compiled(*args)
+            view = args[1]
+            if outcome.pop("whole_documents", False):
+                view = doc_text  # conflict found outside the anchor sections
+            elif scoped is not None:
+                outcome["sections"] = searched
+            if outcome.get("evidence_at"):
+                outcome["evidence_docs"] = locate_evidence(outcome, view)
+                if locator_of is not None:
+                    outcome["citations"] = cite_evidence(outcome, view, locator_of)
+            outcome["seconds"] = time.perf_counter() - t0
+            if profile is not None:
+                profile.rule_done(cr, outcome["seconds"], outcome)
+            yield cr, outcome
+
+
+def scoped_text(cr: CompiledRule, docs, sections_of):
+    """
+    View of a rule's source_docs restricted to its anchor_sections (one TextView piece per
+    section, nothing is copied).
+
+    Returns (view, searched) where searched lists "DOC: heading" entries, or None if the
+    rule is not section-scoped or no anchor resolves in any document. A document where
+    no anchor resolves contributes its whole text (e.g. OpsSpecs without headings).
+    """
+    anchors = cr.rule.get("anchor_sections") or []
+    if not anchors or cr.rule.get("scope") not in SECTION_SCOPES:
+        return None
+    synonyms = cr.rule.get("anchor_synonyms")
+    pieces, searched, any_scoped = [], [], False
+    for k in cr.source_docs:
+        text = docs.get(k, "")
+        index = sections_of(k)
+        spans = index.spans(anchors, synonyms)
+        if spans:
+            any_scoped = True
+            pieces.extend((k, text, s, e) for s, e in spans)
+            searched.extend(f"{k}: {t}" for t in index.titles(anchors, synonyms))
+        else:
+            pieces.append((k, text, 0, len(text)))
+            if text:
+                searched.append(f"{k}: (whole document)")
+    if not any_scoped:
+        return None
+    return TextView(pieces), searched
+
+
+def compile_rules(rules: list, strict: bool = True) -> CompiledRuleSet:
+    """
+    Validate and compile a rule list. With strict=False invalid patterns are recorded in
+    .errors and the affected rules evaluate to REVIEW instead of raising.
+    """
+    return CompiledRuleSet(rules, strict=strict)
+
+
+class TextMemo:
+    """
+    Per-text derived values shared by rules evaluated against the same doc_text (view):
+    the lowered text, the registrations found in it (registration → first offset), its
+    token / sentence boundaries (BoundaryIndex or ViewBoundaries) and its entity lookups
+    (entity_index.ViewEntities over the documents' EntityIndex from entities_of), all
+    built on first use.
+    """
+
+    __slots__ = ("lower", "registrations", "bounds", "ents", "entities_of")
+
+    def __init__(self, bounds=None, entities_of=None):
+        self.lower = None
+        self.registrations = None
+        self.bounds = bounds
+        self.ents = None
+        self.entities_of = entities_of
+
+    def boundaries(self, doc_text):
+        if self.bounds is None:
+            self.bounds = BoundaryIndex(str(doc_text))
+        return self.bounds
+
+    def entities(self, doc_text) -> ViewEntities:
+        if self.ents is None:
+            self.ents = ViewEntities(doc_text, self.entities_of)
+        return self.ents
+
+
+def negated(cr: CompiledRule, span, memo: TextMemo, doc_text) -> bool:
+    """
+    Whether a negative pattern matches within the rule's token window around a hit
+    (clipped to the hit's sentence for sentence-scoped rules).
+    """
+    if not cr.neg_re:
+        return False
+    bounds = memo.boundaries(doc_text)
+    s, e = span
+    a, b = bounds.token_window(s, e, cr.neg_tokens)
+    if cr.sentence_scope:
+        sa, sb = bounds.sentence_span(s, e)
+        a, b = min(s, max(a, sa)), max(e, min(b, sb))
+    return bounds.has_match(cr.neg_re, a, b)
+
+
+def evidence(cr: CompiledRule, doc_text, s: int, e: int, memo: TextMemo) -> str:
+    """
+    Evidence for a match: its whole sentence for rules with evidence_return "sentence"
+    (unless longer than SENTENCE_MAX_CHARS), otherwise a snippet around it.
+    """
+    if cr.sentence_evidence:
+        a, b = memo.boundaries(doc_text).sentence_span(s, e)
+        if b - a <= SENTENCE_MAX_CHARS:
+            return " ".join(doc_text[a:b].split())
+    return snippet(doc_text, s, e)
+
+
+# ====== Core rule evaluation ======
+def _match_spans(cr: CompiledRule, field: str, regex, doc_text: str, scan, profile=None) -> list:
+    """
+    (start, end) of every match of a rule's alternation, from the scanner's precomputed
+    hits when available, otherwise by running the rule's own regex.
+    """
+    if scan is not None:
+        spans = scan.spans(cr, field, doc_text)
+        if spans is not None:
+            return spans
+    if profile is None:
+        return text_spans(regex, doc_text)
+    t0 = time.perf_counter()
+    spans = text_spans(regex, doc_text)
+    profile.rule_regex(cr, field, time.perf_counter() - t0, len(spans))
+    return spans
+
+
+def _evaluate_budgeted(cr: CompiledRule, doc_text, ops_facts, memo, scan, profile, whole=None):
+    """
+    evaluate_compiled() as run in the budget child: returns (outcome, RunProfile of the
+    timings collected there, or None) so the parent can merge them.
+    """
+    child = type(profile)() if profile is not None else None
+    return evaluate_compiled(cr, doc_text, ops_facts, memo, scan, child, whole), child
+
+
+def evaluate_compiled(cr: CompiledRule, doc_text: str, ops_facts: CompiledOpsFacts | None = None,
+                      memo: TextMemo | None = None, scan=None, profile=None, whole=None) -> dict:
+    """
+    Evaluate a compiled rule against document text (see evaluate_rule_semantic for semantics).
+    doc_text is a string or a text_view.TextView; `scan` is an optional
+    pattern_scanner.ScanIndex holding precomputed hits for doc_text.
+    whole: (text, memo, scan) of the rule's whole documents when doc_text is only its
+    anchor sections; forbidden claims are searched there first, and a conflict found
+    there is returned with "whole_documents": True (evidence offsets refer to that text).
+    """
+    memo = memo or TextMemo()
+
+    if cr.errors:
+        return {
+            "decision": "REVIEW",
+            "matched_positive": [],
+            "matched_forbidden": [],
+            "matched_pattern": "",
+            "confidence": 0.0,
+            "notes": "Invalid rule pattern(s): " + "; ".join(cr.errors)
+        }
+
+    # Backward compatibility path: original contains_any
+    if cr.legacy_patterns is not None:
+        if scan is not None:
+            found = scan.legacy_match(cr, doc_text or "")
+        else:
+            if memo.lower is None:
+                memo.lower = str(doc_text or "").lower()
+            found = next((pat for pat, pat_lower in cr.legacy_patterns if pat_lower in memo.lower), None)
+        if found is not None:
+            return {
+                "decision": "FOUND",
+                "matched_positive": [],
+                "matched_forbidden": [],
+                "matched_pattern": found,
+                "confidence": 0.6,
+                "notes": "Legacy contains_any match"
+            }
+        return {
+            "decision": "MISSING",
+            "matched_positive": [],
+            "matched_forbidden": [],
+            "matched_pattern": "",
+            "confidence": 0.0,
+            "notes": "Legacy contains_any not found"
+        }
+
+    # Semantic path
+    rule_type = cr.rule_type
+    pos_re, forbid_re = cr.pos_re, cr.forbid_re
+    threshold = cr.threshold
+
+    matched_positive_snips = []
+    matched_forbidden_snips = []
+    evidence_at = {"positive": [], "forbidden": []}  # doc_text offset of each snippet (citations)
+    first_pattern = ""
+
+    # 1) Forbidden claims (hard conflict), outside the anchor sections too
+    if forbid_re and whole is not None and rule_type in CONFLICT_TYPES:
+        w_text, w_memo, w_scan = whole
+        for s, e in _match_spans(cr, "forbid", forbid_re, w_text, w_scan, profile):
+            matched_forbidden_snips.append(evidence(cr, w_text, s, e, w_memo))
+            evidence_at["forbidden"].append(s)
+        if matched_forbidden_snips:
+            return {
+                "decision": "CONFLICT",
+                "matched_positive": [],
+                "matched_forbidden": matched_forbidden_snips,
+                "evidence_at": evidence_at,
+                "matched_pattern": first_pattern,
+                "confidence": 0.95,
+                "notes": "Forbidden claim(s) present (searched in the whole documents)",
+                "whole_documents": True,
+            }
+    elif forbid_re and doc_text:
+        for s, e in _match_spans(cr, "forbid", forbid_re, doc_text, scan, profile):
+            matched_forbidden_snips.append(evidence(cr, doc_text, s, e, memo))
+            evidence_at["forbidden"].append(s)
+    if matched_forbidden_snips and rule_type in CONFLICT_TYPES:
+        return {
+            "decision": "CONFLICT",
+            "matched_positive": [],
+            "matched_forbidden": matched_forbidden_snips,
+            "evidence_at": evidence_at,
+            "matched_pattern": first_pattern,
+            "confidence": 0.95,
+            "notes": "Forbidden claim(s) present"
+        }
+
+    # 2) Positive evidence with local negation check
+    pos_hits = 0
+    if pos_re and doc_text:
+        for s, e in _match_spans(cr, "pos", pos_re, doc_text, scan, profile):
+            if not negated(cr, (s, e), memo, doc_text):
+                pos_hits += 1
+                matched_positive_snips.append(evidence(cr, doc_text, s, e, memo))
+                evidence_at["positive"].append(s)
+                if not first_pattern:
+                    first_pattern = doc_text[s:e]
+            else:
+                # local contradiction near a positive — we will downgrade to REVIEW if no clean evidence
+                matched_forbidden_snips.append(evidence(cr, doc_text, s, e, memo))
+                evidence_at["forbidden"].append(s)
+
+    # 3) Align with ops_facts (simple, generic support for fleet/area)
+    notes = []
+    if rule_type == "align_with_opspecs" and (ops_facts or cr.ops_facts):
+        of = cr.ops_facts or ops_facts or CompiledOpsFacts(None)
+        ents = memo.entities(doc_text)  # per-document entity indexes (entity_index.py)
+        # a) Fleet registrations present
+        if of.registrations:
+            found = ents.find_terms(of.registrations)
+            missing = [r for r in of.registrations if r not in found]
+            if missing:
+                notes.append(f"Missing registrations in manuals: {', '.join(missing)}")
+        # b) Detect *extra* registrations (simple pattern 4X-XXX that are not in ops_facts)
+        if of.registrations:
+            if memo.registrations is None:
+                memo.registrations = ents.registrations()
+            extras = [r for r in sorted(memo.registrations) if r.upper() not in of.regs_upper]
+            if extras:
+                matched_forbidden_snips.extend([f"Extra reg in manuals: {x}" for x in extras])
+                evidence_at["forbidden"].extend(memo.registrations[x] for x in extras)
+        # c) Area (if provided)
+        if of.areas:
+            if not ents.find_terms(of.areas):
+                notes.append("Area from OpsSpecs not clearly stated in manuals")
+        # If we found extras → conflict; if missing → missing (unless other positives compensate)
+        if matched_forbidden_snips:
+            return {
+                "decision": "CONFLICT",
+                "matched_positive": matched_positive_snips,
+                "matched_forbidden": matched_forbidden_snips,
+                "evidence_at": evidence_at,
+                "matched_pattern": first_pattern,
+                "confidence": 0.9,
+                "notes": "; ".join(notes) if notes else "Conflict with ops_facts"
+            }
+        if notes and pos_hits < threshold:
+            return {
+                "decision": "MISSING",
+                "matched_positive": matched_positive_snips,
+                "matched_forbidden": [],
+                "evidence_at": evidence_at,
+                "matched_pattern": first_pattern,
+                "confidence": 0.2,
+                "notes": "; ".join(notes)
+            }
+
+    # 4) Decide
+    if pos_hits >= threshold:
+        return {
+            "decision": "FOUND",
+            "matched_positive": matched_positive_snips,
+            "matched_forbidden": [],
+            "evidence_at": evidence_at,
+            "matched_pattern": first_pattern,
+            "confidence": min(1.0, 0.6 + 0.2 * (pos_hits - threshold)),
+            "notes": ""
+        }
+    if matched_positive_snips and matched_forbidden_snips:
+        return {
+            "decision": "REVIEW",
+            "matched_positive": matched_positive_snips,
+            "matched_forbidden": matched_forbidden_snips,
+            "evidence_at": evidence_at,
+            "matched_pattern": first_pattern,
+            "confidence": 0.5,
+            "notes": "Positive evidence appears near negations/contradictions"
+        }
+    return {
+        "decision": "MISSING",
+        "matched_positive": [],
+        "matched_forbidden": [],
+        "evidence_at": evidence_at,
+        "matched_pattern": first_pattern,
+        "confidence": 0.0,
+        "notes": ""
+    }
+
+
+def evaluate_rule_semantic(rule: dict, doc_text: str, ops_facts: dict | None = None,
+                           timeout: float | None = None) -> dict:
+    """
+    Evaluate a rule against given document text.
+
+    Supports fields:
+      - rule_type: "affirm" | "deny" | "limit" | "align_with_opspecs" (affects semantics slightly)
+      - positive_patterns, negative_patterns, forbidden_claims (regex strings list)
+      - threshold (int), negation_window_tokens (int)
+      - ops_facts (dict) for certain align checks (e.g., fleet registrations)
+
+    Returns result dict with keys:
+      decision: FOUND/MISSING/CONFLICT/REVIEW
+      matched_positive: list of snippets
+      matched_forbidden: list of snippets
+      evidence_at: {"positive": [...], "forbidden": [...]} doc_text offset of each snippet
+                   (semantic rules; None for notes without a position)
+      matched_pattern: first pattern seen (for backward compat column)
+      confidence: float in [0,1]
+      notes: free text
+
+    With timeout (seconds) the evaluation runs under that budget and returns REVIEW
+    with a timeout note if it is exceeded.
+
+    One-off convenience wrapper; for many rules or many document sets compile once
+    with compile_rules() and call CompiledRuleSet.evaluate().
+    """
+    crs = CompiledRuleSet([rule], strict=False)
+    cr = crs.rules[0]
+    args = (cr, doc_text, crs.compile_ops_facts(ops_facts))
+    if timeout:
+        try:
+            return run_with_budget(evaluate_compiled, args, timeout)
+        except RuleTimeout:
+            return timeout_outcome(timeout, cr.risky)
+    return evaluate_compiled(*args)
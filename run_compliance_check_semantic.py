@@ -22,13 +22,111 @@ Key additions:
 4) Backward-compatibility:
    - If a rule only has: {"checks":[{"type":"contains_any","patterns":[...]}]} — it works as before.
 
-NOTE: Section-aware search (the "sectionizer") is NOT implemented here yet.
-      In the next step we will add it and route rule matching into anchor_sections.
+5) Extraction cache:
+   - Extracted document text is cached on disk (see extraction_cache.py), keyed by
+     file path + content hash and the extractor version, so re-runs after a
+     rules-only edit skip DOCX/PDF parsing entirely.
+
+6) Parallel extraction:
+   - Documents (and page ranges of large PDFs) are extracted on a process pool
+     (see parallel_extract.py); results are merged back in DOC_FILES order.
+
+7) Demand-driven loading:
+   - Only documents named in some rule's source_docs are extracted (doc_store.py);
+     unreferenced or missing files are reported before the run starts.
+
+8) Compiled rule set:
+   - All patterns are validated, normalized (leading "(?i)" etc.) and compiled once
+     per run (rule_engine.py); a rule with an invalid pattern reports REVIEW.
+
+9) Section-aware search:
+   - Documents are split into sections (DOCX heading styles, numbered headings in
+     PDFs; see sectionizer.py). Rules with anchor_sections and scope "section" or
+     "sentence" are matched only inside the matching sections; a document where no
+     anchor resolves is searched whole. --no-sections restores whole-document search.
+
+10) Incremental re-check:
+   - With --state, per-rule outcomes are stored with fingerprints of the rule and of
+     the text each rule searched (incremental.py); the next run re-evaluates only
+     rules whose fingerprints changed and reports the changed rows.
+
+11) Streaming extraction and text views:
+   - Documents are extracted as a stream of paragraphs/pages with stable page and
+     paragraph coordinates (doc_extract.iter_document); rules read their documents
+     and sections through TextViews (text_view.py) instead of per-rule copies.
+
+12) Run report:
+   - --profile writes per-stage, per-document, per-rule and per-pattern timings
+     ("<output>.profile.json/.csv", run_profile.py) and flags slow rules;
+     --cprofile dumps cProfile statistics of the whole run.
+
+13) Regex safety guard:
+   - Patterns are linted for nested / chained unbounded quantifiers when the rules
+     are compiled; rules with such patterns run under a time budget
+     (--rule-timeout, regex_guard.py) and report REVIEW instead of hanging.
+
+14) Table-aware DOCX extraction:
+   - DOCX text includes tables (MEL items, aerodrome and contact lists), nested
+     tables, text boxes and headers/footers; every paragraph keeps its location
+     (table / row / cell, approximate page) in the cached record (doc_extract.py).
+
+15) Pluggable PDF backends:
+   - --pdf-backend picks the PDF text engine (PyPDF2 by default, pypdf, pdfminer.six,
+     PyMuPDF or "auto"); --pdf-layout keeps form columns and footnote markers in
+     place (pdf_backends.py). Cached text is keyed by the backend and mode.
+
+16) Evidence citations:
+   - Every displayed positive / contradicting snippet is resolved to document, page,
+     paragraph (line) and section title by binary search over per-document offset
+     indexes (evidence_locator.py) and reported in the "Evidence location" column.
+
+17) Token and sentence boundaries:
+   - negation_window_tokens counts real tokens, "scope": "sentence" keeps the negation
+     window inside the hit's sentence and "evidence_return": "sentence" reports whole
+     sentences, all answered by bisection over per-document boundary arrays
+     (boundary_index.py).
+
+18) Streaming reports:
+   - Report rows are written as rules complete, to XLSX (openpyxl write-only), CSV or
+     JSONL by the output suffix (report_writer.py); pandas is no longer imported.
+
+19) Result store:
+   - --store appends every run (decision, confidence, timing and evidence offsets per
+     rule) to an indexed SQLite file (result_store.py); analyze_report.py --store
+     summarizes all four decisions and compares runs.
+
+20) Parallel rule evaluation:
+   - --eval-workers evaluates rules on several processes that read the documents from
+     one memory-mapped UTF-8 corpus (shared_corpus.py), most expensive rules first
+     (costs measured in the result store); rows and their order match a serial run.
+
+21) Entity index:
+   - align_with_opspecs checks look fleet registrations and areas up in per-document
+     entity indexes (registration hits and ops_facts term offsets, entity_index.py)
+     instead of searching the rule's text once per tail and area.
+
+22) Revision diff:
+   - revision_diff.py aligns two revisions of a manual by paragraph, maps the added,
+     removed and changed passages to the rules they touch and re-evaluates only
+     those rules on both revisions.
 """
 
-import json, re, sys
+import argparse, cProfile, fnmatch, json, os, sys, time
 from pathlib import Path
-import pandas as pd
+
+from doc_extract import EXTRACTOR_VERSION, cache_versions, extract_options, extractor_version, load_text_from_doc  # load_text_from_doc: kept importable from here
+from doc_store import LazyDocStore, prescan_rules, prescan_warnings, rule_source_docs
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from incremental import IncrementalPlan, RunState, diff_rows
+from pdf_backends import BACKEND_CHOICES, DEFAULT_PDF_BACKEND
+from regex_guard import DEFAULT_RULE_TIMEOUT
+from report_writer import ReportWriter, write_report
+from result_store import ResultStore
+from run_profile import RunProfile, stage
+from shared_corpus import evaluate_parallel
+# Text utilities and evaluate_rule_semantic live in rule_engine; re-exported for existing callers
+from rule_engine import (compile_rules, evaluate_rule_semantic, split_sentences, snippet,
+                         any_regex, find_all, window_has_negative)
 
 # ====== Document mapping (same as original) ======
 DOC_FILES = {
@@ -44,318 +142,302 @@ DOC_FILES = {
     "ERP": "ERP Draft - Final (1) (1).docx",
 }
 
-# ====== I/O helpers ======
-def load_text_from_doc(path: Path) -> str:
+def select_rules(rules: list, only=None) -> list:
     """
-    Load plain text from DOCX/PDF/TXT/MD.
-    - For DOCX use python-docx
-    - For PDF use PyPDF2 (layout is not preserved but ok for matching)
-    - Fail silently and return "" if the file cannot be read
+    Keep rules whose id matches any of the given ids / glob patterns (e.g. "NVG-*").
+    No filter → all rules.
     """
-    text = ""
-    if not path.exists():
-        return ""
-    lower = path.suffix.lower()
-    try:
-        if lower == ".docx":
-            from docx import Document
-            d = Document(str(path))
-            text = "\n".join(p.text for p in d.paragraphs)
-        elif lower == ".pdf":
-            import PyPDF2
-            with open(path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                pages = []
-                for p in reader.pages:
-                    try:
-                        pages.append(p.extract_text() or "")
-                    except Exception:
-                        pages.append("")
-                text = "\n".join(pages)
-        elif lower in [".txt", ".md"]:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        else:
-            text = ""
-    except Exception:
-        text = ""
-    return text
+    if not only:
+        return rules
+    return [r for r in rules if any(fnmatch.fnmatchcase(str(r.get("id", "")), pat) for pat in only)]
 
-# Text utilities (used by the semantic matcher) 
-SENT_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z(])")
+REPORT_COLUMNS = [
+    "Rule ID","Item","Source docs","Result",
+    "Matched pattern (if any)","Evidence (positive)","Contradiction (if any)","Evidence location",
+    "Confidence","Locator hint","Owner","Evidence (what to show)","Notes"
+]
 
-def split_sentences(text: str):
+def load_rules(rules_json_path: str) -> list:
     """
-    Very naive sentence splitter. Good enough for audit snippets.
+    Load rules JSON. Accept two shapes:
+      - {"rules": [...]} OR just a bare list [...]
     """
-    if not text:
-        return []
-    parts = SENT_SPLIT.split(text)
-    return [p.strip() for p in parts if p.strip()]
-
-def snippet(text: str, start: int, end: int, margin: int = 120) -> str:
-    """
-    Return a short, auditable snippet around a match.
-    """
-    a = max(0, start - margin)
-    b = min(len(text), end + margin)
-    return text[a:b].replace("\\n", " ").strip()
+    raw = json.loads(Path(rules_json_path).read_text(encoding="utf-8"))
+    if isinstance(raw, dict) and "rules" in raw:
+        return raw["rules"]
+    elif isinstance(raw, list):
+        return raw
+    raise ValueError("Unsupported rules JSON format")
 
-def any_regex(patterns):
+def load_ops_facts(ops_facts_json_path: str | None) -> dict | None:
     """
-    Compile a single regex from a list of regex strings (OR).
-    Returns compiled pattern or None if list is empty.
+    Optional ops_facts JSON for align_with_opspecs rules (None if absent or unreadable).
     """
-    pats = [p for p in (patterns or []) if p]
-    if not pats:
+    if not ops_facts_json_path:
+        return None
+    try:
+        return json.loads(Path(ops_facts_json_path).read_text(encoding="utf-8"))
+    except Exception:
         return None
-    return re.compile("(" + "|".join(pats) + ")", re.IGNORECASE | re.MULTILINE | re.DOTALL)
-
-def find_all(pattern, text):
-    """
-    Yield match objects for a compiled regex pattern over text.
-    """
-    if not pattern or not text:
-        return []
-    return list(pattern.finditer(text))
 
-def window_has_negative(text: str, center_span, neg_re, char_window: int) -> bool:
-    """
-    Check whether any negative pattern appears within +/- char_window chars of a positive match.
-    """
-    if not neg_re:
-        return False
-    s, e = center_span
-    a = max(0, s - char_window)
-    b = min(len(text), e + char_window)
-    return bool(neg_re.search(text[a:b]))
-
-#  Core rule evaluation
-def evaluate_rule_semantic(rule: dict, doc_text: str, ops_facts: dict | None = None) -> dict:
+def report_row(r: dict, outcome: dict) -> dict:
     """
-    Evaluate a rule against given document text.
-
-    Supports fields:
-      - rule_type: "affirm" | "deny" | "limit" | "align_with_opspecs" (affects semantics slightly)
-      - positive_patterns, negative_patterns, forbidden_claims (regex strings list)
-      - threshold (int), negation_window_tokens (int)
-      - ops_facts (dict) for certain align checks (e.g., fleet registrations)
-
-    Returns result dict with keys:
-      decision: FOUND/MISSING/CONFLICT/REVIEW
-      matched_positive: list of snippets
-      matched_forbidden: list of snippets
-      matched_pattern: first pattern seen (for backward compat column)
-      confidence: float in [0,1]
-      notes: free text
+    One report row (REPORT_COLUMNS) for a rule and its evaluation outcome.
     """
-    # Backward compatibility path: original contains_any
-    checks = rule.get("checks", [])
-    if checks:
-        for chk in checks:
-            if chk.get("type") == "contains_any":
-                for pat in (chk.get("patterns") or []):
-                    if pat and pat.lower() in (doc_text or "").lower():
-                        return {
-                            "decision": "FOUND",
-                            "matched_positive": [],
-                            "matched_forbidden": [],
-                            "matched_pattern": pat,
-                            "confidence": 0.6,
-                            "notes": "Legacy contains_any match"
-                        }
-        return {
-            "decision": "MISSING",
-            "matched_positive": [],
-            "matched_forbidden": [],
-            "matched_pattern": "",
-            "confidence": 0.0,
-            "notes": "Legacy contains_any not found"
-        }
-
-    # Semantic path
-    rule_type = rule.get("rule_type", "affirm")
-    pos_re = any_regex(rule.get("positive_patterns"))
-    neg_re = any_regex(rule.get("negative_patterns"))
-    forbid_re = any_regex(rule.get("forbidden_claims"))
-    threshold = int(rule.get("threshold", 1))
-    # Treat tokens window as ~6 chars per token → char window ~ 6 * tokens
-    char_window = max(0, int(rule.get("negation_window_tokens", 12)) * 6)
-
-    matched_positive_snips = []
-    matched_forbidden_snips = []
-    first_pattern = ""
-
-    # 1) Forbidden claims (hard conflict)
-    if forbid_re:
-        for m in find_all(forbid_re, doc_text):
-            matched_forbidden_snips.append(snippet(doc_text, m.start(), m.end()))
-    if matched_forbidden_snips and rule_type in {"deny", "limit", "align_with_opspecs", "affirm"}:
-        return {
-            "decision": "CONFLICT",
-            "matched_positive": [],
-            "matched_forbidden": matched_forbidden_snips,
-            "matched_pattern": first_pattern,
-            "confidence": 0.95,
-            "notes": "Forbidden claim(s) present"
-        }
-
-    # 2) Positive evidence with local negation check
-    pos_hits = 0
-    if pos_re:
-        for m in find_all(pos_re, doc_text):
-            if not window_has_negative(doc_text, m.span(), neg_re, char_window):
-                pos_hits += 1
-                matched_positive_snips.append(snippet(doc_text, m.start(), m.end()))
-                if not first_pattern:
-                    first_pattern = m.group(0)
-            else:
-                # local contradiction near a positive — we will downgrade to REVIEW if no clean evidence
-                matched_forbidden_snips.append(snippet(doc_text, m.start(), m.end()))
-
-    # 3) Align with ops_facts (simple, generic support for fleet/area)
-    notes = []
-    if rule_type == "align_with_opspecs" and (ops_facts or rule.get("ops_facts")):
-        of = rule.get("ops_facts") or ops_facts or {}
-        # a) Fleet registrations present
-        regs = of.get("registrations") or []
-        if regs:
-            missing = [r for r in regs if re.search(re.escape(r), doc_text, re.I) is None]
-            if missing:
-                notes.append(f"Missing registrations in manuals: {', '.join(missing)}")
-        # b) Detect *extra* registrations (simple pattern 4X-XXX that are not in ops_facts)
-        if regs:
-            all_regs_found = set(re.findall(r"\b[0-9A-Z]{1,2}-[A-Z]{3}\b", doc_text, re.I))
-            extras = [r for r in sorted(all_regs_found) if r.upper() not in {x.upper() for x in regs}]
-            if extras:
-                matched_forbidden_snips.extend([f"Extra reg in manuals: {x}" for x in extras])
-        # c) Area (if provided)
-        if of.get("area"):
-            desired = {a.upper() for a in of["area"]}
-            if not any(re.search(re.escape(a), doc_text, re.I) for a in desired):
-                notes.append("Area from OpsSpecs not clearly stated in manuals")
-        # If we found extras → conflict; if missing → missing (unless other positives compensate)
-        if matched_forbidden_snips:
-            return {
-                "decision": "CONFLICT",
-                "matched_positive": matched_positive_snips,
-                "matched_forbidden": matched_forbidden_snips,
-                "matched_pattern": first_pattern,
-                "confidence": 0.9,
-                "notes": "; ".join(notes) if notes else "Conflict with ops_facts"
-            }
-        if notes and pos_hits < threshold:
-            return {
-                "decision": "MISSING",
-                "matched_positive": matched_positive_snips,
-                "matched_forbidden": [],
-                "matched_pattern": first_pattern,
-                "confidence": 0.2,
-                "notes": "; ".join(notes)
-            }
-
-    # 4) Decide
-    if pos_hits >= threshold:
-        return {
-            "decision": "FOUND",
-            "matched_positive": matched_positive_snips,
-            "matched_forbidden": [],
-            "matched_pattern": first_pattern,
-            "confidence": min(1.0, 0.6 + 0.2 * (pos_hits - threshold)),
-            "notes": ""
-        }
-    if matched_positive_snips and matched_forbidden_snips:
-        return {
-            "decision": "REVIEW",
-            "matched_positive": matched_positive_snips,
-            "matched_forbidden": matched_forbidden_snips,
-            "matched_pattern": first_pattern,
-            "confidence": 0.5,
-            "notes": "Positive evidence appears near negations/contradictions"
-        }
+    notes = outcome.get("notes", "")
+    if outcome.get("sections"):
+        notes = "; ".join(x for x in [notes, "Sections searched: " + ", ".join(outcome["sections"])] if x)
+    cites = outcome.get("citations") or {}
+    located = " | ".join(c for c in cites.get("positive", []) if c)
+    contradicted = " | ".join(c for c in cites.get("forbidden", []) if c)
     return {
-        "decision": "MISSING",
-        "matched_positive": [],
-        "matched_forbidden": [],
-        "matched_pattern": first_pattern,
-        "confidence": 0.0,
-        "notes": ""
+        "Rule ID": r.get("id"),
+        "Item": r.get("item", ""),
+        "Source docs": ", ".join(rule_source_docs(r)),
+        "Result": outcome["decision"],                               # FOUND / MISSING / CONFLICT / REVIEW
+        "Matched pattern (if any)": outcome.get("matched_pattern",""),
+        "Evidence (positive)": " | ".join(outcome.get("matched_positive", [])[:3]),
+        "Contradiction (if any)": " | ".join(outcome.get("matched_forbidden", [])[:3]),
+        "Evidence location": "; ".join(x for x in [located, contradicted and "Contradiction: " + contradicted] if x),
+        "Confidence": round(float(outcome.get("confidence", 0.0)), 2),
+        "Locator hint": r.get("locator_hint", ""),
+        "Owner": r.get("owner", ""),
+        "Evidence (what to show)": "; ".join(r.get("evidence_hints", [])),
+        "Notes": notes
     }
 
-def main(rules_json_path: str, output_xlsx_path: str, ops_facts_json_path: str | None = None):
+def export_report(rows: list, output_xlsx_path: str):
+    """
+    Write report rows to XLSX, or CSV / JSONL by the output suffix (report_writer.py).
+    """
+    write_report(rows, output_xlsx_path, REPORT_COLUMNS)
+
+def main(rules_json_path: str, output_xlsx_path: str, ops_facts_json_path: str | None = None,
+         cache_dir: str | None = DEFAULT_CACHE_DIR, cache_max_bytes: int = DEFAULT_MAX_BYTES,
+         workers: int = 0, only=None, sectioned: bool = True, state_path: str | None = None,
+         profile: bool = False, rule_timeout: float = DEFAULT_RULE_TIMEOUT, guard_all: bool = False,
+         pdf_backend: str = DEFAULT_PDF_BACKEND, pdf_layout: bool = False,
+         store_path: str | None = None, store_label: str = "", eval_workers: int = 1):
     """
-    1) Load rules JSON. Accept two shapes:
-       - {"rules": [...]} OR just a bare list [...]
+    1) Load rules JSON (see load_rules), optionally filtered by rule id (`only`).
     2) Optionally load ops_facts JSON for align_with_opspecs rules.
-    3) Load/Cache all mapped documents.
-    4) Evaluate each rule and export an Excel file with auditable snippets.
+    3) Load the documents the rules reference, through the on-disk extraction cache
+       unless cache_dir is None, in parallel across `workers` processes
+       (0 = one per core, 1 = serial = lazily on first use). PDFs are read with
+       `pdf_backend` (pdf_backends.py), optionally in layout mode.
+    4) Evaluate each rule (on `eval_workers` processes sharing one memory-mapped copy
+       of the documents, 0 = one per core, 1 = in this process; shared_corpus.py) and export an Excel file with auditable snippets (or CSV /
+       JSONL by the output suffix); rows are written as the rules complete.
+       With state_path (incremental mode) only rules whose definition or searched
+       text changed since the stored run are evaluated; the rest are merged from the
+       state, and the changed rows are written to "<output>.changes.json".
+    5) With profile, write a run report ("<output>.profile.json/.csv", see run_profile.py).
+    6) With store_path, append the run's results to that result store under
+       `store_label` (result_store.py); returns the stored run id.
+    Rules with risky patterns (or all rules with guard_all) get `rule_timeout` seconds
+    each and report REVIEW when they run out (0 disables the budget; regex_guard.py).
     """
-    # ---- Load rules ----
-    raw = json.loads(Path(rules_json_path).read_text(encoding="utf-8"))
-    if isinstance(raw, dict) and "rules" in raw:
-        rules = raw["rules"]
-    elif isinstance(raw, list):
-        rules = raw
-    else:
-        raise ValueError("Unsupported rules JSON format")
-
-    # ---- Optional ops_facts ----
-    ops_facts = None
-    if ops_facts_json_path:
-        try:
-            ops_facts = json.loads(Path(ops_facts_json_path).read_text(encoding="utf-8"))
-        except Exception:
-            ops_facts = None
+    prof = RunProfile() if profile else None
+    t0 = time.perf_counter()
+    store = ResultStore(store_path) if store_path else None
+    recorder = None
+    if store is not None:
+        recorder = store.recorder(store_label, rules_json_path, output_xlsx_path, {
+            "pdf_backend": pdf_backend, "pdf_layout": pdf_layout, "sectioned": sectioned, "only": only,
+            "incremental": bool(state_path), "rule_timeout": rule_timeout, "guard_all": guard_all,
+            "eval_workers": eval_workers})
+    with stage(prof, "load_rules"):
+        rules = select_rules(load_rules(rules_json_path), only)
+        ops_facts = load_ops_facts(ops_facts_json_path)
+
+    options = extract_options(pdf_backend, pdf_layout)
+    cache = None
+    if cache_dir:
+        cache = ExtractionCache(cache_dir, version=EXTRACTOR_VERSION, max_bytes=cache_max_bytes,
+                                versions=cache_versions(options))
+    text_cache = LazyDocStore(DOC_FILES, cache, options=options)
+
+    # ---- Incremental mode: decide what must be re-evaluated ----
+    plan = None
+    todo = list(range(len(rules)))
+    if state_path:
+        with stage(prof, "incremental_plan"):
+            plan = IncrementalPlan(rules, RunState.load(state_path), DOC_FILES, text_cache,
+                                   ops_facts=ops_facts, sectioned=sectioned,
+                                   settings={"extractor": extractor_version(options), "rule_timeout": rule_timeout,
+                                             "guard_all": guard_all})
+            todo = plan.to_evaluate()
+        print(f"[incremental] {len(todo)} of {len(rules)} rule(s) to evaluate", file=sys.stderr)
+    eval_rules = [rules[i] for i in todo]
+
+    # ---- Compile rules once (validates and normalizes every pattern) ----
+    with stage(prof, "compile"):
+        compiled = compile_rules(eval_rules, strict=False)
+    for err in compiled.errors:
+        print(f"[rules] {err}", file=sys.stderr)
+    for msg in compiled.lint:
+        print(f"[rules] risky pattern: {msg}", file=sys.stderr)
 
     # ---- Load documents ----
-    text_cache = {}
-    for key, fname in DOC_FILES.items():
-        p = Path(fname)
-        text_cache[key] = load_text_from_doc(p)
-
-    # ---- Evaluate rules ----
-    results = []
-    for r in rules:
-        r_id = r.get("id")
-        item = r.get("item", "")
-        src_docs = r.get("source_docs", ["OpsSpecs"])
-        locator = r.get("locator_hint", "")
-        owner = r.get("owner", "")
-        evidence_hints = "; ".join(r.get("evidence_hints", []))
-
-        # Combine all selected docs (sectionizer to be added later)
-        doc_text = "\n".join(text_cache.get(k, "") for k in src_docs)
-
-        # Evaluate using semantic path with fallback to legacy
-        outcome = evaluate_rule_semantic(r, doc_text, ops_facts=ops_facts)
-
-        results.append({
-            "Rule ID": r_id,
-            "Item": item,
-            "Source docs": ", ".join(src_docs),
-            "Result": outcome["decision"],                               # FOUND / MISSING / CONFLICT / REVIEW
-            "Matched pattern (if any)": outcome.get("matched_pattern",""),
-            "Evidence (positive)": " | ".join(outcome.get("matched_positive", [])[:3]),
-            "Contradiction (if any)": " | ".join(outcome.get("matched_forbidden", [])[:3]),
-            "Confidence": round(float(outcome.get("confidence", 0.0)), 2),
-            "Locator hint": locator,
-            "Owner": owner,
-            "Evidence (what to show)": evidence_hints,
-            "Notes": outcome.get("notes","")
-        })
+    with stage(prof, "prescan"):
+        scan = prescan_rules(eval_rules, DOC_FILES)
+    for w in prescan_warnings(scan, DOC_FILES) if eval_rules else []:
+        print(f"[documents] {w}", file=sys.stderr)
+    if workers != 1:
+        with stage(prof, "extract"):
+            text_cache.prefetch(scan["referenced"], workers=workers or None)
+
+    # ---- Evaluate rules (serial runs extract lazily, inside this stage) ----
+    # Without a stored run every row is final as soon as its rule is done: stream it
+    writer = ReportWriter(output_xlsx_path, REPORT_COLUMNS) if plan is None else None
+    fresh, outcomes = {}, {}
+    eval_kwargs = dict(ops_facts=ops_facts, sectioned=sectioned, profile=prof, rule_timeout=rule_timeout,
+                       guard_all=guard_all)
+    if eval_workers != 1 and len(compiled) > 1:
+        measured = store.rule_seconds(store_label) if store is not None else None
+        evaluated = evaluate_parallel(compiled, text_cache, eval_workers or os.cpu_count() or 1, measured,
+                                      **eval_kwargs)
+    else:
+        evaluated = compiled.evaluate(text_cache, **eval_kwargs)
+    try:
+        with stage(prof, "evaluate"):
+            for j, (cr, outcome) in enumerate(evaluated):
+                row = report_row(cr.rule, outcome)
+                if writer is not None:
+                    writer.write(row)
+                    if recorder is not None:
+                        recorder.write(row, outcome)
+                else:
+                    fresh[todo[j]] = row
+                    plan.record(todo[j], row)
+                    if recorder is not None:
+                        outcomes[todo[j]] = {k: outcome.get(k) for k in ("seconds", "evidence_docs")}
+
+                # Free documents no later rule needs (keeps peak memory to the working set)
+                for k in rule_source_docs(cr.rule):
+                    if scan["last_use"].get(k) == j:
+                        text_cache.release(k)
+    except BaseException:
+        if writer is not None:
+            writer.discard()  # no half-written report
+        if store is not None:
+            store.close()
+        raise
+
+    # ---- Merge with the stored run (incremental) ----
+    if plan is not None:
+        results, changes = [], []
+        for i, key in enumerate(plan.keys):
+            if i in fresh:
+                prev = (plan.previous.get(key) or {}).get("row")
+                changed = diff_rows(prev, fresh[i])
+                if changed:
+                    changes.append({"Rule ID": key, "reason": plan.reasons[key], "fields": changed,
+                                    "old": (prev or {}).get("Result"), "new": fresh[i]["Result"]})
+                results.append(fresh[i])
+            else:
+                results.append(plan.reused_row(i))
+            if recorder is not None:
+                recorder.write(results[-1], outcomes.get(i))
+        removed = plan.finish(prune=not only)
+        changes.extend({"Rule ID": k, "reason": "rule removed", "fields": []} for k in removed)
+        plan.state.save(state_path)
+        Path(str(Path(output_xlsx_path).with_suffix("")) + ".changes.json").write_text(
+            json.dumps(changes, indent=1, default=str), encoding="utf-8")
+        for c in changes:
+            print(f"[incremental] {c['Rule ID']}: {c['reason']} → {', '.join(c['fields']) or 'removed'}",
+                  file=sys.stderr)
 
     # ---- Export ----
-    df_cols = [
-        "Rule ID","Item","Source docs","Result",
-        "Matched pattern (if any)","Evidence (positive)","Contradiction (if any)",
-        "Confidence","Locator hint","Owner","Evidence (what to show)","Notes"
-    ]
-    df = pd.DataFrame(results, columns=df_cols)
-    df.to_excel(output_xlsx_path, index=False)
+    with stage(prof, "export"):
+        if writer is not None:
+            writer.close()
+        else:
+            export_report(results, output_xlsx_path)
+
+    # ---- Result store ----
+    run_id = None
+    if store is not None:
+        with stage(prof, "store"):
+            run_id = recorder.close()
+        store.close()
+        print(f"[store] run {run_id} stored in {store_path}", file=sys.stderr)
+
+    # ---- Run report ----
+    if prof is not None:
+        prof.stages["total"] = time.perf_counter() - t0
+        prof.finish(text_cache, cache)
+        json_path, _ = prof.write(output_xlsx_path)
+        slow = [r for r in prof.rule_rows() if r["slow"]]
+        for r in slow:
+            print(f"[profile] slow rule {r['rule_id']}: regex {r['regex_s']:.3f}s "
+                  f"(slowest pattern: {r['slowest_pattern']!r})", file=sys.stderr)
+        print(f"[profile] run report: {json_path}", file=sys.stderr)
+    return run_id
+
+def parse_args(argv=None):
+    """
+    CLI:
+      python run_compliance_check_semantic.py rules.json out.xlsx [ops_facts.json] [options]
+    """
+    ap = argparse.ArgumentParser(description="BROOK semantic compliance checker")
+    ap.add_argument("rules_json", nargs="?", default="brook_rules_from_spec.json")
+    ap.add_argument("out_xlsx", nargs="?", default="brook_compliance_report.xlsx",
+                    help="report file: .xlsx, .csv or .jsonl")
+    ap.add_argument("ops_facts_json", nargs="?", default=None)
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                    help="directory of the extracted-text cache (default: %(default)s)")
+    ap.add_argument("--no-cache", action="store_true", help="always re-extract documents")
+    ap.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                    help="evict cached text above this size (default: %(default)s MB)")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="extraction processes (0 = one per core, 1 = serial; default: %(default)s)")
+    ap.add_argument("--pdf-backend", choices=BACKEND_CHOICES, default=DEFAULT_PDF_BACKEND,
+                    help="PDF text engine (default: %(default)s; see pdf_backends.py)")
+    ap.add_argument("--pdf-layout", action="store_true",
+                    help="layout-preserving PDF text (pypdf, pdfminer, pymupdf)")
+    ap.add_argument("--eval-workers", type=int, default=1,
+                    help="rule evaluation processes (0 = one per core; default: %(default)s = serial)")
+    ap.add_argument("--only", action="append", default=None, metavar="RULE_ID",
+                    help="evaluate only matching rule ids (glob allowed, repeatable)")
+    ap.add_argument("--no-sections", action="store_true",
+                    help="ignore anchor_sections and search whole documents")
+    ap.add_argument("--state", default=None, metavar="STATE_JSON",
+                    help="incremental mode: re-evaluate only rules whose rule/doc fingerprints changed")
+    ap.add_argument("--rule-timeout", type=float, default=DEFAULT_RULE_TIMEOUT, metavar="SECONDS",
+                    help="time budget per risky rule, then REVIEW (0 = no budget; default: %(default)s)")
+    ap.add_argument("--guard-all", action="store_true",
+                    help="apply the time budget to every rule, not only those with risky patterns")
+    ap.add_argument("--profile", action="store_true",
+                    help="write a timing run report (<out>.profile.json/.csv) and flag slow rules")
+    ap.add_argument("--cprofile", default=None, metavar="PSTATS_FILE",
+                    help="also dump cProfile statistics of the whole run to this file")
+    ap.add_argument("--store", default=None, metavar="SQLITE_FILE",
+                    help="append this run's results to a result store (analyze_report.py --store)")
+    ap.add_argument("--store-label", default="", metavar="LABEL",
+                    help="label of the stored run, e.g. the operator (default: none)")
+    args = ap.parse_args(argv)
+    try:
+        extract_options(args.pdf_backend, args.pdf_layout)
+    except ValueError as e:
+        ap.error(str(e))
+    return args
 
 if __name__ == "__main__":
-    # CLI:
-    #   python run_compliance_check_semantic.py rules.json out.xlsx [ops_facts.json]
-    rules_json = sys.argv[1] if len(sys.argv) > 1 else "brook_rules_from_spec.json"
-    out_xlsx = sys.argv[2] if len(sys.argv) > 2 else "brook_compliance_report.xlsx"
-    ops_facts_json = sys.argv[3] if len(sys.argv) > 3 else None
-    main(rules_json, out_xlsx, ops_facts_json)
+    args = parse_args()
+    run_args = (args.rules_json, args.out_xlsx, args.ops_facts_json)
+    run_kwargs = dict(cache_dir=None if args.no_cache else args.cache_dir,
+                      cache_max_bytes=args.cache_max_mb * 1024 * 1024, workers=args.workers,
+                      only=args.only, sectioned=not args.no_sections, state_path=args.state,
+                      profile=args.profile, rule_timeout=args.rule_timeout, guard_all=args.guard_all,
+                      pdf_backend=args.pdf_backend, pdf_layout=args.pdf_layout,
+                      store_path=args.store, store_label=args.store_label, eval_workers=args.eval_workers)
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(main, *run_args, **run_kwargs)
+        finally:
+            profiler.dump_stats(args.cprofile)
+            print(f"[profile] cProfile stats: {args.cprofile} (python -m pstats {args.cprofile})", file=sys.stderr)
+    else:
+        main(*run_args, **run_kwargs)
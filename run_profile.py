@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Run profile — per-stage timings and a machine-readable run report
+-----------------------------------------------------------------
+Answers "why was this run slow?": PyPDF2/python-docx extraction, a pathological
+regex in the rules file, or the Excel export. A RunProfile is passed through the
+run (run_compliance_check_semantic.main(profile=True) / --profile) and collects:
+
+- stages:    wall time of load_rules / compile / prescan / extract / evaluate / export
+- documents: extraction time, characters and source (cache or extracted) per document
+- rules:     compile time, evaluation time, regex time and hit counts per rule
+- patterns:  scan time and hits per unique pattern (pattern_scanner.py)
+- cache:     extraction cache hits / misses
+
+write() stores "<output>.profile.json" (everything) and "<output>.profile.csv"
+(one row per rule) next to the report. Rules whose regex time is far above the
+median (SLOW_FACTOR × median and at least SLOW_MIN_SECONDS) are flagged, which is
+how a catastrophic-backtracking pattern (".*" chains under DOTALL) shows up before
+it stalls a production run.
+
+A pattern's scan is shared by every rule that uses it, so a rule's regex time
+counts the full time of each of its patterns.
+"""
+
+import csv, json, time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from statistics import median
+
+SLOW_FACTOR = 10.0
+SLOW_MIN_SECONDS = 0.05
+
+CSV_COLUMNS = ["rule_id", "decision", "compile_s", "eval_s", "regex_s", "positive_hits",
+               "contradictions", "patterns", "slow", "slowest_pattern"]
+
+
+def stage(profile, name: str):
+    """
+    profile.stage(name), or a no-op context when profiling is off.
+    """
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+class RunProfile:
+    """
+    Timings and counters of one run.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}      # stage name → seconds
+        self.documents = {}   # doc_key → {"source", "seconds", "chars"}
+        self.rules = []       # per-rule entries, evaluation order
+        self.patterns = {}    # pattern → {"seconds", "hits", "scans"}
+        self.cache = {}
+        self._fallback = {}   # rule id → {"seconds", "hits"} (rule regex run outside the scanner)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    # ---- collectors (called from rule_engine / pattern_scanner) ----
+    def pattern(self, source: str, seconds: float, hits: int):
+        p = self.patterns.setdefault(source, {"seconds": 0.0, "hits": 0, "scans": 0})
+        p["seconds"] += seconds
+        p["hits"] += hits
+        p["scans"] += 1
+
+    def rule_regex(self, cr, field: str, seconds: float, hits: int):
+        f = self._fallback.setdefault(cr.id, {"seconds": 0.0, "hits": 0})
+        f["seconds"] += seconds
+        f["hits"] += hits
+
+    def merge(self, other: "RunProfile"):
+        """
+        Add the pattern and rule regex timings another profile collected (the forked
+        child of a rule evaluated under regex_guard.run_with_budget).
+        """
+        for source, p in other.patterns.items():
+            mine = self.patterns.setdefault(source, {"seconds": 0.0, "hits": 0, "scans": 0})
+            for k in mine:
+                mine[k] += p[k]
+        for rule_id, f in other._fallback.items():
+            mine = self._fallback.setdefault(rule_id, {"seconds": 0.0, "hits": 0})
+            mine["seconds"] += f["seconds"]
+            mine["hits"] += f["hits"]
+
+    def rule_done(self, cr, seconds: float, outcome: dict):
+        self.rules.append({
+            "rule_id": cr.id,
+            "decision": outcome.get("decision", ""),
+            "compile_s": cr.compile_seconds,
+            "eval_s": seconds,
+            "positive_hits": len(outcome.get("matched_positive", [])),
+            "contradictions": len(outcome.get("matched_forbidden", [])),
+            "pattern_sources": sorted({p for pats in cr.patterns.values() for p in pats}),
+        })
+
+    def finish(self, docs=None, cache=None):
+        """
+        Pull per-document timings (doc_store.LazyDocStore) and cache counters.
+        """
+        if docs is not None:
+            self.documents.update(getattr(docs, "timings", {}))
+        if cache is not None:
+            self.cache = {"hits": cache.hits, "misses": cache.misses}
+
+    # ---- report ----
+    def rule_rows(self, factor: float = SLOW_FACTOR, min_seconds: float = SLOW_MIN_SECONDS) -> list:
+        """
+        Per-rule report rows with regex time and the slow flag.
+        """
+        rows = []
+        for r in self.rules:
+            pats = [(self.patterns.get(p, {}).get("seconds", 0.0), p) for p in r["pattern_sources"]]
+            fallback = self._fallback.get(r["rule_id"], {}).get("seconds", 0.0)
+            slowest = max(pats) if pats else (0.0, "")
+            rows.append({
+                "rule_id": r["rule_id"],
+                "decision": r["decision"],
+                "compile_s": round(r["compile_s"], 6),
+                "eval_s": round(r["eval_s"], 6),
+                "regex_s": round(sum(t for t, _ in pats) + fallback, 6),
+                "positive_hits": r["positive_hits"],
+                "contradictions": r["contradictions"],
+                "patterns": len(pats),
+                "slow": False,
+                "slowest_pattern": slowest[1],
+            })
+        timed = [row["regex_s"] for row in rows if row["patterns"]]
+        if timed:
+            med = median(timed)
+            for row in rows:
+                row["slow"] = row["regex_s"] >= min_seconds and row["regex_s"] > factor * med
+        return rows
+
+    def to_dict(self) -> dict:
+        rules = self.rule_rows()
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "documents": self.documents,
+            "cache": self.cache,
+            "rules": rules,
+            "slow_rules": [r["rule_id"] for r in rules if r["slow"]],
+            "patterns": [dict(pattern=p, **{k: round(v, 6) if isinstance(v, float) else v for k, v in st.items()})
+                         for p, st in sorted(self.patterns.items(), key=lambda kv: -kv[1]["seconds"])],
+        }
+
+    def write(self, output_path: str) -> tuple:
+        """
+        Write "<output>.profile.json" and "<output>.profile.csv"; returns both paths.
+        """
+        base = str(Path(output_path).with_suffix(""))
+        report = self.to_dict()
+        json_path, csv_path = Path(base + ".profile.json"), Path(base + ".profile.csv")
+        json_path.write_text(json.dumps(report, indent=1, ensure_ascii=False), encoding="utf-8")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            w.writeheader()
+            w.writerows(report["rules"])
+        return json_path, csv_path
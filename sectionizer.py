@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Sectionizer — per-document section tree and heading index
+---------------------------------------------------------
+Rules declare "anchor_sections" (e.g. ["Fleet", "Company Aircraft"]) and a "scope"
+("section" / "sentence"), but matching used to run over the whole concatenation of
+the rule's source_docs. This module turns each document into a section tree with
+character offsets so rules can be matched against the relevant chapters only.
+
+Headings come from two sources, merged by offset:
+1) DOCX heading styles ("Heading 1".."Heading 9", "Title"), recorded at extraction
+   time by doc_extract.extract_document().
+2) Numbered headings in the plain text ("3.2.1 Fleet", "CHAPTER 4 - ROUTES",
+   "PART C"), which is all we get from PDFs (OpsSpecs, AOC).
+
+A section spans from its heading to the next heading of the same or a higher level.
+SectionIndex maps normalized heading words (and synonyms) to sections, so resolving
+a rule's anchors is a dictionary lookup rather than a text scan; section_at() finds
+the section governing a text offset by bisection (evidence citations).
+"""
+
+import re
+from bisect import bisect_right
+
+# "3", "3.2", "3.2.1" followed by a short title on its own line
+NUMBERED_HEADING = re.compile(
+    r"^[ \t]*(?P<num>\d{1,2}(?:\.\d{1,3}){0,4})\.?[ \t]+(?P<title>[A-Z][^\n]{1,90}?)[ \t]*$",
+    re.MULTILINE)
+# "CHAPTER 4 - ROUTES", "Part C", "SECTION IV: TRAINING". Case-sensitive, and the
+# number is digits, a roman numeral or one capital letter, so a wrapped body line
+# ("Part of the training programs ...") is not a heading
+KEYWORD_HEADING = re.compile(
+    r"^[ \t]*(?P<kw>CHAPTER|Chapter|PART|Part|SECTION|Section)[ \t]+(?P<num>\d{1,3}|[IVXLC]{1,7}|[A-Z])\b"
+    r"[ \t:.\-–]*(?P<title>[^\n]{0,90}?)[ \t]*$",
+    re.MULTILINE)
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"and", "or", "of", "the", "for", "to", "in", "on", "a", "an"}
+
+# Heading words that should also resolve an anchor (anchor word → alternatives).
+# Kept to near-equivalents: a generic alternative ("aircraft", "helicopter", "area")
+# would also pull in sections such as "Loading and securing of items in the helicopter".
+ANCHOR_SYNONYMS = {
+    "fleet": ["aircraft types", "company aircraft"],
+    "area": ["region", "geographic"],
+    "routes": ["route"],
+    "limitations": ["limits", "restrictions"],
+    "nvg": ["night vision", "nvis"],
+    "training": ["qualification", "qualifications"],
+    "approvals": ["approval", "authorizations", "authorisations"],
+    "helipad": ["helipads", "heliport", "heliports"],
+    "hems": ["emergency medical"],
+}
+
+
+def normalize_words(text: str) -> list:
+    """
+    Lower-cased content words of a heading/anchor, without numbering or stopwords.
+    """
+    return [w for w in WORD.findall(text.lower()) if w not in STOPWORDS and not w.isdigit()]
+
+
+def detect_numbered_headings(text: str) -> list:
+    """
+    Find numbered / keyword headings in plain text. Returns [[offset, level, title], ...].
+    Lines that look like sentences (ending with "." or too long) are ignored.
+    """
+    found = {}
+    for m in NUMBERED_HEADING.finditer(text):
+        title = m.group("title").strip()
+        if title.endswith((".", ",", ";")) or len(title.split()) > 12:
+            continue
+        level = m.group("num").count(".") + 1
+        found[m.start()] = [m.start(), level, f"{m.group('num')} {title}"]
+    for m in KEYWORD_HEADING.finditer(text):
+        title = m.group("title").strip()
+        if title.endswith((".", ",", ";")) or len(title.split()) > 12:
+            continue
+        found[m.start()] = [m.start(), 1, f"{m.group('kw').upper()} {m.group('num')} {title}".strip()]
+    return [found[k] for k in sorted(found)]
+
+
+class Section:
+    """
+    One heading and the text span it governs: [start, end) in the document text.
+    """
+
+    __slots__ = ("title", "level", "start", "end", "parent", "words")
+
+    def __init__(self, title: str, level: int, start: int, end: int, parent: int | None):
+        self.title = title
+        self.level = level
+        self.start = start
+        self.end = end
+        self.parent = parent
+        self.words = normalize_words(title)
+
+    def __repr__(self):
+        return f"Section({self.title!r}, level={self.level}, {self.start}:{self.end})"
+
+
+def build_sections(text: str, headings: list, skip: list | None = None) -> list:
+    """
+    Build the section tree (flat list with parent indices) from heading offsets.
+    Style headings win over a text-detected heading at the same offset. Text-detected
+    headings inside the `skip` spans (table cells, headers/footers: a "1 August 2025"
+    cell is not a chapter) are ignored.
+    """
+    by_offset = {}
+    skip_starts = [s for s, _ in skip or []]
+    for off, level, title in detect_numbered_headings(text):
+        i = bisect_right(skip_starts, off) - 1
+        if i >= 0 and off < skip[i][1]:
+            continue
+        by_offset[off] = (level, title)
+    for off, level, title in headings or []:
+        by_offset[off] = (level, title)
+
+    sections = []
+    stack = []  # indices of open sections
+    for off in sorted(by_offset):
+        level, title = by_offset[off]
+        while stack and sections[stack[-1]].level >= level:
+            sections[stack.pop()].end = off
+        parent = stack[-1] if stack else None
+        sections.append(Section(title, level, off, len(text), parent))
+        stack.append(len(sections) - 1)
+    return sections
+
+
+class SectionIndex:
+    """
+    Heading-word index over one document's sections.
+    """
+
+    def __init__(self, text: str, headings: list | None = None, skip: list | None = None):
+        self.length = len(text)
+        self.sections = build_sections(text, headings or [], skip)
+        self.starts = [sec.start for sec in self.sections]
+        self._by_word = {}
+        for i, sec in enumerate(self.sections):
+            for w in sec.words:
+                self._by_word.setdefault(w, []).append(i)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def _candidates(self, words: list) -> set:
+        """
+        Sections whose heading contains every word of `words`.
+        """
+        if not words:
+            return set()
+        hits = None
+        for w in words:
+            ids = set(self._by_word.get(w, ()))
+            hits = ids if hits is None else hits & ids
+            if not hits:
+                return set()
+        return hits
+
+    def find(self, anchors: list, synonyms: list | None = None) -> list:
+        """
+        Sections matching any anchor (all anchor words present in the heading),
+        or any synonym of a single-word anchor. Returns section indices, in order.
+        """
+        found = set()
+        for anchor in list(anchors or []) + list(synonyms or []):
+            words = normalize_words(anchor)
+            found |= self._candidates(words)
+            if len(words) == 1:
+                for alt in ANCHOR_SYNONYMS.get(words[0], []):
+                    found |= self._candidates(normalize_words(alt))
+        return sorted(found)
+
+    def spans(self, anchors: list, synonyms: list | None = None) -> list:
+        """
+        Merged [start, end) spans of the sections matching the anchors (children are
+        covered by their parent's span).
+        """
+        spans = sorted((self.sections[i].start, self.sections[i].end) for i in self.find(anchors, synonyms))
+        merged = []
+        for s, e in spans:
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        return [tuple(x) for x in merged]
+
+    def titles(self, anchors: list, synonyms: list | None = None) -> list:
+        return [self.sections[i].title for i in self.find(anchors, synonyms)]
+
+    def section_at(self, offset: int) -> Section | None:
+        """
+        Innermost section containing a text offset (None before the first heading).
+        """
+        i = bisect_right(self.starts, offset) - 1
+        while i is not None and i >= 0:
+            sec = self.sections[i]
+            if offset < sec.end:
+                return sec
+            i = sec.parent
+        return None
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Shared corpus — parallel rule evaluation over one memory-mapped copy of the text
+--------------------------------------------------------------------------------
+Rule evaluation is a serial loop, and handing the extracted manuals to worker
+processes the obvious way would pickle tens of MB of text into every worker.
+Instead, with --eval-workers:
+
+- SharedCorpus writes the UTF-8 text of every referenced document once into one
+  file that workers memory-map read-only, with an offset table (document → byte
+  start / end) and the small non-text part of each record (headings, pages, DOCX
+  locations). Workers receive only the file name and the table, and decode a
+  document straight from the mapping the first time one of their rules needs it
+  (Python's re needs a str, so each worker holds a decoded copy of the documents
+  it touches; nothing is pickled, re-read from the cache or re-extracted).
+- Every worker compiles the rule set once and then evaluates chunks of rules
+  against a SharedDocStore (doc_store.LazyDocStore over the corpus, so sections,
+  citations and token / sentence boundaries are built once per worker).
+- Chunks are scheduled longest first: rule cost is the evaluation time measured in
+  the latest stored run (result_store.ResultStore.rule_seconds), or, for rules
+  without one, an estimate from the size of their documents and their pattern count.
+  Expensive rules run alone, cheap ones are grouped.
+
+Each rule's outcome does not depend on the other rules evaluated with it, so
+outcomes are yielded in rule order with the same content as the serial path
+(apart from "seconds"); per-pattern profile timings are only collected serially.
+"""
+
+import mmap, os, tempfile
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from doc_store import LazyDocStore
+from rule_engine import compile_rules
+
+# Chunks per worker: enough to balance the load, few enough to keep per-task overhead low
+CHUNKS_PER_WORKER = 4
+# Estimated cost factor of rules with risky patterns (they also run under a time budget)
+RISKY_WEIGHT = 10
+
+
+# ====== Corpus ======
+class SharedCorpus:
+    """
+    Texts of several documents in one memory-mapped file: build() in the parent,
+    attach(handle()) in the workers.
+    """
+
+    def __init__(self, path: str, keys: list, offsets, meta: dict, owner: bool = False):
+        self.path = path
+        self.keys = list(keys)
+        self.offsets = offsets          # array("q"): byte start of each document, plus the end
+        self.meta = meta                # key → record without its text
+        self.owner = owner
+        self._index = {k: i for i, k in enumerate(self.keys)}
+        self._file = open(path, "rb")
+        size = offsets[-1] if len(offsets) else 0
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    @classmethod
+    def build(cls, records: dict, directory: str | None = None) -> "SharedCorpus":
+        """
+        Write the texts of {key: extraction record} to a temporary file.
+        """
+        fd, path = tempfile.mkstemp(prefix="corpus_", suffix=".txt", dir=directory)
+        offsets, meta, pos = array("q", [0]), {}, 0
+        with os.fdopen(fd, "wb") as f:
+            for key, rec in records.items():
+                pos += f.write(rec["text"].encode("utf-8"))
+                offsets.append(pos)
+                meta[key] = {k: v for k, v in rec.items() if k != "text"}
+        return cls(path, list(records), offsets, meta, owner=True)
+
+    def handle(self) -> tuple:
+        return self.path, self.keys, self.offsets, self.meta
+
+    @classmethod
+    def attach(cls, handle: tuple) -> "SharedCorpus":
+        return cls(*handle)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def text(self, key) -> str:
+        i = self._index[key]
+        a, b = self.offsets[i], self.offsets[i + 1]
+        if a == b:
+            return ""
+        with memoryview(self._map) as buf:
+            return str(buf[a:b], "utf-8")
+
+    def record(self, key) -> dict:
+        return dict(self.meta[key], text=self.text(key))
+
+    def close(self):
+        """
+        Unmap the file (and delete it, in the process that built it).
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        if self.owner:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class SharedDocStore(LazyDocStore):
+    """
+    LazyDocStore whose records come from a SharedCorpus instead of the extractor.
+    """
+
+    def __init__(self, doc_files: dict, corpus: SharedCorpus):
+        super().__init__(doc_files)
+        self.corpus = corpus
+
+    def record(self, key) -> dict:
+        if key not in self._records and key in self.corpus:
+            self._records[key] = self.corpus.record(key)
+        return super().record(key)
+
+
+# ====== Scheduling ======
+def rule_costs(compiled, docs, measured: dict | None = None) -> list:
+    """
+    Relative cost of each rule: measured seconds (rule id → seconds) where known;
+    otherwise characters searched × patterns (× RISKY_WEIGHT for risky rules), scaled
+    to seconds by the rules that have both.
+    """
+    sizes, estimates = {}, []
+    for cr in compiled:
+        chars = 0
+        for k in cr.source_docs:
+            if k not in sizes:
+                sizes[k] = len(docs.get(k, "")) if k in docs else 0
+            chars += sizes[k]
+        patterns = sum(len(v) for v in cr.patterns.values()) or len(cr.legacy_patterns or ()) or 1
+        estimates.append((chars + 1) * patterns * (RISKY_WEIGHT if cr.risky else 1))
+    measured = measured or {}
+    known = [(measured[str(cr.id)], est) for cr, est in zip(compiled, estimates) if measured.get(str(cr.id))]
+    scale = sum(m for m, _ in known) / sum(e for _, e in known) if known else 1.0
+    return [measured.get(str(cr.id)) or est * scale for cr, est in zip(compiled, estimates)]
+
+
+def schedule(costs: list, workers: int) -> list:
+    """
+    Chunks of rule indices, most expensive first: rules are taken in decreasing cost
+    and packed until a chunk reaches total / (workers × CHUNKS_PER_WORKER); a rule
+    costlier than that is a chunk of its own. Indices inside a chunk keep rule order
+    (consecutive rules with the same documents share a text view and memo).
+    """
+    if not costs:
+        return []
+    target = sum(costs) / max(1, workers * CHUNKS_PER_WORKER)
+    chunks, chunk, size = [], [], 0.0
+    for i in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        if chunk and size + costs[i] > target:
+            chunks.append(sorted(chunk))
+            chunk, size = [], 0.0
+        chunk.append(i)
+        size += costs[i]
+    if chunk:
+        chunks.append(sorted(chunk))
+    return chunks
+
+
+# ====== Workers ======
+_worker = {}
+
+
+def _init_worker(rules: list, handle: tuple, doc_files: dict, kwargs: dict):
+    corpus = SharedCorpus.attach(handle)
+    _worker.update(compiled=compile_rules(rules, strict=False), docs=SharedDocStore(doc_files, corpus),
+                   kwargs=kwargs)
+
+
+def _evaluate_chunk(indices: list) -> list:
+    sub = _worker["compiled"].subset(indices)
+    return [(i, outcome) for i, (_, outcome) in zip(indices, sub.evaluate(_worker["docs"], **_worker["kwargs"]))]
+
+
+def evaluate_parallel(compiled, docs, workers: int, measured: dict | None = None, ops_facts: dict | None = None,
+                      sectioned: bool = True, rule_timeout: float | None = None, guard_all: bool = False,
+                      profile=None):
+    """
+    CompiledRuleSet.evaluate() on `workers` processes: yields (compiled_rule, outcome)
+    in rule order as soon as every earlier rule is done. `docs` is the parent's
+    document store (doc_store.LazyDocStore); the documents the rules reference are
+    loaded from it once and shared through a SharedCorpus. `measured`: rule id →
+    seconds of an earlier run (longest-first scheduling).
+    """
+    keys = [k for k in dict.fromkeys(k for cr in compiled for k in cr.source_docs) if k in docs]
+    corpus = SharedCorpus.build({k: docs.record(k) for k in keys})
+    chunks = schedule(rule_costs(compiled, docs, measured), workers)
+    kwargs = dict(ops_facts=ops_facts, sectioned=sectioned, rule_timeout=rule_timeout, guard_all=guard_all)
+    pool = ProcessPoolExecutor(max_workers=max(1, min(workers, len(chunks))), initializer=_init_worker,
+                               initargs=([cr.rule for cr in compiled], corpus.handle(),
+                                         {k: docs.doc_files[k] for k in keys}, kwargs))
+    try:
+        pending = {pool.submit(_evaluate_chunk, chunk) for chunk in chunks}
+        done, nxt = {}, 0
+        while nxt < len(compiled.rules):
+            if nxt not in done:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    done.update(fut.result())
+                continue
+            cr, outcome = compiled.rules[nxt], done.pop(nxt)
+            if profile is not None:
+                profile.rule_done(cr, outcome["seconds"], outcome)
+            yield cr, outcome
+            nxt += 1
+    finally:
+        pool.shutdown(cancel_futures=True)
+        corpus.close()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Text views — search several documents (or sections) without concatenating them
+-------------------------------------------------------------------------------
+A rule searches the "\\n"-joined text of its source_docs, restricted to its anchor
+sections when section-scoped. Building that string per rule (or per group of rules)
+copies whole manuals again and again. A TextView instead keeps references to the
+loaded document texts plus (start, end) ranges, and behaves like the joined string
+for everything the rule engine needs:
+
+- len(view), view[a:b] (only the requested slice is materialized, so snippets and
+  negation windows across a page/section/document boundary still see the "\\n"
+  separator exactly as before)
+- view.spans(regex): finditer spans in view offsets. Each piece is matched in place
+  (re's pos/endpos); around every boundary a short overlap window of
+  OVERLAP_CHARS on either side is matched as well, so matches that span two pieces
+  are still found. This is exact for patterns whose longest match fits in the
+  window; patterns of unbounded length (".*" under DOTALL, "\\s+") and patterns with
+  lookarounds (which read past the match, e.g. "NVG(?=.*training)") are matched on
+  the joined text instead, built once per view and only when such a pattern runs.
+- view.search(regex, pos), view.contains_lower(needle)
+- view.locate(offset) → (doc_key, offset in that document) for citations, and
+  view.piece_at(offset) (boundary_index.ViewBoundaries)
+
+text_spans() / text_search() / text_contains_lower() accept a plain string or a TextView.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import islice
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+MAXREPEAT = sre_parse.MAXREPEAT
+LOOKAROUNDS = (sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+# Context kept on each side of a piece boundary when matching across it
+OVERLAP_CHARS = 1000
+
+_max_widths, _reaches = {}, {}
+
+
+def max_match_width(regex) -> int:
+    """
+    Upper bound on the length of a match of a compiled regex (MAXREPEAT if unbounded).
+    """
+    key = (regex.pattern, regex.flags)
+    if key not in _max_widths:
+        try:
+            _max_widths[key] = sre_parse.parse(regex.pattern, regex.flags).getwidth()[1]
+        except Exception:
+            _max_widths[key] = MAXREPEAT
+    return _max_widths[key]
+
+
+def _has_lookaround(node) -> bool:
+    if isinstance(node, sre_parse.SubPattern):
+        return any(op in LOOKAROUNDS or _has_lookaround(av) for op, av in node)
+    if isinstance(node, (tuple, list)):
+        return any(_has_lookaround(x) for x in node)
+    return False
+
+
+def match_reach(regex) -> int:
+    """
+    Upper bound on how far from a match start the regex reads: its match width, or
+    MAXREPEAT when it contains a lookaround (a lookahead can look past the match,
+    a lookbehind before it, and getwidth() counts neither).
+    """
+    key = (regex.pattern, regex.flags)
+    if key not in _reaches:
+        try:
+            lookaround = _has_lookaround(sre_parse.parse(regex.pattern, regex.flags))
+        except Exception:
+            lookaround = True
+        _reaches[key] = MAXREPEAT if lookaround else max_match_width(regex)
+    return _reaches[key]
+
+
+class TextView:
+    """
+    Read-only view equal to "\\n".join(text[start:end] for each piece).
+    pieces: [(doc_key, text, start, end), ...]
+    """
+
+    __slots__ = ("pieces", "starts", "length", "_joined")
+
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+        self._joined = None
+        self.starts = []
+        pos = 0
+        for _, _, s, e in self.pieces:
+            self.starts.append(pos)
+            pos += (e - s) + 1
+        self.length = max(0, pos - 1)
+
+    @classmethod
+    def of_documents(cls, docs, keys) -> "TextView":
+        """
+        View over whole documents of a dict-like doc_key → text store.
+        """
+        pieces = []
+        for k in keys:
+            text = docs.get(k, "")
+            pieces.append((k, text, 0, len(text)))
+        return cls(pieces)
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if self._joined is not None:
+            return self._joined
+        return "\n".join(text[s:e] for _, text, s, e in self.pieces)
+
+    def joined(self) -> str:
+        """
+        The joined text, built on first use and kept for the view's lifetime.
+        """
+        if self._joined is None:
+            self._joined = str(self)
+        return self._joined
+
+    def __repr__(self):
+        return f"TextView({len(self.pieces)} pieces, {self.length} chars)"
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            a, b, step = item.indices(self.length)
+            if step != 1:
+                return str(self)[item]
+            return self._slice(a, b)
+        i = item + self.length if item < 0 else item
+        if not 0 <= i < self.length:
+            raise IndexError("TextView index out of range")
+        return self._slice(i, i + 1)
+
+    def _slice(self, a: int, b: int) -> str:
+        if a >= b:
+            return ""
+        out = []
+        last = len(self.pieces) - 1
+        i = max(0, bisect_right(self.starts, a) - 1)
+        while i <= last and self.starts[i] < b:
+            _, text, s, e = self.pieces[i]
+            st = self.starts[i]
+            lo, hi = max(a, st), min(b, st + e - s)
+            if lo < hi:
+                out.append(text[s + lo - st:s + hi - st])
+            if i < last and a <= st + e - s < b:
+                out.append("\n")
+            i += 1
+        return "".join(out)
+
+    def piece_at(self, offset: int) -> int:
+        """
+        Index of the piece holding a view offset (a separator belongs to the piece before it).
+        """
+        return max(0, bisect_right(self.starts, offset) - 1)
+
+    def locate(self, offset: int) -> tuple:
+        """
+        (doc_key, offset within that document's text) of a view offset.
+        A separator position maps to the end of the preceding piece.
+        """
+        i = self.piece_at(offset)
+        key, _, s, e = self.pieces[i]
+        return key, s + min(offset - self.starts[i], e - s)
+
+    # ---- matching ----
+    def spans(self, regex, pos: int = 0, limit: int | None = None, overlap: int = OVERLAP_CHARS) -> list:
+        """
+        (start, end) of the non-overlapping matches finditer would return on the joined
+        text from view offset `pos` (at most `limit` of them).
+        """
+        if len(self.pieces) == 1 and self.pieces[0][2] == 0:
+            _, text, _, e = self.pieces[0]
+            return [m.span() for m in islice(regex.finditer(text, pos, e), limit)]
+        if match_reach(regex) > overlap:
+            return [m.span() for m in islice(regex.finditer(self.joined(), pos), limit)]
+        out = []
+        if not self.pieces:
+            return out
+        # Offset 0 (start of the joined text) is matched on a window; pieces are matched
+        # in place from their second character, so "^", "\b" and lookbehinds at a
+        # piece start always see the joined text's context
+        cursor = pos  # no match may start before this view offset
+        if pos == 0:
+            # One character more than a match can span, so "\b" / "$" at its end see the next one
+            m = regex.match(self._slice(0, overlap + 1))
+            cursor = _append(out, *m.span()) if m else 0
+            cursor = max(cursor, 1)
+        last = len(self.pieces) - 1
+        for i, (_, text, s, e) in enumerate(self.pieces):
+            st = self.starts[i]
+            sep = st + e - s  # view offset of the "\n" after this piece
+            if limit is not None and len(out) >= limit:
+                break
+            if cursor > sep + 1:
+                continue
+            # Matches starting in the last `overlap` chars are taken from the boundary scan
+            tail = sep - overlap if i < last else sep + 1
+            for m in regex.finditer(text, s + max(0, cursor - st), e):
+                ms = m.start() - s + st
+                if ms >= tail:
+                    break
+                cursor = _append(out, ms, m.end() - s + st)
+            if i == last:
+                break
+            # Boundary: match the joined text around the separator (up to and including
+            # the next piece's first character), with context before
+            start = max(cursor, tail)
+            lo = max(0, start - overlap)
+            window = self._slice(lo, sep + 2 + overlap)
+            for m in regex.finditer(window, start - lo):
+                ms = m.start() + lo
+                if ms > sep + 1:
+                    break
+                cursor = _append(out, ms, m.end() + lo)
+            cursor = max(cursor, sep + 2)
+        return out[:limit] if limit is not None else out
+
+    def search(self, regex, pos: int = 0):
+        """
+        Span of the first match at or after view offset `pos`, or None.
+        """
+        found = self.spans(regex, pos, limit=1)
+        return found[0] if found else None
+
+    def contains_lower(self, needle: str) -> bool:
+        """
+        `needle in str(view).lower()` for an already lowered needle.
+        """
+        return self.search(re.compile(re.escape(needle), re.IGNORECASE)) is not None
+
+
+def _append(out: list, start: int, end: int) -> int:
+    """
+    Add a span unless it repeats the previous (empty) match; return the new cursor.
+    """
+    if not out or out[-1] != (start, end):
+        out.append((start, end))
+    return end
+
+
+def text_spans(regex, text) -> list:
+    """
+    finditer spans over a string or a TextView.
+    """
+    if isinstance(text, TextView):
+        return text.spans(regex)
+    return [m.span() for m in regex.finditer(text)]
+
+
+def text_search(regex, text, pos: int = 0):
+    """
+    Span of the first match at or after `pos` in a string or a TextView, or None.
+    """
+    if isinstance(text, TextView):
+        return text.search(regex, pos)
+    m = regex.search(text, pos)
+    return m.span() if m else None
+
+
+def text_contains_lower(text, needle: str) -> bool:
+    """
+    `needle in text.lower()` for a string or a TextView (needle already lowered).
+    """
+    if isinstance(text, TextView):
+        return text.contains_lower(needle)
+    return needle in text.lower()